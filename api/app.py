@@ -1,39 +1,99 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pickle
 import numpy as np
 import os
 import re
+import shutil
+import tempfile
 from urllib.parse import urlparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
 import requests
-from bs4 import BeautifulSoup
+
+# Allow `python api/app.py` as well as `gunicorn api.app:app` from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.features import FEATURES, RATING_KEYS, build_feature_matrix
+from api.cache import LRUCache
+from api import csv_scoring, dupr_api, metrics, pickleball, scrape_jobs, tournament
 
 app = Flask(__name__)
 CORS(app)
 
-# Lazy-load models only when needed (so scraping endpoint works without scikit-learn)
-models = None
+# Lazy-load models only when needed (so scraping endpoint works without scikit-learn).
+# The registry serves every models/model<N>_*.pkl and hot-swaps retrained files;
+# MODEL_POLL_SECONDS=0 turns the watcher off.
+registry = None
+models_lock = threading.Lock()
+model_loader = None        # Background load started by /ready
+loader_lock = threading.Lock()  # Guards model_loader only, so /ready never waits on a load
+
+def get_registry():
+    global registry
+    if registry is None:
+        with models_lock:
+            if registry is None:
+                from api.registry import ModelRegistry
+                registry = ModelRegistry(os.path.join(os.path.dirname(__file__), '..', 'models'),
+                                         poll_interval=float(os.environ.get('MODEL_POLL_SECONDS', '5')))
+    return registry
 
 def load_models():
-    global models
-    if models is not None:
-        return models
-    loaded = {}
-    for model_num in [1, 3]:
-        model_path = os.path.join(os.path.dirname(__file__), '..', 'models', f'model{model_num}_{"ridge" if model_num == 1 else "gb_balanced"}.pkl')
-        with open(model_path, 'rb') as f:
-            data = pickle.load(f)
-            if isinstance(data, tuple) and len(data) == 3:
-                loaded[model_num] = {'model': data[0], 'features': data[1], 'deflation': data[2]}
-            else:
-                loaded[model_num] = {'model': data, 'features': None, 'deflation': 0.0}
-    models = loaded
-    return models
-
-# Feature order matches deep_analysis.py 'All_Features'
-FEATURES = ['won', 'rating_diff', 'score_margin', 'total_points', 'partner_diff', 'team_vs_opp', 
-            'won_x_rating_diff', 'won_x_score_margin', 'rating_squared', 'surprise', 'opp_spread',
-            'player_rating', 'partner_rating', 'opp_avg']
+    """Current snapshot of model_num -> model_data (loads on first use)"""
+    reg = get_registry()
+    if reg.models is None:
+        reg.refresh()
+    reg.ensure_watcher()
+    return reg.models
+
+def models_loaded():
+    return registry is not None and registry.models is not None
+
+# Preload mode: load at import time. Under gunicorn with preload_app (see
+# gunicorn.conf.py) that happens once in the master, and the forked workers
+# share the model pages copy-on-write instead of each unpickling on first request.
+# The file watcher is started per worker on first use, never in the master.
+if os.environ.get('PRELOAD_MODELS') == '1':
+    get_registry().refresh()
+
+# Rating changes per (model number, four ratings, two scores). The same leagues
+# check the same foursomes over and over, so most predictions are repeats.
+prediction_cache = LRUCache(maxsize=int(os.environ.get('PREDICTION_CACHE_SIZE', '10000')))
+
+# Metrics read at scrape time from state the app already keeps
+CACHES = {'prediction': prediction_cache, 'rating': pickleball.rating_cache}
+metrics.Gauge('dupr_model_load_seconds', 'Duration of the last model load', lambda: registry.load_seconds if registry else None)
+metrics.Gauge('dupr_models_generation', 'Number of model (re)loads in this process', lambda: registry.generation if registry else 0)
+metrics.Gauge('dupr_cache_hit_ratio', 'Cache hit ratio since start', lambda: {(name,): cache.stats()['hit_ratio'] for name, cache in CACHES.items()}, ['cache'])
+metrics.Gauge('dupr_cache_entries', 'Entries currently cached', lambda: {(name,): cache.stats()['size'] for name, cache in CACHES.items()}, ['cache'])
+metrics.CounterFunc('dupr_cache_lookups_total', 'Cache lookups by result', lambda: {
+    (name, result): stats[key]
+    for name, stats in ((name, cache.stats()) for name, cache in CACHES.items())
+    for result, key in [('hit', 'hits'), ('stale', 'stale_hits'), ('miss', 'misses')] if key in stats
+}, ['cache', 'result'])
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.set_endpoint(request.endpoint or 'unknown')
+
+
+@app.after_request
+def record_request_latency(response):
+    if 'request_start' in g:
+        metrics.request_seconds.observe(time.perf_counter() - g.request_start, endpoint=request.endpoint or 'unknown',
+                                        method=request.method, status=response.status_code)
+    metrics.set_endpoint(None)
+    return response
+
+
+def json_body():
+    """request.json, timed as the parse_json stage"""
+    with metrics.stage('parse_json'):
+        return request.json
 
 @app.route('/')
 def home():
@@ -42,15 +102,89 @@ def home():
         "model": "Gradient Boosting (R² = 0.86)",
         "endpoints": {
             "/predict": "Predict DUPR rating changes",
-            "/scrape_dupr": "Scrape DUPR rating from pickleball.com URL"
+            "/predict_batch": "Predict DUPR rating changes for a list of matches",
+            "/predict_ensemble": "Predict with every model at once, plus a weighted ensemble",
+            "/simulate": "Project a roster's ratings through a match schedule or round robin",
+            "/score_csv": "Stream NDJSON predictions (and residuals) for an uploaded scraper CSV",
+            "/score_table": "Predict DUPR rating changes for every plausible final score of a matchup",
+            "/ready": "Readiness check (200 once models are loaded)",
+            "/models": "Served model versions",
+            "/stats": "Cache statistics",
+            "/metrics": "Prometheus metrics (latency histograms, cache hit ratios, upstream status codes)",
+            "/scrape_dupr": "Scrape DUPR rating from pickleball.com URL",
+            "/scrape_jobs": "Queue a background full rating-history scrape (GET /scrape_jobs/<id>/events streams progress)"
         }
     })
 
+def background_load():
+    """Thread target for /ready's load; a failure clears model_loader so the next probe retries"""
+    global model_loader
+    try:
+        load_models()
+    except Exception as e:
+        print(f"Background model load failed: {e}", flush=True)
+        with loader_lock:
+            model_loader = None
+
+@app.route('/ready')
+def ready():
+    """Readiness probe - healthy only once the models are loaded in this process"""
+    global model_loader
+    if not models_loaded():
+        # Not preloaded: start loading in the background so the first user request doesn't pay for it
+        with loader_lock:
+            if model_loader is None:
+                model_loader = threading.Thread(target=background_load, daemon=True)
+                model_loader.start()
+        return jsonify({'ready': False, 'pid': os.getpid()}), 503
+    return jsonify({
+        'ready': True,
+        'pid': os.getpid(),
+        'models': sorted(registry.models),
+        'model_load_ms': round(registry.load_seconds * 1000, 1)
+    })
+
+@app.route('/models')
+def served_models():
+    """Which model files (and content versions) this worker is serving"""
+    load_models()
+    return jsonify(dict(registry.describe(), pid=os.getpid()))
+
+@app.route('/stats')
+def stats():
+    """Cache statistics for this worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'prediction_cache': prediction_cache.stats(),
+        'rating_cache': pickleball.rating_cache.stats(),
+        'rating_fetch': pickleball.stream_totals,
+        'rating_coalescing': pickleball.rating_flight.stats(),
+        'dupr_api': dupr_api.stats(),
+        'dupr_api_misses': dict(dupr_api.miss_totals, size=len(dupr_api.recent_misses))
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition for this worker"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/scrape_dupr', methods=['POST'])
 def scrape_dupr():
     try:
-        data = request.json
+        data = json_body()
         url = data.get('url', '').strip()
+        dupr_id = str(data.get('dupr_id') or '').strip()
+        slug_match = re.search(r'pickleball\.com/players/([\w-]+)', url)
+        
+        # Fast path: with a DUPR ID, ask DUPR's JSON endpoints before scraping any HTML
+        if dupr_id:
+            result, cache_status = pickleball.rating_cache.get_or_load(
+                f'dupr:{dupr_id}', lambda key: pickleball.rating_flight.do(key, lambda: fetch_dupr_rating_from_api(dupr_id))[0])
+            if result is not None:
+                player_slug = slug_match.group(1) if slug_match else None
+                response = jsonify(rating_response(result, player_slug, dupr_id))
+                response.headers['X-Cache'] = cache_status.upper()
+                return response
         
         if not url:
             return jsonify({'error': 'URL is required'}), 400
@@ -60,256 +194,563 @@ def scrape_dupr():
             return jsonify({'error': 'Invalid pickleball.com player URL'}), 400
         
         # Extract player slug
-        match = re.search(r'pickleball\.com/players/([\w-]+)', url)
-        if not match:
+        if not slug_match:
             return jsonify({'error': 'Could not extract player name from URL'}), 400
         
-        player_slug = match.group(1)
-        
-        # Use rating-history URL where ratings are publicly visible
-        rating_history_url = f'https://pickleball.com/players/{player_slug}/rating-history'
-        
-        # Fetch the page
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(rating_history_url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            return jsonify({'error': f'Failed to fetch player page (status {response.status_code})'}), 400
+        player_slug = slug_match.group(1)
         
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract DUPR rating from the rating history page
-        page_text = response.text
-        
-        # Extract player name from slug
-        name_parts = player_slug.replace('-', ' ').title()
-        
-        # Try to extract from JSON data first (most reliable)
-        # Pattern 1: Look for currentDuprDoublesRating in JSON data
-        json_rating_match = re.search(r'"currentDuprDoublesRating":\s*([\d\.]+)', page_text)
-        if json_rating_match:
-            dupr_rating = float(json_rating_match.group(1))
-            return jsonify({
-                'dupr_rating': round(dupr_rating, 3),
-                'player_name': name_parts,
-                'player_slug': player_slug,
-                'source': 'json_data'
-            })
-        
-        # Pattern 2: Look for player name followed by rating in match history
-        # Format: "Clayton Truex 34 | M | Kirkland, WA, USA 4.919"
-        name_rating_match = re.search(rf'{re.escape(name_parts)}[^\d]+\d+\s*\|[^\d]+(\d+\.\d{{3}})', page_text, re.IGNORECASE)
-        if name_rating_match:
-            dupr_rating = float(name_rating_match.group(1))
-            return jsonify({
-                'dupr_rating': dupr_rating,
-                'player_name': name_parts,
-                'player_slug': player_slug,
-                'source': 'rating_history'
-            })
-        
-        # Pattern 3: Generic pattern - player name followed by a 3-decimal rating
-        generic_match = re.search(rf'{re.escape(name_parts)}[^\d]+(\d+\.\d{{3}})', page_text, re.IGNORECASE)
-        if generic_match:
-            dupr_rating = float(generic_match.group(1))
-            return jsonify({
-                'dupr_rating': dupr_rating,
-                'player_name': name_parts,
-                'player_slug': player_slug,
-                'source': 'rating_history'
-            })
+        # Fetch (or reuse a cached) rating from the rating-history page
+        result, cache_status, fetch_stats = pickleball.lookup_rating(player_slug)
         
         # If we couldn't extract the rating, return an error
-        return jsonify({
-            'error': f'Could not find DUPR rating for player {player_slug}. The player may not have any match history.',
-            'player_slug': player_slug
-        }), 404
-        
+        if result is None:
+            return jsonify({
+                'error': f'Could not find DUPR rating for player {player_slug}. The player may not have any match history.',
+                'player_slug': player_slug
+            }), 404
+        
+        response = jsonify(rating_response(result, player_slug, dupr_id))
+        response.headers['X-Cache'] = cache_status.upper()
+        if fetch_stats:
+            response.headers['X-Bytes-Read'] = str(fetch_stats['bytes_read'])
+            response.headers['X-Time-Saved-Ms'] = str(fetch_stats['time_saved_ms'])
+        return response
+        
+    except pickleball.UpstreamError as e:
+        return jsonify({'error': str(e)}), 400
     except requests.Timeout:
         return jsonify({'error': 'Request timed out while fetching player page'}), 500
     except Exception as e:
         return jsonify({'error': f'Error: {str(e)}'}), 500
 
-def fetch_dupr_rating_from_api(dupr_id):
-    """Attempt to fetch DUPR rating from DUPR's API or website"""
-    # Try mydupr.com API endpoints
-    api_urls = [
-        f'https://api.dupr.gg/player/{dupr_id}',
-        f'https://mydupr.com/api/player/{dupr_id}',
-    ]
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+def rating_response(result, player_slug, dupr_id):
+    """The same /scrape_dupr body whichever path found the rating"""
+    return {
+        'dupr_rating': result['dupr_rating'],
+        'player_name': pickleball.player_name_from_slug(player_slug) if player_slug else None,
+        'player_slug': player_slug,
+        'dupr_id': dupr_id or None,
+        'source': result['source'],
+        'source_url': result.get('source_url') or pickleball.rating_history_url(player_slug)
     }
-    
-    for api_url in api_urls:
-        try:
-            response = requests.get(api_url, headers=headers, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                # Try to extract doubles rating
-                if 'doubles' in data:
-                    return float(data['doubles'])
-                if 'rating' in data and 'doubles' in data['rating']:
-                    return float(data['rating']['doubles'])
-        except:
-            continue
-    
+
+def fetch_dupr_rating_from_api(dupr_id):
+    """
+    Attempt to fetch DUPR rating from DUPR's API endpoints
+
+    All endpoints are asked concurrently and the first valid answer wins (see
+    api/dupr_api.py), returns a result dict or None.
+    """
+    rating, source_url = dupr_api.fetch_rating(dupr_id)
+    if rating is None:
+        return None
+    return {'dupr_rating': round(rating, 3), 'source': 'dupr_api', 'source_url': source_url.format(dupr_id=dupr_id)}
+
+# Full-history scrapes run in the background; created on first use so the
+# gunicorn master never starts the job threads
+job_manager = None
+job_manager_lock = threading.Lock()  # Own lock: creating the manager never waits on a model load
+
+def get_job_manager():
+    global job_manager
+    if job_manager is None:
+        with job_manager_lock:
+            if job_manager is None:
+                job_manager = scrape_jobs.JobManager()
+    return job_manager
+
+@app.route('/scrape_jobs', methods=['GET', 'POST'])
+def scrape_job_submit():
+    """POST {"url" or "slug", "max_pages"} queues a full-history scrape; GET lists the jobs"""
+    manager = get_job_manager()
+    if request.method == 'GET':
+        return jsonify({'pid': os.getpid(), 'jobs': manager.list()})
+
+    data = json_body() or {}
+    slug = str(data.get('slug') or '').strip()
+    if not slug:
+        match = re.search(r'pickleball\.com/players/([\w-]+)', str(data.get('url') or ''))
+        if not match:
+            return jsonify({'error': 'Provide a pickleball.com player URL or slug'}), 400
+        slug = match.group(1)
+    if not re.fullmatch(r'[\w-]+', slug):
+        return jsonify({'error': 'Invalid player slug'}), 400
+    max_pages = data.get('max_pages')
+    if max_pages is not None and (not isinstance(max_pages, int) or max_pages < 1):
+        return jsonify({'error': 'max_pages must be a positive integer'}), 400
+
+    job, created = manager.submit(slug, max_pages)
+    body = dict(job, deduplicated=not created, events=f"/scrape_jobs/{job['job_id']}/events")
+    return jsonify(body), 202 if created else 200
+
+@app.route('/scrape_jobs/<job_id>')
+def scrape_job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job)
+
+@app.route('/scrape_jobs/<job_id>/events')
+def scrape_job_events(job_id):
+    """Server-Sent Events: queued, started, one "page" per page scraped, then done or failed"""
+    manager = get_job_manager()
+    if manager.get(job_id) is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', request.args.get('last_event_id', 0)))
+    except ValueError:
+        last_event_id = 0
+    response = Response(scrape_jobs.sse_events(manager, job_id, last_event_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def validate_scores(team1_score, team2_score):
+    """Return an error message if the score can't be a finished pickleball game, else None"""
+    if team1_score == team2_score:
+        return 'Tie games are not valid in pickleball. One team must win.'
+    if team1_score < 0 or team2_score < 0:
+        return 'Scores must be non-negative.'
     return None
 
+
+def parse_match(data):
+    """Pull the four ratings and two scores out of a request payload"""
+    ratings = [float(data[key]) for key in RATING_KEYS]
+    scores = [int(data['team1_score']), int(data['team2_score'])]
+    return ratings, scores
+
+
+def select_model(data):
+    """Look up the requested model (default to 1), returns (model_num, model_data)"""
+    model_num = int(data.get('model', 1))
+    models_dict = load_models()
+    if model_num not in models_dict:
+        model_num = 1
+    return model_num, models_dict[model_num]
+
+
+def predict_changes(model_data, ratings, scores):
+    """Predict rating changes for N matches, returns an (N, 4) array rounded like DUPR"""
+    with metrics.stage('features'):
+        X = build_feature_matrix(ratings, scores)
+    return changes_from_features(model_data, X)
+
+
+def changes_from_features(model_data, X):
+    """predict_changes() for an already built (N, 4, 14) feature matrix"""
+    n_matches = X.shape[0]
+
+    # One model call for every player in every match
+    with metrics.stage('predict'):
+        predictions = model_data['model'].predict(X.reshape(n_matches * 4, len(FEATURES)))
+
+    # Add back DUPR's deflation constant
+    predictions = predictions + model_data['deflation']
+
+    # Round to 3 decimal places like DUPR
+    return np.round(predictions, 3).reshape(n_matches, 4)
+
+
+def cached_predict_changes(model_num, model_data, all_ratings, all_scores):
+    """predict_changes() through the prediction cache - only cache misses reach the model"""
+    # The content version in the key keeps results from a swapped-out file from ever matching
+    keys = [(model_num, model_data['version'], *ratings, *scores) for ratings, scores in zip(all_ratings, all_scores)]
+    with metrics.stage('cache_lookup'):
+        changes = [prediction_cache.get(key) for key in keys]
+
+    missing = [i for i, c in enumerate(changes) if c is None]
+    if missing:
+        predicted = predict_changes(model_data, [all_ratings[i] for i in missing], [all_scores[i] for i in missing])
+        for i, row in zip(missing, predicted):
+            changes[i] = row
+            prediction_cache.put(keys[i], row)
+    return changes
+
+
+# Ensembles run the models in parallel threads only for big batches; below this
+# many rows per model the thread hand-off costs more than the predict itself
+ENSEMBLE_PARALLEL_ROWS = 4096
+ensemble_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ensemble')
+
+
+def ensemble_predict_changes(selected, all_ratings, all_scores):
+    """
+    Rating changes for N matches from several models, returns {model_num: list of (4,) rows}
+
+    Shares the prediction cache with /predict; the feature matrix is built once
+    for every match that any model still needs, and each model scores its own
+    misses from it.
+    """
+    keys = [(*ratings, *scores) for ratings, scores in zip(all_ratings, all_scores)]
+    with metrics.stage('cache_lookup'):
+        results = {num: [prediction_cache.get((num, selected[num]['version'], *key)) for key in keys]
+                   for num in selected}
+
+    missing = {num: [i for i, c in enumerate(rows) if c is None] for num, rows in results.items()}
+    needed = sorted(set().union(*missing.values()))
+    if not needed:
+        return results
+
+    with metrics.stage('features'):
+        X = build_feature_matrix([all_ratings[i] for i in needed], [all_scores[i] for i in needed])
+    position = {match: row for row, match in enumerate(needed)}
+
+    def score(num):
+        rows = [position[i] for i in missing[num]]
+        return num, changes_from_features(selected[num], X[rows])
+
+    work = [num for num in selected if missing[num]]
+    if len(needed) * 4 >= ENSEMBLE_PARALLEL_ROWS and len(work) > 1:
+        # sklearn and the big NumPy ops release the GIL, so large batches overlap
+        scored = list(ensemble_executor.map(score, work))
+    else:
+        scored = [score(num) for num in work]
+
+    for num, predicted in scored:
+        for i, row in zip(missing[num], predicted):
+            results[num][i] = row
+            prediction_cache.put((num, selected[num]['version'], *keys[i]), row)
+    return results
+
+
+def format_prediction(ratings, changes):
+    """Build the per-player response layout for one match"""
+    players = {}
+    for i, key in enumerate(RATING_KEYS):
+        players[key] = {
+            'rating_before': ratings[i],
+            'rating_change': float(changes[i]),
+            'rating_after': round(ratings[i] + changes[i], 3)
+        }
+    return {
+        'team1': {'player1': players['team1_player1'], 'player2': players['team1_player2']},
+        'team2': {'player1': players['team2_player1'], 'player2': players['team2_player2']}
+    }
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        data = request.json
-        
-        # Get model selection (default to 1)
-        model_num = int(data.get('model', 1))
-        models_dict = load_models()
-        if model_num not in models_dict:
-            model_num = 1
-        
-        model_data = models_dict[model_num]
-        model = model_data['model']
-        deflation = model_data['deflation']
-        
-        # Extract player ratings
-        team1_player1 = float(data['team1_player1'])
-        team1_player2 = float(data['team1_player2'])
-        team2_player1 = float(data['team2_player1'])
-        team2_player2 = float(data['team2_player2'])
-        
-        # Extract match info
-        team1_score = int(data['team1_score'])
-        team2_score = int(data['team2_score'])
-        
+        data = json_body()
+        model_num, model_data = select_model(data)
+        ratings, scores = parse_match(data)
+
         # Validate scores
-        if team1_score == team2_score:
-            return jsonify({'error': 'Tie games are not valid in pickleball. One team must win.'}), 400
-        if team1_score < 0 or team2_score < 0:
-            return jsonify({'error': 'Scores must be non-negative.'}), 400
-        
-        # Calculate match outcome
-        team1_won = 1 if team1_score > team2_score else 0
-        team2_won = 1 - team1_won
-        score_margin_t1 = team1_score - team2_score
-        score_margin_t2 = team2_score - team1_score
-        total_points = abs(score_margin_t1)
-        
-        # Calculate averages
-        opp_avg_for_t1 = (team2_player1 + team2_player2) / 2
-        opp_avg_for_t2 = (team1_player1 + team1_player2) / 2
-        
-        # Build feature vectors for each player
-        players = []
-        
-        # Team 1 Player 1
-        rating_diff = team1_player1 - opp_avg_for_t1
-        partner_diff = team1_player1 - team1_player2
-        team_avg = (team1_player1 + team1_player2) / 2
-        team_vs_opp = team_avg - opp_avg_for_t1
-        opp_spread = abs(team2_player1 - team2_player2)
-        won_x_rating_diff = team1_won * rating_diff
-        won_x_score_margin = team1_won * score_margin_t1
-        rating_squared = team1_player1 ** 2
-        expected_outcome = 1 / (1 + 10 ** ((opp_avg_for_t1 - team1_player1) / 4))
-        surprise = team1_won - expected_outcome
-        
-        players.append({
-            'name': 'Team 1 Player 1',
-            'features': [team1_won, rating_diff, score_margin_t1, total_points, partner_diff, team_vs_opp,
-                        won_x_rating_diff, won_x_score_margin, rating_squared, surprise, opp_spread,
-                        team1_player1, team1_player2, opp_avg_for_t1]
-        })
-        
-        # Team 1 Player 2
-        rating_diff = team1_player2 - opp_avg_for_t1
-        partner_diff = team1_player2 - team1_player1
-        won_x_rating_diff = team1_won * rating_diff
-        rating_squared = team1_player2 ** 2
-        expected_outcome = 1 / (1 + 10 ** ((opp_avg_for_t1 - team1_player2) / 4))
-        surprise = team1_won - expected_outcome
-        
-        players.append({
-            'name': 'Team 1 Player 2',
-            'features': [team1_won, rating_diff, score_margin_t1, total_points, partner_diff, team_vs_opp,
-                        won_x_rating_diff, won_x_score_margin, rating_squared, surprise, opp_spread,
-                        team1_player2, team1_player1, opp_avg_for_t1]
-        })
-        
-        # Team 2 Player 1
-        rating_diff = team2_player1 - opp_avg_for_t2
-        partner_diff = team2_player1 - team2_player2
-        team_avg = (team2_player1 + team2_player2) / 2
-        team_vs_opp = team_avg - opp_avg_for_t2
-        opp_spread = abs(team1_player1 - team1_player2)
-        won_x_rating_diff = team2_won * rating_diff
-        won_x_score_margin = team2_won * score_margin_t2
-        rating_squared = team2_player1 ** 2
-        expected_outcome = 1 / (1 + 10 ** ((opp_avg_for_t2 - team2_player1) / 4))
-        surprise = team2_won - expected_outcome
-        
-        players.append({
-            'name': 'Team 2 Player 1',
-            'features': [team2_won, rating_diff, score_margin_t2, total_points, partner_diff, team_vs_opp,
-                        won_x_rating_diff, won_x_score_margin, rating_squared, surprise, opp_spread,
-                        team2_player1, team2_player2, opp_avg_for_t2]
-        })
-        
-        # Team 2 Player 2
-        rating_diff = team2_player2 - opp_avg_for_t2
-        partner_diff = team2_player2 - team2_player1
-        won_x_rating_diff = team2_won * rating_diff
-        rating_squared = team2_player2 ** 2
-        expected_outcome = 1 / (1 + 10 ** ((opp_avg_for_t2 - team2_player2) / 4))
-        surprise = team2_won - expected_outcome
-        
-        players.append({
-            'name': 'Team 2 Player 2',
-            'features': [team2_won, rating_diff, score_margin_t2, total_points, partner_diff, team_vs_opp,
-                        won_x_rating_diff, won_x_score_margin, rating_squared, surprise, opp_spread,
-                        team2_player2, team2_player1, opp_avg_for_t2]
-        })
-        
-        # Predict for all players
-        X = np.array([p['features'] for p in players])
-        predictions = model.predict(X)
-        
-        # Add back DUPR's deflation constant
-        predictions = predictions + deflation
-        
-        # Round to 3 decimal places like DUPR
-        predictions = np.round(predictions, 3)
-        
+        error = validate_scores(*scores)
+        if error:
+            return jsonify({'error': error}), 400
+
+        changes = cached_predict_changes(model_num, model_data, [ratings], [scores])
+        return jsonify(format_prediction(ratings, changes[0]))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Predict rating changes for many matches with one model call"""
+    try:
+        data = json_body()
+        matches = data.get('matches')
+        if not isinstance(matches, list) or not matches:
+            return jsonify({'error': 'matches must be a non-empty list'}), 400
+
+        model_num, model_data = select_model(data)
+
+        all_ratings = []
+        all_scores = []
+        for i, match in enumerate(matches):
+            try:
+                ratings, scores = parse_match(match)
+            except (KeyError, TypeError, ValueError) as e:
+                return jsonify({'error': f'Match {i}: invalid or missing field {e}'}), 400
+            error = validate_scores(*scores)
+            if error:
+                return jsonify({'error': f'Match {i}: {error}'}), 400
+            all_ratings.append(ratings)
+            all_scores.append(scores)
+
+        changes = cached_predict_changes(model_num, model_data, all_ratings, all_scores)
         return jsonify({
-            'team1': {
-                'player1': {
-                    'rating_before': team1_player1,
-                    'rating_change': float(predictions[0]),
-                    'rating_after': round(team1_player1 + predictions[0], 3)
-                },
-                'player2': {
-                    'rating_before': team1_player2,
-                    'rating_change': float(predictions[1]),
-                    'rating_after': round(team1_player2 + predictions[1], 3)
-                }
-            },
-            'team2': {
-                'player1': {
-                    'rating_before': team2_player1,
-                    'rating_change': float(predictions[2]),
-                    'rating_after': round(team2_player1 + predictions[2], 3)
-                },
-                'player2': {
-                    'rating_before': team2_player2,
-                    'rating_change': float(predictions[3]),
-                    'rating_after': round(team2_player2 + predictions[3], 3)
+            'count': len(matches),
+            'predictions': [format_prediction(r, c) for r, c in zip(all_ratings, changes)]
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/predict_ensemble', methods=['POST'])
+def predict_ensemble():
+    """Every registered model (or the ones asked for) on one match or a list of matches
+
+    Optional "models": [1, 3] picks the models and "weights": {"1": 0.3, "3": 0.7}
+    weights the ensemble average (equal weights by default).
+    """
+    try:
+        data = json_body()
+        models_dict = load_models()
+        wanted = [int(m) for m in data.get('models') or sorted(models_dict)]
+        unknown = [m for m in wanted if m not in models_dict]
+        if unknown:
+            return jsonify({'error': f'Unknown model(s) {unknown}, available: {sorted(models_dict)}'}), 400
+        selected = {num: models_dict[num] for num in wanted}
+
+        raw_weights = data.get('weights') or {}
+        weights = np.array([float(raw_weights.get(str(num), raw_weights.get(num, 1.0))) for num in wanted])
+        if np.any(weights < 0) or weights.sum() <= 0:
+            return jsonify({'error': 'weights must be non-negative and not all zero'}), 400
+        weights = weights / weights.sum()
+
+        batch = 'matches' in data
+        matches = data['matches'] if batch else [data]
+        if not isinstance(matches, list) or not matches:
+            return jsonify({'error': 'matches must be a non-empty list'}), 400
+
+        all_ratings = []
+        all_scores = []
+        for i, match in enumerate(matches):
+            try:
+                ratings, scores = parse_match(match)
+            except (KeyError, TypeError, ValueError) as e:
+                return jsonify({'error': f'Match {i}: invalid or missing field {e}'}), 400
+            error = validate_scores(*scores)
+            if error:
+                return jsonify({'error': f'Match {i}: {error}' if batch else error}), 400
+            all_ratings.append(ratings)
+            all_scores.append(scores)
+
+        results = ensemble_predict_changes(selected, all_ratings, all_scores)
+
+        predictions = []
+        for i, ratings in enumerate(all_ratings):
+            per_model = np.array([results[num][i] for num in wanted])
+            ensemble = np.round(weights @ per_model, 3)
+            predictions.append({
+                'models': {str(num): format_prediction(ratings, results[num][i]) for num in wanted},
+                'ensemble': format_prediction(ratings, ensemble)
+            })
+
+        body = {'weights': {str(num): round(float(w), 4) for num, w in zip(wanted, weights)}}
+        if batch:
+            body.update(count=len(predictions), predictions=predictions)
+        else:
+            body.update(predictions[0])
+        return jsonify(body)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Upper bound on matches per /simulate request
+MAX_SIMULATION_MATCHES = int(os.environ.get('MAX_SIMULATION_MATCHES', '50000'))
+
+# format_prediction() slots in RATING_KEYS order
+SIMULATION_SLOTS = [('team1', 'player1'), ('team1', 'player2'), ('team2', 'player1'), ('team2', 'player2')]
+
+
+def parse_roster(roster):
+    """{name: rating} or [{"name", "rating"}] -> (names, ratings)"""
+    if isinstance(roster, dict):
+        items = list(roster.items())
+    elif isinstance(roster, list):
+        items = [(entry['name'], entry['rating']) for entry in roster]
+    else:
+        raise ValueError('roster must be an object of name -> rating or a list of {name, rating}')
+    names = [str(name) for name, _ in items]
+    if len(set(names)) != len(names):
+        raise ValueError('roster names must be unique')
+    return names, [float(rating) for _, rating in items]
+
+
+def parse_schedule(data, index):
+    """Player indices (M, 4) and scores (M, 2, NaN if not given) from the schedule or round_robin"""
+    if 'schedule' in data:
+        matches = data['schedule']
+        if not isinstance(matches, list):
+            raise ValueError('schedule must be a list of matches')
+    else:
+        options = data.get('round_robin') or {}
+        teams = options.get('teams')
+        if teams is None:
+            # Partner players up in roster order
+            names = list(index)
+            if len(names) % 2:
+                raise ValueError('round_robin without teams needs an even roster')
+            teams = [names[i:i + 2] for i in range(0, len(names), 2)]
+        cycles = int(options.get('cycles', 1))
+        matches = [{'team1': teams[a], 'team2': teams[b]}
+                   for pairs in tournament.round_robin(len(teams), cycles) for a, b in pairs]
+
+    if len(matches) > MAX_SIMULATION_MATCHES:
+        raise ValueError(f'at most {MAX_SIMULATION_MATCHES} matches per simulation')
+
+    players = np.empty((len(matches), 4), dtype=np.intp)
+    scores = np.full((len(matches), 2), np.nan)
+    for i, match in enumerate(matches):
+        teams = [match.get('team1'), match.get('team2')] if isinstance(match, dict) else []
+        # A string would otherwise be split into one-letter players
+        if len(teams) != 2 or not all(isinstance(team, (list, tuple)) for team in teams):
+            raise ValueError(f'Match {i}: team1 and team2 must be lists of player names')
+        try:
+            names = list(teams[0]) + list(teams[1])
+            if len(names) != 4 or len(set(names)) != 4:
+                raise ValueError('needs two teams of two different players')
+            players[i] = [index[name] for name in names]
+        except KeyError as e:
+            raise ValueError(f'Match {i}: {e} is not on the roster')
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Match {i}: {e}')
+        if 'team1_score' in match or 'team2_score' in match:
+            try:
+                match_scores = [int(match['team1_score']), int(match['team2_score'])]
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f'Match {i}: team1_score and team2_score are both required, as integers')
+            error = validate_scores(*match_scores)
+            if error:
+                raise ValueError(f'Match {i}: {error}')
+            scores[i] = match_scores
+    return players, scores
+
+
+@app.route('/simulate', methods=['POST'])
+def simulate():
+    """Project ratings after playing a schedule (or a generated round robin) in order
+
+    Each match uses the players' ratings after their earlier matches. Matches
+    without a score get a projected one (see api/tournament.py).
+    """
+    try:
+        start = time.perf_counter()
+        data = json_body()
+        model_num, model_data = select_model(data)
+        try:
+            names, start_ratings = parse_roster(data.get('roster'))
+            players, scores = parse_schedule(data, {name: i for i, name in enumerate(names)})
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        final, before, changes, scores, rounds = tournament.simulate(
+            lambda ratings, match_scores: predict_changes(model_data, ratings, match_scores),
+            start_ratings, players, scores)
+
+        played = np.bincount(players.ravel(), minlength=len(names))
+        body = {
+            'model': model_num,
+            'matches': len(players),
+            'rounds': rounds,
+            'players': {
+                name: {
+                    'rating_before': start_ratings[i],
+                    'rating_after': float(final[i]),
+                    'rating_change': round(float(final[i]) - start_ratings[i], 3),
+                    'matches_played': int(played[i])
                 }
+                for i, name in enumerate(names)
             }
+        }
+        if data.get('include_matches'):
+            body['schedule'] = []
+            for match_players, match_scores, match_before, match_changes in zip(players, scores, before, changes):
+                match = format_prediction(match_before.tolist(), match_changes)
+                for (team, player), p in zip(SIMULATION_SLOTS, match_players):
+                    match[team][player]['name'] = names[p]
+                match.update(team1_score=int(match_scores[0]), team2_score=int(match_scores[1]))
+                body['schedule'].append(match)
+        body['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return jsonify(body)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/score_csv', methods=['POST'])
+def score_csv():
+    """Score an uploaded scraper CSV, streaming one NDJSON line per row
+
+    Send the CSV as the request body (text/csv) or as a multipart "file" field;
+    ?model=N picks the model. Lines carry "predicted" changes in RATING_KEYS
+    order, plus "actual" and "residual" when the file has the real changes.
+    A final {"summary": ...} line has row counts and the MAE.
+    """
+    upload = None
+    try:
+        model_num, model_data = select_model(request.args)
+        chunk_rows = max(1, min(int(request.args.get('chunk_rows', csv_scoring.CHUNK_ROWS)), 100000))
+        if request.mimetype == 'multipart/form-data':
+            if 'file' not in request.files:
+                return jsonify({'error': 'multipart upload needs a "file" field'}), 400
+            # Werkzeug closes request.files when the view returns, before the body streams,
+            # so move the (already spooled) upload to a temp file this response owns
+            stream = upload = tempfile.TemporaryFile()
+            shutil.copyfileobj(request.files['file'].stream, upload)
+            upload.seek(0)
+        else:
+            stream = request.stream
+        reader = csv_scoring.csv_reader(stream)
+        try:
+            columns = csv_scoring.read_header(reader)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+    def lines():
+        try:
+            yield from csv_scoring.stream_scores(reader, columns, lambda ratings, scores: predict_changes(model_data, ratings, scores),
+                                                 chunk_rows=chunk_rows)
+        finally:
+            if upload is not None:
+                upload.close()
+
+    response = Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+    response.headers['X-Model'] = str(model_num)
+    return response
+
+# Every plausible final score (games to 11 or 15, win by 2) and its mirror, as (team1, team2)
+WINNING_SCORES = [(11, loser) for loser in range(10)] + [(15, loser) for loser in range(14)]
+SCORE_TABLE_PAIRS = WINNING_SCORES + [(loser, winner) for winner, loser in WINNING_SCORES]
+
+@app.route('/score_table', methods=['GET', 'POST'])
+def score_table():
+    """Predicted rating changes for every plausible final score of one matchup
+
+    Accepts the four ratings (and optional model) as JSON or as query parameters.
+    GET responses carry an ETag that covers the model version, with no-cache so
+    browsers revalidate (a cheap 304) and a hot-reloaded model shows up at once.
+    """
+    try:
+        data = request.args if request.method == 'GET' else json_body()
+        # request.args raises a KeyError whose message doesn't name the key, so check up front
+        missing = [key for key in RATING_KEYS if key not in data]
+        if missing:
+            return jsonify({'error': f"Missing field(s) {', '.join(missing)}"}), 400
+        model_num, model_data = select_model(data)
+        ratings = [float(data[key]) for key in RATING_KEYS]
+
+        # All score pairs in one batched model call (cached entries are reused)
+        scores = [list(pair) for pair in SCORE_TABLE_PAIRS]
+        changes = cached_predict_changes(model_num, model_data, [ratings] * len(scores), scores)
+
+        table = []
+        for (team1_score, team2_score), row in zip(SCORE_TABLE_PAIRS, changes):
+            entry = {'team1_score': team1_score, 'team2_score': team2_score}
+            entry.update(format_prediction(ratings, row))
+            table.append(entry)
+
+        response = jsonify({
+            'model': model_num,
+            'model_version': model_data['version'],
+            'ratings': dict(zip(RATING_KEYS, ratings)),
+            'scores': table
         })
-        
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        response.add_etag()
+        return response.make_conditional(request)
+
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid or missing field {e}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -0,0 +1,147 @@
+"""
+Pickle-free model artifacts (.dupr files)
+
+A .dupr file holds one flattened model (see api/trees.py) plus its feature list
+and deflation constant, laid out so it can be memory-mapped read-only:
+
+    8 bytes   magic b'DUPRMDL\\0'
+    4 bytes   format version (uint32, little-endian)
+    4 bytes   header length (uint32, little-endian)
+    header    UTF-8 JSON: kind, model type, features, deflation, scalars, and
+              {name: {dtype, shape, offset}} for every array
+    arrays    raw little-endian data, each starting on a 64-byte boundary
+
+Arrays are stored in the dtypes the evaluator uses, so loading is just views
+over the mapping: nothing is unpickled or copied, sklearn is never imported,
+and every gunicorn worker shares the same page-cache copy of the file.
+
+Files are written to a temporary name and renamed into place. Never rewrite a
+.dupr file in place - processes that have it mapped would see the new bytes.
+"""
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from api.trees import FlatLinearModel, FlatTreeEnsemble, compile_model
+
+MAGIC = b'DUPRMDL\0'
+FORMAT_VERSION = 1
+ALIGN = 64
+SUFFIX = '.dupr'
+
+# Index arrays the evaluator wants as np.intp
+INDEX_ARRAYS = ('feature', 'left', 'roots')
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_artifact(path, model, features, deflation):
+    """Write a fitted sklearn model (or an api.trees flat model) to `path` atomically"""
+    flat = model if isinstance(model, (FlatTreeEnsemble, FlatLinearModel)) else compile_model(model, keep_estimator=False)
+    header = {
+        'model_type': type(model).__name__,
+        'features': list(features),
+        'deflation': float(deflation),
+        'n_features': int(flat.n_features),
+    }
+    if isinstance(flat, FlatTreeEnsemble):
+        header.update(kind='trees', base=float(flat.base), max_depth=int(flat.max_depth))
+        arrays = {
+            'feature': flat.feature.astype(np.intp),
+            'threshold': flat.threshold.astype(np.float32),
+            'left': flat.left.astype(np.intp),
+            'value': flat.value.astype(np.float64),
+            'roots': flat.roots.astype(np.intp),
+        }
+    else:
+        header.update(kind='linear', intercept=float(flat.intercept))
+        arrays = {'coef': flat.coef.astype(np.float64)}
+
+    # Lay out the arrays after a header padded to the alignment
+    layout = {}
+    header['arrays'] = layout
+    for _ in range(2):
+        # Offsets depend on the header size, which depends on the offsets: settle in two passes
+        header_bytes = json.dumps(header, sort_keys=True).encode()
+        offset = _aligned(16 + len(header_bytes) + ALIGN)
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout[name] = {'dtype': array.dtype.newbyteorder('<').str, 'shape': list(array.shape), 'offset': offset}
+            offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header, sort_keys=True).encode()
+    data_start = min(spec['offset'] for spec in layout.values())
+    assert 16 + len(header_bytes) <= data_start
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + struct.pack('<II', FORMAT_VERSION, len(header_bytes)) + header_bytes)
+            for name, array in arrays.items():
+                f.write(b'\0' * (layout[name]['offset'] - f.tell()))
+                f.write(np.ascontiguousarray(array, dtype=layout[name]['dtype']).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def read_header(mapped):
+    """(format version, header dict) of a mapped .dupr file"""
+    if len(mapped) < 16 or bytes(mapped[:8]) != MAGIC:
+        raise ValueError('not a .dupr model artifact')
+    version, header_len = struct.unpack('<II', bytes(mapped[8:16]))
+    if version > FORMAT_VERSION:
+        raise ValueError(f'artifact format version {version} is newer than supported ({FORMAT_VERSION})')
+    return version, json.loads(bytes(mapped[16:16 + header_len]))
+
+
+def load_artifact(path):
+    """
+    Memory-map a .dupr file into the model_data layout the API serves from
+
+    The model's arrays are read-only views over the mapping. 'estimator' is None
+    since no sklearn object exists; the registry attaches one from the .pkl next
+    to the file, if there is one, for large batches.
+    """
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    _, header = read_header(mapped)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        if spec['offset'] + count * dtype.itemsize > len(mapped):
+            raise ValueError(f'array {name!r} runs past the end of {path}')
+        array = np.ndarray(spec['shape'], dtype=dtype, buffer=mapped, offset=spec['offset'])
+        if name in INDEX_ARRAYS and dtype != np.intp:
+            array = array.astype(np.intp)   # only on platforms where intp isn't int64
+        arrays[name] = array
+
+    if len(header['features']) != header['n_features']:
+        raise ValueError(f"{path}: {len(header['features'])} feature names for {header['n_features']} features")
+
+    if header['kind'] == 'trees':
+        model = FlatTreeEnsemble(base=header['base'], max_depth=header['max_depth'], n_features=header['n_features'], **arrays)
+    elif header['kind'] == 'linear':
+        model = FlatLinearModel(coef=arrays['coef'], intercept=header['intercept'], n_features=header['n_features'])
+    else:
+        raise ValueError(f"unknown model kind {header['kind']!r} in {path}")
+
+    return {
+        'estimator': None,
+        'model_type': header['model_type'],
+        'features': header['features'],
+        'deflation': header['deflation'],
+        'model': model
+    }
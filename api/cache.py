@@ -0,0 +1,146 @@
+"""
+In-process caches for the API
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with hit/miss counters
+
+    Nothing is invalidated here: callers put whatever identifies the producer
+    in the key (the API uses each model's content version), so a reloaded
+    model's results never match old entries, and those age out like any other.
+    A reload of one model leaves every other model's entries in place.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value (marking it recently used), or None on a miss"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class TTLCache:
+    """Thread-safe cache with stale-while-revalidate expiry
+
+    Entries are fresh for `ttl` seconds. For `stale_ttl` seconds after that they
+    are still served, but the first stale hit kicks off a background reload so
+    the next caller gets a fresh value. Older entries are reloaded inline.
+    """
+
+    def __init__(self, ttl, stale_ttl, maxsize):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._data = OrderedDict()   # key -> (stored_at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """
+        Return (value, status) where status is 'hit', 'stale' or 'miss'
+
+        `loader(key)` is called to fill misses; a None result is returned but not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl:
+                    self.hits += 1
+                    return entry[1], 'hit'
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry[1], 'stale'
+            self.misses += 1
+
+        value = loader(key)
+        if value is not None:
+            self.put(key, value)
+        return value, 'miss'
+
+    def _refresh(self, key, loader):
+        try:
+            value = loader(key)
+            if value is not None:
+                self.put(key, value)
+                with self._lock:
+                    self.refreshes += 1
+        except Exception:
+            # Keep serving the stale value; the next stale hit will retry
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'hit_ratio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
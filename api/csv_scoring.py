@@ -0,0 +1,161 @@
+"""
+Streaming scorer for scraped match CSVs (the DUPRScraper._structure_match_data schema)
+
+The upload is read in fixed-size byte blocks and parsed CHUNK_ROWS rows at a
+time; each chunk becomes NumPy arrays, one feature matrix and one model call,
+and its NDJSON lines are handed back before the next chunk is read. Memory
+use depends on the chunk size, not the file size.
+"""
+import codecs
+import csv
+import json
+
+import numpy as np
+
+from api.features import RATING_BEFORE_COLUMNS, RATING_CHANGE_COLUMNS, SCORE_COLUMNS
+
+READ_BLOCK_BYTES = 64 * 1024
+CHUNK_ROWS = 5000
+
+REQUIRED_COLUMNS = RATING_BEFORE_COLUMNS + SCORE_COLUMNS
+
+
+def iter_lines(stream, block_size=READ_BLOCK_BYTES):
+    """Decoded text lines (newlines kept) from any object with read(n)"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    pending = ''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        # Split on \n only (csv handles \r\n); the last piece may be a partial line
+        *lines, pending = (pending + decoder.decode(block)).split('\n')
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def read_header(reader):
+    """Column name -> index, raising ValueError if the scoring inputs are missing"""
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ValueError('empty CSV')
+    except csv.Error as e:
+        raise ValueError(f'bad CSV header: {e}')
+    columns = {name.strip(): i for i, name in enumerate(header)}
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f'missing columns: {", ".join(missing)}')
+    return columns
+
+
+def iter_chunks(reader, chunk_rows=CHUNK_ROWS):
+    """Lists of at most chunk_rows CSV rows"""
+    chunk = []
+    for row in reader:
+        if not row:
+            continue
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def column_array(rows, index):
+    """Float array of one column, blanks and junk as NaN"""
+    if index is None:
+        return np.full(len(rows), np.nan)
+    values = [row[index] if index < len(row) and row[index] else 'nan' for row in rows]
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        # Some cell isn't a number - fall back to converting one at a time
+        out = np.full(len(rows), np.nan)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except ValueError:
+                pass
+        return out
+
+
+def chunk_arrays(rows, columns):
+    """(ratings (N, 4), actual changes (N, 4), scores (N, 2)) for a chunk of rows"""
+    def block(names):
+        return np.column_stack([column_array(rows, columns.get(name)) for name in names])
+    return block(RATING_BEFORE_COLUMNS), block(RATING_CHANGE_COLUMNS), block(SCORE_COLUMNS)
+
+
+def score_chunk(rows, columns, first_row, predict_changes):
+    """
+    NDJSON lines for one chunk, plus (scored, skipped, sum of absolute residuals, residual count)
+
+    Rows without all four ratings and a decided game 1 score get an "error" line.
+    Residuals (actual - predicted) are included when all four actual changes are present.
+    """
+    ratings, actual, scores = chunk_arrays(rows, columns)
+    usable = ~np.isnan(ratings).any(axis=1) & ~np.isnan(scores).any(axis=1) & (scores[:, 0] != scores[:, 1])
+
+    predicted = np.full((len(rows), 4), np.nan)
+    if usable.any():
+        predicted[usable] = predict_changes(ratings[usable], scores[usable].astype(int))
+    has_actual = usable & ~np.isnan(actual).any(axis=1)
+    residual = np.round(actual - predicted, 3)
+
+    lines = []
+    for i in range(len(rows)):
+        entry = {'row': first_row + i}
+        if not usable[i]:
+            incomplete = np.isnan(scores[i]).any() or np.isnan(ratings[i]).any()
+            entry['error'] = 'missing rating or game 1 score' if incomplete else 'tied game 1 score'
+        else:
+            entry['predicted'] = predicted[i].tolist()
+            if has_actual[i]:
+                entry['actual'] = actual[i].tolist()
+                entry['residual'] = residual[i].tolist()
+        lines.append(json.dumps(entry) + '\n')
+
+    abs_residuals = np.abs(residual[has_actual])
+    return ''.join(lines), int(usable.sum()), int((~usable).sum()), float(abs_residuals.sum()), abs_residuals.size
+
+
+def stream_scores(reader, columns, predict_changes, chunk_rows=CHUNK_ROWS):
+    """Yield NDJSON text per chunk, then a final {"summary": ...} line"""
+    rows_seen = 0
+    scored = skipped = 0
+    abs_sum = 0.0
+    abs_count = 0
+    error = None
+    chunks = iter_chunks(reader, chunk_rows)
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            # Headers are long gone, so report it in-band and stop
+            error = f'CSV parse error at line {reader.line_num}: {e}'
+            break
+        text, chunk_scored, chunk_skipped, chunk_abs, chunk_count = score_chunk(chunk, columns, rows_seen, predict_changes)
+        rows_seen += len(chunk)
+        scored += chunk_scored
+        skipped += chunk_skipped
+        abs_sum += chunk_abs
+        abs_count += chunk_count
+        yield text
+
+    summary = {'rows': rows_seen, 'scored': scored, 'skipped': skipped}
+    if error:
+        summary['error'] = error
+    if abs_count:
+        summary['mae'] = round(abs_sum / abs_count, 4)
+    yield json.dumps({'summary': summary}) + '\n'
+
+
+def csv_reader(stream):
+    return csv.reader(iter_lines(stream))
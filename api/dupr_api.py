@@ -0,0 +1,236 @@
+"""
+DUPR rating lookups by DUPR ID from DUPR's JSON endpoints
+
+Every candidate endpoint is asked at once and the first valid doubles rating
+wins, so a lookup costs the fastest endpoint's latency instead of the sum of
+the timeouts. Per-endpoint latency is tracked as an EWMA; endpoints that are
+much slower than the best one (or keep failing) are demoted and only asked
+if nothing faster has answered after HEDGE_DELAY.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from api import metrics
+
+# URL templates, comma separated in DUPR_API_URLS; `{dupr_id}` is filled in
+DEFAULT_URLS = [
+    'https://api.dupr.gg/player/{dupr_id}',
+    'https://mydupr.com/api/player/{dupr_id}',
+]
+API_URLS = [url.strip() for url in os.environ.get('DUPR_API_URLS', ','.join(DEFAULT_URLS)).split(',') if url.strip()]
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+REQUEST_TIMEOUT = 5
+
+# Demotion: slower than DEMOTE_FACTOR x the best EWMA, or this many failures in a row
+EWMA_ALPHA = 0.3
+DEMOTE_FACTOR = 3.0
+DEMOTE_FAILURES = 3
+HEDGE_DELAY = 0.5
+
+# IDs every endpoint answered without a rating for are remembered this long, so
+# repeat requests go straight to the HTML fallback instead of waiting out
+# REQUEST_TIMEOUT again. Timeouts, transport errors and 5xx are not misses: an
+# outage must not turn valid IDs into 404s.
+MISS_TTL = float(os.environ.get('DUPR_API_MISS_TTL', '60'))
+MISS_CACHE_SIZE = 5000
+
+session = requests.Session()
+session.headers.update(HEADERS)
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dupr-api')
+
+
+class EndpointStats:
+    """Latency and outcome counters for one endpoint template"""
+
+    def __init__(self):
+        self.ewma_ms = None
+        self.requests = 0
+        self.wins = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, ok):
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self.requests += 1
+            # Failures count toward latency too: a timeout is as slow as it looks
+            if self.ewma_ms is None:
+                self.ewma_ms = elapsed_ms
+            else:
+                self.ewma_ms += EWMA_ALPHA * (elapsed_ms - self.ewma_ms)
+            if ok:
+                self.consecutive_failures = 0
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def as_dict(self):
+        return {
+            'ewma_ms': round(self.ewma_ms, 2) if self.ewma_ms is not None else None,
+            'requests': self.requests,
+            'wins': self.wins,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures
+        }
+
+
+endpoint_stats = {}
+_stats_lock = threading.Lock()
+
+recent_misses = OrderedDict()   # dupr_id -> monotonic time of the failed lookup
+miss_totals = {'remembered': 0, 'skipped': 0}
+_misses_lock = threading.Lock()
+
+
+def recently_missed(dupr_id):
+    with _misses_lock:
+        missed_at = recent_misses.get(dupr_id)
+        if missed_at is None:
+            return False
+        if time.monotonic() - missed_at >= MISS_TTL:
+            del recent_misses[dupr_id]
+            return False
+        miss_totals['skipped'] += 1
+        return True
+
+
+def remember_miss(dupr_id):
+    with _misses_lock:
+        recent_misses[dupr_id] = time.monotonic()
+        recent_misses.move_to_end(dupr_id)
+        while len(recent_misses) > MISS_CACHE_SIZE:
+            recent_misses.popitem(last=False)
+        miss_totals['remembered'] += 1
+
+
+def stats_for(url_template):
+    with _stats_lock:
+        if url_template not in endpoint_stats:
+            endpoint_stats[url_template] = EndpointStats()
+        return endpoint_stats[url_template]
+
+
+def is_demoted(url_template):
+    stats = stats_for(url_template)
+    if stats.consecutive_failures >= DEMOTE_FAILURES:
+        return True
+    known = [s.ewma_ms for s in endpoint_stats.values() if s.ewma_ms is not None and s.consecutive_failures < DEMOTE_FAILURES]
+    if stats.ewma_ms is None or not known:
+        return False
+    return stats.ewma_ms > DEMOTE_FACTOR * min(known)
+
+
+def parse_rating(data):
+    """Pull the doubles rating out of an endpoint's JSON, or None"""
+    if not isinstance(data, dict):
+        return None
+    if 'doubles' in data:
+        return float(data['doubles'])
+    if isinstance(data.get('rating'), dict) and 'doubles' in data['rating']:
+        return float(data['rating']['doubles'])
+    return None
+
+
+def fetch_from(url_template, dupr_id, cancelled):
+    """
+    Ask one endpoint; never raises
+
+    Returns (rating or None, answered) - answered is True when the endpoint
+    gave a definite reply (a 404, or a 200 with JSON), so a None rating there
+    means it has no rating for the ID rather than that it couldn't be asked.
+    """
+    if cancelled.is_set():
+        return None, False
+    start = time.perf_counter()
+    rating = None
+    answered = False
+    try:
+        response = session.get(url_template.format(dupr_id=dupr_id), timeout=REQUEST_TIMEOUT)
+        metrics.upstream_responses.inc(upstream='dupr_api', status=response.status_code)
+        if response.status_code == 200:
+            rating = parse_rating(response.json())
+            answered = True
+        elif response.status_code == 404:
+            answered = True
+    except requests.RequestException:
+        metrics.upstream_responses.inc(upstream='dupr_api', status='error')
+    except ValueError:
+        pass
+    # A result that lost the race still counts for the latency stats
+    stats_for(url_template).record(time.perf_counter() - start, rating is not None)
+    return rating, answered
+
+
+def fetch_rating(dupr_id, urls=None, timeout=REQUEST_TIMEOUT):
+    """
+    Ask every endpoint concurrently, returns (rating, winning url template) or (None, None)
+
+    Demoted endpoints are held back for HEDGE_DELAY. Once a rating arrives,
+    queued requests are cancelled; ones already in flight finish in the
+    background and only update the stats. An ID that every endpoint answered
+    without a rating within the last MISS_TTL seconds returns (None, None)
+    without asking again.
+    """
+    if recently_missed(dupr_id):
+        return None, None
+    with metrics.stage('dupr_api'):
+        rating, url, all_answered = _fetch_first(dupr_id, urls, timeout)
+    if rating is None and all_answered:
+        remember_miss(dupr_id)
+    return rating, url
+
+
+def _fetch_first(dupr_id, urls, timeout):
+    """(rating, url, whether every endpoint answered) - the last is only meaningful without a rating"""
+    urls = list(urls or API_URLS)
+    primary = [url for url in urls if not is_demoted(url)] or urls
+    hedged = [url for url in urls if url not in primary]
+
+    cancelled = threading.Event()
+    pending = {_executor.submit(fetch_from, url, dupr_id, cancelled): url for url in primary}
+    deadline = time.monotonic() + timeout
+    hedge_at = time.monotonic() + HEDGE_DELAY
+
+    all_answered = True
+    try:
+        while pending or hedged:
+            now = time.monotonic()
+            if now >= deadline:
+                all_answered = False
+                break
+            if hedged and (now >= hedge_at or not pending):
+                for url in hedged:
+                    pending[_executor.submit(fetch_from, url, dupr_id, cancelled)] = url
+                hedged = []
+            wait_until = min(deadline, hedge_at) if hedged else deadline
+            done, _ = wait(pending, timeout=max(0.0, wait_until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                rating, answered = future.result()
+                if rating is not None:
+                    stats_for(url).record_win()
+                    return rating, url, True
+                all_answered = all_answered and answered
+        return None, None, all_answered
+    finally:
+        cancelled.set()
+        for future in pending:
+            future.cancel()
+
+
+def stats():
+    return {url: dict(stats_for(url).as_dict(), demoted=is_demoted(url)) for url in API_URLS}
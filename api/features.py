@@ -0,0 +1,120 @@
+"""
+Feature engineering shared by the API, training and analysis scripts
+
+Everything here works on whole NumPy arrays of matches so the API and the
+training scripts build bit-identical feature rows from the same code.
+"""
+import numpy as np
+
+# Feature order matches deep_analysis.py 'All_Features'
+FEATURES = ['won', 'rating_diff', 'score_margin', 'total_points', 'partner_diff', 'team_vs_opp',
+            'won_x_rating_diff', 'won_x_score_margin', 'rating_squared', 'surprise', 'opp_spread',
+            'player_rating', 'partner_rating', 'opp_avg']
+
+# The four players of a match, in the row order used by build_feature_matrix
+RATING_KEYS = ['team1_player1', 'team1_player2', 'team2_player1', 'team2_player2']
+
+# Scraper CSV columns (see DUPRScraper._structure_match_data)
+RATING_BEFORE_COLUMNS = [f'{key}_rating_before' for key in RATING_KEYS]
+RATING_CHANGE_COLUMNS = [f'{key}_rating_change' for key in RATING_KEYS]
+SCORE_COLUMNS = ['game1_team1_score', 'game1_team2_score']
+
+# Column gathers that turn one match into four per-player rows
+# (T1P1, T1P2, T2P1, T2P2): who the player is, their partner, and their opponents
+PLAYER_IDX = [0, 1, 2, 3]
+PARTNER_IDX = [1, 0, 3, 2]
+OPP1_IDX = [2, 2, 0, 0]
+OPP2_IDX = [3, 3, 1, 1]
+OWN_SCORE_IDX = [0, 0, 1, 1]
+OPP_SCORE_IDX = [1, 1, 0, 0]
+
+
+def build_feature_matrix(ratings, scores):
+    """
+    Build the FEATURES matrix for N matches in one vectorized pass
+
+    Args:
+        ratings: (N, 4) array of ratings ordered like RATING_KEYS
+        scores: (N, 2) array of (team1_score, team2_score)
+
+    Returns:
+        (N, 4, 14) array - one row per player, players ordered like RATING_KEYS
+    """
+    ratings = np.asarray(ratings, dtype=float).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=float).reshape(-1, 2)
+
+    player = ratings[:, PLAYER_IDX]
+    partner = ratings[:, PARTNER_IDX]
+    opp1 = ratings[:, OPP1_IDX]
+    opp2 = ratings[:, OPP2_IDX]
+    own_score = scores[:, OWN_SCORE_IDX]
+    opp_score = scores[:, OPP_SCORE_IDX]
+
+    won = (own_score > opp_score).astype(float)
+    score_margin = own_score - opp_score
+    total_points = np.abs(score_margin)
+    opp_avg = (opp1 + opp2) / 2
+    rating_diff = player - opp_avg
+    partner_diff = player - partner
+    team_vs_opp = (player + partner) / 2 - opp_avg
+    opp_spread = np.abs(opp1 - opp2)
+    expected_outcome = 1 / (1 + 10 ** ((opp_avg - player) / 4))
+
+    # Stack in FEATURES order
+    return np.stack([
+        won, rating_diff, score_margin, total_points, partner_diff, team_vs_opp,
+        won * rating_diff, won * score_margin, player ** 2, won - expected_outcome, opp_spread,
+        player, partner, opp_avg
+    ], axis=-1)
+
+
+def match_arrays(rows):
+    """
+    Pull the model inputs out of scraper match rows
+
+    Args:
+        rows: DataFrame or dict of column -> values in the scraper CSV schema
+
+    Returns:
+        (ratings, changes, scores) - (N, 4) ratings before, (N, 4) rating changes
+        and (N, 2) game 1 scores, with missing values as NaN
+    """
+    def column(name):
+        return np.asarray(rows[name], dtype=float)
+
+    ratings = np.column_stack([column(c) for c in RATING_BEFORE_COLUMNS])
+    changes = np.column_stack([column(c) for c in RATING_CHANGE_COLUMNS])
+    scores = np.column_stack([column(c) for c in SCORE_COLUMNS])
+    return ratings, changes, scores
+
+
+def training_arrays(rows, remove_deflation=False):
+    """
+    Turn scraper match rows into per-player training data
+
+    Matches without a game 1 score are dropped, as are players with a missing
+    rating or rating change. Rows come out match by match in RATING_KEYS order.
+
+    Args:
+        rows: DataFrame or dict of column -> values in the scraper CSV schema
+        remove_deflation: Subtract each match's mean rating change from its players' targets
+
+    Returns:
+        (X, y, deflations) - (M, 14) features, (M,) rating changes and the
+        per-player deflation of every match that had a score
+    """
+    ratings, changes, scores = match_arrays(rows)
+
+    scored = ~np.isnan(scores).any(axis=1)
+    ratings, changes, scores = ratings[scored], changes[scored], scores[scored]
+
+    # Match-level deflation (total of all 4 rating changes, shared per player)
+    deflations = changes.sum(axis=1) / 4
+
+    targets = changes
+    if remove_deflation:
+        targets = changes - deflations[:, None]
+
+    X = build_feature_matrix(ratings, scores)
+    keep = ~(np.isnan(ratings) | np.isnan(changes))
+    return X[keep], targets[keep], deflations
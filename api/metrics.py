@@ -0,0 +1,174 @@
+"""
+Lightweight Prometheus-style metrics for the API
+
+No client library needed: counters and histograms are plain dicts keyed by
+label values behind one lock each, and `render()` writes the Prometheus text
+exposition format for /metrics. Recording a sample is a bisect and two
+additions, cheap enough to leave on for every request.
+
+Values are per process - under gunicorn each worker reports its own.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds; spans cached predictions (~50 us) up to upstream timeouts
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}   # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels):
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                yield self.name + '_bucket', _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))]), cumulative
+            yield self.name + '_sum', _format_labels(self.labelnames, key), series[-1]
+            yield self.name + '_count', _format_labels(self.labelnames, key), cumulative
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time
+
+    `read()` returns a number, or a dict of {label values tuple: number}.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, help, read, labelnames=()):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def samples(self):
+        value = self.read()
+        if value is None:
+            return
+        if not isinstance(value, dict):
+            value = {(): value}
+        for key, number in sorted(value.items()):
+            if number is not None:
+                yield self.name, _format_labels(self.labelnames, key), number
+
+
+class CounterFunc(Gauge):
+    """Counter read from a callback, for totals another object already keeps"""
+    kind = 'counter'
+
+
+def render():
+    """Every registered metric in Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples():
+            lines.append(f'{name}{labels} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# Shared metrics used across the api package
+request_seconds = Histogram('dupr_http_request_duration_seconds', 'Request latency by endpoint', ['endpoint', 'method', 'status'])
+stage_seconds = Histogram('dupr_stage_duration_seconds', 'Time spent in each stage of request handling', ['endpoint', 'stage'])
+upstream_responses = Counter('dupr_upstream_responses_total', 'Upstream HTTP responses by status code ("error" for no response)', ['upstream', 'status'])
+
+# Endpoint of the request being handled on this thread, for stage labels
+_current = threading.local()
+
+
+def set_endpoint(endpoint):
+    _current.endpoint = endpoint
+
+
+def observe_stage(name, seconds):
+    """Record a stage duration measured by the caller (e.g. summed over a loop)"""
+    stage_seconds.observe(seconds, endpoint=getattr(_current, 'endpoint', None) or 'background', stage=name)
+
+
+class stage:
+    """Time a block into dupr_stage_duration_seconds under the current endpoint
+
+    A plain class rather than @contextmanager to keep per-block overhead down (~4 us).
+    """
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        observe_stage(self.name, time.perf_counter() - self.start)
@@ -0,0 +1,222 @@
+"""
+DUPR rating lookups from pickleball.com player pages
+
+All requests share one pooled keep-alive session, and extracted ratings are
+cached per player slug (see TTLCache for the stale-while-revalidate rules).
+Pages are read as a stream and the download stops as soon as the embedded
+rating JSON has gone past.
+"""
+import codecs
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api import metrics
+from api.singleflight import SingleFlight
+from api.cache import TTLCache
+
+# Overridable so tests and benchmarks can point at a local stand-in site
+BASE_URL = os.environ.get('PICKLEBALL_BASE_URL', 'https://pickleball.com')
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+REQUEST_TIMEOUT = 10
+
+# Streaming extraction: read size, how much text to carry across chunk
+# boundaries, and how much of a body we'd rather drain (to keep the pooled
+# connection reusable) than abandon
+STREAM_CHUNK_SIZE = 16 * 1024
+STREAM_OVERLAP = 64
+DRAIN_LIMIT = 64 * 1024
+
+JSON_RATING_PATTERN = re.compile(r'"currentDuprDoublesRating":\s*([\d\.]+)')
+
+# One pooled session per process: DNS, TCP and TLS setup are paid once per
+# connection instead of once per lookup
+session = requests.Session()
+session.headers.update(HEADERS)
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(os.environ.get('PICKLEBALL_POOL_SIZE', '16')))
+session.mount('https://', _adapter)
+session.mount('http://', _adapter)
+
+# Ratings only move when DUPR processes new matches, so minutes-old values are fine
+rating_cache = TTLCache(
+    ttl=float(os.environ.get('RATING_CACHE_TTL', '600')),
+    stale_ttl=float(os.environ.get('RATING_CACHE_STALE', '3600')),
+    maxsize=int(os.environ.get('RATING_CACHE_SIZE', '5000'))
+)
+
+# Concurrent misses for the same player share one fetch. RATING_LOCK_DIR (a
+# local directory) extends that across gunicorn workers on the same host.
+rating_flight = SingleFlight(lock_dir=os.environ.get('RATING_LOCK_DIR') or None,
+                             result_ttl=float(os.environ.get('RATING_SHARE_SECONDS', '5')))
+
+# Running totals for the streaming extractor (shown by /stats)
+stream_totals = {'fetches': 0, 'early_exits': 0, 'bytes_read': 0, 'bytes_skipped': 0, 'time_saved_ms': 0.0}
+_totals_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """pickleball.com answered with something other than 200"""
+
+    def __init__(self, status_code):
+        super().__init__(f'Failed to fetch player page (status {status_code})')
+        self.status_code = status_code
+
+
+def player_name_from_slug(player_slug):
+    """'clayton-truex' -> 'Clayton Truex'"""
+    return player_slug.replace('-', ' ').title()
+
+
+def rating_history_url(player_slug):
+    # Use rating-history URL where ratings are publicly visible
+    return f'{BASE_URL}/players/{player_slug}/rating-history'
+
+
+def extract_rating(page_text, player_slug):
+    """Find the player's DUPR doubles rating in a rating-history page, or None"""
+    name_parts = player_name_from_slug(player_slug)
+    result = {'player_name': name_parts, 'player_slug': player_slug}
+
+    # Try to extract from JSON data first (most reliable)
+    # Pattern 1: Look for currentDuprDoublesRating in JSON data
+    json_rating_match = JSON_RATING_PATTERN.search(page_text)
+    if json_rating_match:
+        return json_rating_result(json_rating_match, player_slug)
+
+    # Pattern 2: Look for player name followed by rating in match history
+    # Format: "Clayton Truex 34 | M | Kirkland, WA, USA 4.919"
+    name_rating_match = re.search(rf'{re.escape(name_parts)}[^\d]+\d+\s*\|[^\d]+(\d+\.\d{{3}})', page_text, re.IGNORECASE)
+    if name_rating_match:
+        return dict(result, dupr_rating=float(name_rating_match.group(1)), source='rating_history')
+
+    # Pattern 3: Generic pattern - player name followed by a 3-decimal rating
+    generic_match = re.search(rf'{re.escape(name_parts)}[^\d]+(\d+\.\d{{3}})', page_text, re.IGNORECASE)
+    if generic_match:
+        return dict(result, dupr_rating=float(generic_match.group(1)), source='rating_history')
+
+    return None
+
+
+def json_rating_result(match, player_slug):
+    return {
+        'dupr_rating': round(float(match.group(1)), 3),
+        'player_name': player_name_from_slug(player_slug),
+        'player_slug': player_slug,
+        'source': 'json_data'
+    }
+
+
+def stream_extract_rating(response, player_slug):
+    """
+    Scan a streamed response for the rating, stopping as soon as it is found
+
+    Returns (result or None, stats). Only if the whole page has no
+    currentDuprDoublesRating are the name-based patterns run on the full text.
+    """
+    start = time.perf_counter()
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    chunks = []
+    carry = ''
+    bytes_read = 0
+    result = None
+    early_exit = False
+    scan_seconds = 0.0
+
+    for raw in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        bytes_read += len(raw)
+        scan_start = time.perf_counter()
+        text = decoder.decode(raw)
+        chunks.append(text)
+        window = carry + text
+        match = JSON_RATING_PATTERN.search(window)
+        scan_seconds += time.perf_counter() - scan_start
+        if match and match.end() < len(window):
+            result = json_rating_result(match, player_slug)
+            early_exit = True
+            break
+        # A match touching the end of the window may have a truncated number - rescan it with more text
+        carry = window[match.start():] if match else window[-STREAM_OVERLAP:]
+
+    elapsed = time.perf_counter() - start
+    content_length = int(response.headers.get('Content-Length') or 0) or None
+    bytes_skipped = max(0, content_length - bytes_read) if content_length and early_exit else 0
+
+    if not early_exit:
+        scan_start = time.perf_counter()
+        chunks.append(decoder.decode(b'', final=True))
+        result = extract_rating(''.join(chunks), player_slug)
+        scan_seconds += time.perf_counter() - scan_start
+    elif content_length and bytes_skipped <= DRAIN_LIMIT:
+        # Cheaper to finish a short body than to lose the keep-alive connection
+        for raw in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            pass
+    response.close()
+    metrics.observe_stage('extract', scan_seconds)
+
+    # Time saved estimated from the throughput seen on the part we did read
+    time_saved = bytes_skipped * elapsed / bytes_read if bytes_read else 0.0
+    stats = {
+        'bytes_read': bytes_read,
+        'content_length': content_length,
+        'bytes_skipped': bytes_skipped,
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'time_saved_ms': round(time_saved * 1000, 2),
+        'early_exit': early_exit
+    }
+    with _totals_lock:
+        stream_totals['fetches'] += 1
+        stream_totals['early_exits'] += int(early_exit)
+        stream_totals['bytes_read'] += bytes_read
+        stream_totals['bytes_skipped'] += bytes_skipped
+        stream_totals['time_saved_ms'] += stats['time_saved_ms']
+    return result, stats
+
+
+def fetch_rating(player_slug):
+    """
+    Stream a player's rating-history page and extract the rating
+
+    Returns (result or None if not found, stream stats)
+    """
+    with metrics.stage('upstream_fetch'):
+        try:
+            response = session.get(rating_history_url(player_slug), timeout=REQUEST_TIMEOUT, stream=True)
+        except requests.RequestException:
+            metrics.upstream_responses.inc(upstream='pickleball', status='error')
+            raise
+        metrics.upstream_responses.inc(upstream='pickleball', status=response.status_code)
+        if response.status_code != 200:
+            response.close()
+            raise UpstreamError(response.status_code)
+        return stream_extract_rating(response, player_slug)
+
+
+def lookup_rating(player_slug):
+    """
+    Cached fetch_rating(), returns (result or None, cache status, stream stats)
+
+    Misses that find a fetch for the same player already in flight wait for it
+    and report cache status 'coalesced'. Stream stats are only present when this
+    call actually fetched the page.
+    """
+    fetched = {}
+
+    def fetch():
+        result, fetched['stats'] = fetch_rating(player_slug)
+        return result
+
+    def load(key):
+        result, fetched['shared'] = rating_flight.do(key, fetch)
+        return result
+
+    result, cache_status = rating_cache.get_or_load(player_slug, load)
+    if cache_status == 'miss' and fetched.get('shared'):
+        cache_status = 'coalesced'
+    return result, cache_status, fetched.get('stats')
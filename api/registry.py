@@ -0,0 +1,255 @@
+"""
+Model registry: every models/model<N>_<name>.dupr or .pkl, hot-reloaded
+
+When both exist for a model number the .dupr artifact (api/artifact.py) wins:
+it is memory-mapped instead of unpickled and needs no sklearn, so the .pkl is
+never read. MODEL_SKLEARN_BATCHES=1 opts tree models back into loading the .pkl
+next to their .dupr file (when sklearn is installed and it scores exactly like
+the artifact) for batches over SKLEARN_MIN_ROWS, where sklearn's compiled tree
+walk beats the flat evaluator. The pair is then versioned together, so
+replacing either file reloads the model. That brings back the unpickling and
+the sklearn import at load time.
+
+The registry publishes an immutable snapshot {model_num: model_data}. A reload
+builds and warms a complete new snapshot off to the side and then replaces the
+reference in one assignment, so a request that already picked up the old
+snapshot finishes on it and the next one sees the new models - nothing is
+dropped or served half-loaded.
+
+Files are checked by mtime and size first; only when those move is the content
+hashed, so touching a file without changing it doesn't trigger a reload.
+"""
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+
+import numpy as np
+
+from api import artifact
+from api.features import build_feature_matrix
+from api.trees import FlatTreeEnsemble, compile_model
+
+ARTIFACT_PATTERN = re.compile(r'^model(\d+)_(\w+)\.(pkl|dupr)$')
+
+# Opt-in: load the .pkl next to a .dupr tree model for batches over SKLEARN_MIN_ROWS
+SKLEARN_BATCHES = os.environ.get('MODEL_SKLEARN_BATCHES', '0') == '1'
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_pickle(path):
+    """Unpickle one model file into the model_data layout the API serves from"""
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    if isinstance(data, tuple) and len(data) == 3:
+        model_data = {'estimator': data[0], 'features': data[1], 'deflation': data[2]}
+    else:
+        model_data = {'estimator': data, 'features': None, 'deflation': 0.0}
+    model_data['model_type'] = type(model_data['estimator']).__name__
+    # Serve from flat NumPy arrays instead of sklearn's per-call predict
+    model_data['model'] = compile_model(model_data['estimator'])
+    return model_data
+
+
+def load_model_file(path):
+    if path.endswith(artifact.SUFFIX):
+        return artifact.load_artifact(path)
+    return load_pickle(path)
+
+
+def files_hash(paths):
+    """Content hash of a served file, or of the file and its companion pickle together"""
+    if len(paths) == 1:
+        return file_hash(paths[0])
+    return hashlib.sha256(''.join(file_hash(path) for path in paths).encode()).hexdigest()
+
+
+def attach_estimator(model_data, pickle_path):
+    """Hand a .dupr tree model its pickled sklearn estimator for large batches
+
+    Skipped with a message (the flat evaluator then scores every batch) if the
+    pickle can't be loaded, e.g. without sklearn, or doesn't match the artifact.
+    """
+    model = model_data['model']
+    if not isinstance(model, FlatTreeEnsemble):
+        return      # linear models are faster flat at every size
+    try:
+        with open(pickle_path, 'rb') as f:
+            data = pickle.load(f)
+        estimator = data[0] if isinstance(data, tuple) else data
+        rng = np.random.default_rng(0)
+        X = build_feature_matrix(np.round(rng.uniform(2.5, 6.5, (64, 4)), 3),
+                                 np.column_stack([np.full(64, 11), rng.integers(0, 10, 64)])).reshape(-1, model.n_features)
+        if not np.allclose(estimator.predict(X), model.predict_flat(X), rtol=0, atol=1e-9):
+            raise ValueError('it does not predict like the .dupr file')
+    except Exception as e:
+        print(f"Not using {os.path.basename(pickle_path)} for large batches: {e}", flush=True)
+        return
+    model.estimator = estimator
+    model_data['estimator'] = estimator
+
+
+def warm_up(model_data):
+    """One dummy prediction so the first real request doesn't pay for lazy setup"""
+    X = build_feature_matrix([[4.0, 4.0, 4.0, 4.0]], [[11, 9]]).reshape(4, -1)
+    prediction = model_data['model'].predict(X)
+    if not np.all(np.isfinite(prediction)):
+        raise ValueError('warm-up prediction is not finite')
+
+
+class ModelRegistry:
+    """Discovers, loads, watches and atomically swaps the served models"""
+
+    def __init__(self, models_dir, poll_interval=5.0):
+        self.models_dir = models_dir
+        self.poll_interval = poll_interval
+        self.models = None          # current snapshot: model_num -> model_data
+        self.generation = 0         # bumped on every swap so caches know when to drop results
+        self.load_seconds = None    # how long the last reload took
+        self.reloads = 0
+        self.errors = {}            # file name -> last load error
+        self._failed = {}           # file name -> signature that failed, so it isn't retried every poll
+        self._files = {}            # file name -> (mtime_ns, size, sha256) of what is being served
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+        self._stop = threading.Event()
+
+    def discover(self):
+        """{file name: model_num} for the file to serve for each model number in models_dir"""
+        chosen = {}
+        for name in sorted(os.listdir(self.models_dir)):
+            match = ARTIFACT_PATTERN.match(name)
+            if match:
+                model_num = int(match.group(1))
+                if model_num not in chosen or match.group(3) == 'dupr':
+                    chosen[model_num] = name
+        return {name: model_num for model_num, name in sorted(chosen.items())}
+
+    def companion(self, name):
+        """The .pkl next to a served .dupr file, or None"""
+        if not SKLEARN_BATCHES or not name.endswith(artifact.SUFFIX):
+            return None
+        pickle_name = name[:-len(artifact.SUFFIX)] + '.pkl'
+        return pickle_name if os.path.exists(os.path.join(self.models_dir, pickle_name)) else None
+
+    def _paths(self, name):
+        return [os.path.join(self.models_dir, n) for n in (name, self.companion(name)) if n]
+
+    def _changed_files(self, found):
+        """File name -> new (mtime_ns, size, sha256) for artifacts that differ from what is served
+
+        For a .dupr with a companion pickle the mtimes and sizes are tuples over
+        both files and the hash covers both.
+        """
+        changed = {}
+        for name in found:
+            paths = self._paths(name)
+            stats = [os.stat(path) for path in paths]
+            quick = (tuple(stat.st_mtime_ns for stat in stats), tuple(stat.st_size for stat in stats))
+            known = self._files.get(name)
+            if known and known[:2] == quick:
+                continue
+            if self._failed.get(name, (None, None))[:2] == quick:
+                continue
+            digest = files_hash(paths)
+            if known and known[2] == digest:
+                # Touched but identical: remember the new mtime, keep the loaded model
+                self._files[name] = (*quick, digest)
+                continue
+            changed[name] = (*quick, digest)
+        return changed
+
+    def refresh(self):
+        """Load anything new or changed and swap it in; returns True if the snapshot changed"""
+        with self._lock:
+            found = self.discover()
+            changed = self._changed_files(found)
+            removed = [name for name in self._files if name not in found]
+            if not changed and not removed and self.models is not None:
+                return False
+
+            start = time.perf_counter()
+            current = self.models or {}
+            by_name = {data['file']: (num, data) for num, data in current.items()}
+            snapshot = {}
+            files = {}
+            for name, model_num in found.items():
+                if name in changed:
+                    try:
+                        model_data = load_model_file(os.path.join(self.models_dir, name))
+                        if self.companion(name):
+                            attach_estimator(model_data, os.path.join(self.models_dir, self.companion(name)))
+                        warm_up(model_data)
+                    except Exception as e:
+                        # Keep serving the previous version (if any) until a good file shows up
+                        self.errors[name] = str(e)
+                        self._failed[name] = changed[name]
+                        print(f"Failed to load {name}: {e}", flush=True)
+                        if name in by_name:
+                            snapshot[model_num] = by_name[name][1]
+                            files[name] = self._files[name]
+                        continue
+                    model_data.update(file=name, version=changed[name][2][:12], loaded_at=time.time())
+                    self.errors.pop(name, None)
+                    self._failed.pop(name, None)
+                    snapshot[model_num] = model_data
+                    files[name] = changed[name]
+                elif name in by_name:
+                    snapshot[model_num] = by_name[name][1]
+                    files[name] = self._files[name]
+
+            if self.models is not None and files == self._files:
+                return False
+            self.generation += 1
+            snapshot = {num: dict(data, generation=self.generation) for num, data in snapshot.items()}
+            self._files = files
+            self.load_seconds = time.perf_counter() - start
+            self.reloads += 1
+            # The swap: one reference assignment, readers see either the old or the new snapshot
+            self.models = snapshot
+            print(f"Loaded models {sorted(snapshot)} (generation {self.generation}) in "
+                  f"{self.load_seconds * 1000:.0f} ms (pid {os.getpid()})", flush=True)
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Model watcher error: {e}", flush=True)
+
+    def ensure_watcher(self):
+        """Start the background watcher in this process (threads don't survive a fork)"""
+        if self.poll_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch, daemon=True, name='model-watcher').start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def describe(self):
+        """Served models for /models"""
+        return {
+            'generation': self.generation,
+            'reloads': self.reloads,
+            'load_ms': round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
+            'models': {
+                num: {'file': data['file'], 'format': os.path.splitext(data['file'])[1][1:], 'version': data['version'],
+                      'type': data['model_type'], 'deflation': data['deflation'], 'loaded_at': data['loaded_at'],
+                      'large_batches': 'sklearn' if getattr(data['model'], 'estimator', None) is not None else 'flat'}
+                for num, data in sorted((self.models or {}).items())
+            },
+            'errors': dict(self.errors)
+        }
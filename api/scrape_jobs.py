@@ -0,0 +1,320 @@
+"""
+Background full-history scrapes (DUPRScraper.scrape_player_rating_history)
+
+Jobs run in a small bounded pool in the worker that accepted them, each with
+its own scraper: its own HTTP session, or its own browser if it falls back to
+Selenium, since neither is shared between threads. Job state lives in files
+under SCRAPE_JOBS_DIR (default player_data/.jobs), so every gunicorn worker on
+the host sees the same jobs:
+
+    <job id>.json     status, replaced atomically on every change
+    <job id>.events   numbered events (queued, started, page, done/failed),
+                      one JSON line each, appended by the worker running it
+    active/<slug>     id of the slug's queued or running job
+
+/scrape_jobs streams the events file as Server-Sent Events; a client that
+reconnects with Last-Event-ID picks up where it left off, on any worker.
+Results are saved to player_data/<slug>_dupr.csv, the same files
+batch_scrape.py writes.
+
+A second submission for a slug that is still queued or running, from any
+worker, gets the existing job back instead of scraping the same pages twice:
+submissions hold an flock on the jobs directory while they check active/.
+A job whose worker has exited is marked failed the next time it is looked up.
+"""
+import contextlib
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from api import pickleball
+
+try:
+    import fcntl
+except ImportError:     # Windows has no flock; deduplication is per worker there
+    fcntl = None
+
+MAX_WORKERS = int(os.environ.get('SCRAPE_JOB_WORKERS', '2'))
+OUTPUT_DIR = os.environ.get('SCRAPE_OUTPUT_DIR', os.path.join(os.path.dirname(__file__), '..', 'player_data'))
+JOBS_DIR = os.environ.get('SCRAPE_JOBS_DIR')    # default: <output dir>/.jobs
+
+# Finished jobs kept for status lookups before the oldest are forgotten
+MAX_FINISHED_JOBS = 200
+
+# How often an event stream checks the events file for new lines
+EVENT_POLL = 0.2
+
+ACTIVE_STATES = ('queued', 'running')
+TERMINAL_EVENTS = ('done', 'failed')
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{12}')
+HOST = socket.gethostname()
+
+
+def default_scraper():
+    # Imported here so the API doesn't load the scraper (and pandas) until a job runs
+    from dupr_scraper import DUPRScraper
+    return DUPRScraper(headless=True)
+
+
+def write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def append_event(path, event_id, event, data):
+    # One write per line, so readers in other workers never see a partial event
+    with open(path, 'a') as f:
+        f.write(json.dumps([event_id, event, data]) + '\n')
+
+
+def read_events(path):
+    """[(event id, event type, data dict)] from an events file"""
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError:
+        return []
+    # Anything after the last newline is a line still being written
+    return [tuple(json.loads(line)) for line in text[:text.rfind('\n') + 1].splitlines()]
+
+
+class Job:
+    """A scrape run by this worker; every change is written straight to its files"""
+
+    def __init__(self, jobs_dir, slug, max_pages=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.slug = slug
+        self.url = pickleball.rating_history_url(slug)
+        self.max_pages = max_pages
+        self.state = 'queued'
+        self.pages = 0
+        self.matches = 0
+        self.output_file = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.status_path = os.path.join(jobs_dir, f'{self.id}.json')
+        self.events_path = os.path.join(jobs_dir, f'{self.id}.events')
+        self._events = 0
+        self._lock = threading.Lock()
+
+    def emit(self, event, **data):
+        with self._lock:
+            self._events += 1
+            append_event(self.events_path, self._events, event, dict(data, job_id=self.id))
+
+    def save(self):
+        write_json(self.status_path, self.as_dict())
+
+    def as_dict(self):
+        return {
+            'job_id': self.id,
+            'slug': self.slug,
+            'url': self.url,
+            'state': self.state,
+            'pages': self.pages,
+            'matches': self.matches,
+            'max_pages': self.max_pages,
+            'output_file': self.output_file,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'host': HOST,
+            'pid': os.getpid(),
+        }
+
+
+class JobManager:
+    """Queues scrape jobs, deduplicating by slug across workers while one is active"""
+
+    def __init__(self, max_workers=MAX_WORKERS, output_dir=OUTPUT_DIR, scraper_factory=default_scraper, jobs_dir=None):
+        self.output_dir = output_dir
+        self.jobs_dir = jobs_dir or JOBS_DIR or os.path.join(output_dir, '.jobs')
+        self.scraper_factory = scraper_factory
+        self._lock = threading.Lock()   # flock excludes other workers, this other threads here
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape-job')
+        os.makedirs(os.path.join(self.jobs_dir, 'active'), exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock, open(os.path.join(self.jobs_dir, '.lock'), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.jobs_dir, f'{job_id}{suffix}')
+
+    def _marker(self, slug):
+        return os.path.join(self.jobs_dir, 'active', slug)
+
+    def submit(self, slug, max_pages=None):
+        """(status dict, created) - created is False when an active job for the slug was reused"""
+        with self._locked():
+            try:
+                with open(self._marker(slug)) as f:
+                    active = self._status(f.read().strip(), locked=True)
+            except OSError:
+                active = None
+            if active is not None and active['state'] in ACTIVE_STATES:
+                return active, False
+            job = Job(self.jobs_dir, slug, max_pages)
+            job.save()
+            job.emit('queued', slug=slug)
+            with open(self._marker(slug), 'w') as f:
+                f.write(job.id)
+            self._forget_old_jobs()
+        self._executor.submit(self._run, job)
+        return job.as_dict(), True
+
+    def get(self, job_id):
+        """Status of any worker's job, or None"""
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        return self._status(job_id)
+
+    def events(self, job_id):
+        return read_events(self._path(job_id, '.events'))
+
+    def list(self):
+        statuses = (read_json(os.path.join(self.jobs_dir, name)) for name in os.listdir(self.jobs_dir) if name.endswith('.json'))
+        return sorted((status for status in statuses if status), key=lambda status: status['created_at'])
+
+    def _status(self, job_id, locked=False):
+        status = read_json(self._path(job_id, '.json'))
+        if status is None or status['state'] not in ACTIVE_STATES or not self._orphaned(status):
+            return status
+        if locked:
+            return self._fail_orphan(job_id)
+        with self._locked():
+            return self._fail_orphan(job_id)
+
+    def _orphaned(self, status):
+        return status['host'] == HOST and not process_alive(status['pid'])
+
+    def _fail_orphan(self, job_id):
+        """Mark a job failed whose worker exited mid-scrape (caller holds the lock)"""
+        status = read_json(self._path(job_id, '.json'))
+        if status['state'] in ACTIVE_STATES:
+            status.update(state='failed', error='worker exited before the job finished', finished_at=time.time())
+            write_json(self._path(job_id, '.json'), status)
+            events = self.events(job_id)
+            append_event(self._path(job_id, '.events'), len(events) + 1, 'failed',
+                         dict({k: v for k, v in status.items() if k != 'job_id'}, job_id=job_id))
+        return status
+
+    def _forget_old_jobs(self):
+        finished = [status for status in self.list() if status['state'] not in ACTIVE_STATES]
+        for status in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            for suffix in ('.json', '.events'):
+                with contextlib.suppress(OSError):
+                    os.unlink(self._path(status['job_id'], suffix))
+
+    def _run(self, job):
+        job.state = 'running'
+        job.started_at = time.time()
+        job.save()
+        job.emit('started', url=job.url)
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_file = os.path.join(self.output_dir, f'{job.slug}_dupr.csv')
+
+        def progress(page, pages, matches):
+            job.pages, job.matches = pages, matches
+            job.save()
+            job.emit('page', page=page, pages=pages, matches=matches)
+
+        scraper = None
+        try:
+            scraper = self.scraper_factory()
+            df = scraper.scrape_player_rating_history(job.url, max_pages=job.max_pages, output_file=output_file, progress=progress)
+            if not df.empty:
+                # The scraper appended each page to output_file as it went
+                job.output_file = output_file
+            job.matches = len(df)
+            if scraper.completed:
+                job.state = 'done'
+            else:
+                # The pages before the error are saved, but the history isn't complete
+                job.error = f'scrape stopped at {scraper.error}'
+                job.state = 'failed'
+        except Exception as e:
+            job.error = str(e)
+            job.state = 'failed'
+            print(f"Scrape job {job.id} ({job.slug}) failed: {e}", flush=True)
+        finally:
+            if scraper is not None:
+                scraper.close()
+            job.finished_at = time.time()
+            with self._locked():
+                job.save()
+                with contextlib.suppress(OSError):
+                    with open(self._marker(job.slug)) as f:
+                        if f.read().strip() == job.id:
+                            os.unlink(self._marker(job.slug))
+            # Terminal event last, so a client that sees it also sees the final status
+            job.emit(job.state, **{k: v for k, v in job.as_dict().items() if k != 'job_id'})
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def sse_events(manager, job_id, last_event_id=0, heartbeat=15.0, poll=EVENT_POLL):
+    """Server-Sent Events text for a job, ending after its done/failed event"""
+    sent = last_event_id
+    idle_since = time.monotonic()
+    while True:
+        events = manager.events(job_id)
+        new = [event for event in events if event[0] > sent]
+        for event_id, event, data in new:
+            yield f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
+            sent = event_id
+            if event in TERMINAL_EVENTS:
+                return
+        if new:
+            idle_since = time.monotonic()
+            continue
+        if events and events[-1][1] in TERMINAL_EVENTS:
+            return    # reconnected after the end
+        if time.monotonic() - idle_since >= heartbeat:
+            # Comment line: keeps proxies from timing out an idle stream
+            yield ': keep-alive\n\n'
+            idle_since = time.monotonic()
+            manager.get(job_id)     # notices (and fails) a job whose worker died
+        time.sleep(poll)
@@ -0,0 +1,188 @@
+"""
+Single-flight request coalescing
+
+When many requests want the same key at once (a league shares one player link),
+the first becomes the leader and does the work; the rest wait for it and get
+its result (or its exception) instead of each going upstream.
+
+Within a worker that is an in-memory table of in-flight calls. With `lock_dir`
+set, leaders in different worker processes also take an flock on a per-key file
+there; whoever gets it second reads the result the first one left next to the
+lock (if it is under `result_ttl` seconds old) instead of fetching again. Results
+must be JSON-serializable for that; None results are never shared across workers.
+
+The result file has to outlive the flight for that, so files are swept instead
+of deleted on the spot: at most every `sweep_interval` seconds a leader removes
+the lock and result files of keys nobody has led for that long whose result has
+expired, skipping any lock another worker holds. A worker still waiting on a
+just-swept lock may then fetch alongside a new leader - one duplicate fetch,
+never a wrong result.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from api import metrics
+
+try:
+    import fcntl
+except ImportError:     # Windows has no flock; cross-worker coalescing is off there
+    fcntl = None
+
+coalesced_requests = metrics.Counter('dupr_coalesced_requests_total',
+                                     "Lookups answered by another request's fetch instead of their own", ['scope'])
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key; see the module docstring"""
+
+    def __init__(self, lock_dir=None, result_ttl=5.0, lock_timeout=30.0, sweep_interval=300.0):
+        self.lock_dir = lock_dir if fcntl else None
+        self.result_ttl = result_ttl
+        self.lock_timeout = lock_timeout
+        self.sweep_interval = sweep_interval
+        self.swept = 0
+        self._last_sweep = time.time()
+        self.leaders = 0
+        self.saved = 0               # followers in this worker
+        self.saved_cross_worker = 0  # leaders that reused another worker's result
+        self._calls = {}
+        self._lock = threading.Lock()
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key, fn):
+        """(fn() or the in-flight call's result, shared) - shared is True if this call didn't run fn"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.saved += 1
+        if not leader:
+            coalesced_requests.inc(scope='worker')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        shared = False
+        try:
+            call.value, shared = self._lead(key, fn)
+            return call.value, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _lead(self, key, fn):
+        if not self.lock_dir:
+            return fn(), False
+
+        self._sweep()
+        base = os.path.join(self.lock_dir, hashlib.sha1(key.encode()).hexdigest())
+        with open(base + '.lock', 'a') as lock_file:
+            # The mtime marks the key as recently led, so the sweep leaves it alone
+            os.utime(lock_file.fileno())
+            locked = self._acquire(lock_file)
+            try:
+                value = self._read_shared(base + '.json')
+                if value is not None:
+                    with self._lock:
+                        self.saved_cross_worker += 1
+                    coalesced_requests.inc(scope='cross_worker')
+                    return value, True
+                value = fn()
+                if value is not None and locked:
+                    self._write_shared(base + '.json', value)
+                return value, False
+            finally:
+                if locked:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _acquire(self, lock_file):
+        """flock with a timeout; on timeout the caller just does its own fetch"""
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.01)
+
+    def _sweep(self):
+        """Delete the files of keys not led for sweep_interval whose result has expired"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        for name in os.listdir(self.lock_dir):
+            if not name.endswith('.lock'):
+                continue
+            lock_path = os.path.join(self.lock_dir, name)
+            result_path = lock_path[:-len('.lock')] + '.json'
+            try:
+                if now - os.stat(lock_path).st_mtime < self.sweep_interval:
+                    continue
+                if os.path.exists(result_path) and now - os.stat(result_path).st_mtime <= self.result_ttl:
+                    continue
+                with open(lock_path, 'a') as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue    # a leader is fetching it right now
+                    if os.path.exists(result_path):
+                        os.unlink(result_path)
+                    os.unlink(lock_path)
+                with self._lock:
+                    self.swept += 1
+            except OSError:
+                continue    # another worker swept it first
+
+    def _read_shared(self, path):
+        try:
+            if time.time() - os.stat(path).st_mtime > self.result_ttl:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_shared(self, path, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            print(f"Could not share result with other workers: {e}", flush=True)
+
+    def stats(self):
+        return {
+            'leaders': self.leaders,
+            'in_flight': len(self._calls),
+            'saved': self.saved,
+            'saved_cross_worker': self.saved_cross_worker,
+            'swept': self.swept,
+            'cross_worker': bool(self.lock_dir)
+        }
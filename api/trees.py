@@ -0,0 +1,156 @@
+"""
+Fast NumPy inference for the pickled sklearn models
+
+sklearn's predict spends most of its time on input validation and per-tree
+dispatch when it only has 4 rows to score. These classes pull the fitted
+parameters out once into contiguous arrays and score a whole batch with a
+handful of vectorized operations, giving the same numbers as sklearn.
+"""
+import numpy as np
+
+# Above this many rows sklearn's compiled tree walk beats the NumPy one
+# (see benchmark_trees.py), so hand big batches to the estimator if we have it
+SKLEARN_MIN_ROWS = 64
+
+# Rows scored per pass - keeps the (rows, trees) cursor arrays cache-sized
+CHUNK_ROWS = 256
+
+
+def _breadth_first(tree):
+    """Node ids of an sklearn tree in breadth-first order (siblings end up adjacent)"""
+    order = [0]
+    for node in order:
+        if tree.children_left[node] != -1:
+            order.extend([tree.children_left[node], tree.children_right[node]])
+    return np.asarray(order, dtype=np.intp)
+
+
+def _float32_thresholds(threshold):
+    """Round thresholds down to float32 so `x32 <= t32` matches sklearn's `x32 <= t64`"""
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(float) > threshold
+    t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+    return t32
+
+
+class FlatTreeEnsemble:
+    """All trees of a GradientBoostingRegressor packed into flat node arrays
+
+    Nodes are laid out breadth-first per tree, so a node's right child always
+    sits right after its left child and one step down is `left + (x > threshold)`.
+    Leaves point at themselves with an infinite threshold.
+    """
+
+    def __init__(self, feature, threshold, left, value, roots, base, max_depth, n_features, estimator=None):
+        self.feature = feature        # split feature per node (0 for leaves)
+        self.threshold = threshold    # float32 split threshold per node (+inf for leaves)
+        self.left = left              # global index of left child (leaves point at themselves)
+        self.value = value            # learning-rate-scaled leaf value per node
+        self.roots = roots            # global index of each tree's root node
+        self.base = base              # constant initial prediction (init_ estimator)
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.estimator = estimator    # sklearn model for large batches, if available
+
+    @classmethod
+    def from_sklearn(cls, model, keep_estimator=True):
+        """Extract the trees of a fitted GradientBoostingRegressor"""
+        features, thresholds, lefts, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            order = _breadth_first(tree)
+            position = np.empty(len(order), dtype=np.intp)
+            position[order] = np.arange(len(order))
+
+            children = tree.children_left[order]
+            is_leaf = children == -1
+            own = np.arange(len(order), dtype=np.intp)
+
+            features.append(np.where(is_leaf, 0, tree.feature[order]).astype(np.intp))
+            thresholds.append(np.where(is_leaf, np.float32(np.inf), _float32_thresholds(tree.threshold[order])))
+            lefts.append(np.where(is_leaf, own, position[np.where(is_leaf, 0, children)]) + offset)
+            # sklearn adds learning_rate * value per tree, so scale the same way
+            values.append(model.learning_rate * tree.value[order, 0, 0])
+            roots.append(offset)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += len(order)
+
+        base = 0.0 if isinstance(model.init_, str) else float(np.ravel(model.init_.constant_)[0])
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            left=np.concatenate(lefts).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            base=base,
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            estimator=model if keep_estimator else None,
+        )
+
+    def predict(self, X):
+        """Score an (n, n_features) batch, using sklearn for large batches when available"""
+        X = np.asarray(X).reshape(-1, self.n_features)
+        if self.estimator is not None and len(X) > SKLEARN_MIN_ROWS:
+            return self.estimator.predict(X)
+        return self.predict_flat(X)
+
+    def predict_flat(self, X):
+        """Score an (n, n_features) batch through every tree at once"""
+        # sklearn trees compare float32 inputs
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features)
+        out = np.empty(len(X))
+        for start in range(0, len(X), CHUNK_ROWS):
+            out[start:start + CHUNK_ROWS] = self._predict_chunk(X[start:start + CHUNK_ROWS])
+        return out
+
+    def _predict_chunk(self, X):
+        n_rows = len(X)
+        flat_x = X.ravel()
+        row_start = (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, None]
+
+        # One cursor per (row, tree), all walking down together level by level
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = flat_x[row_start + self.feature[node]]
+            node = self.left[node] + (x > self.threshold[node])
+
+        # Sum trees in order starting from the initial prediction, like sklearn does
+        leaf_values = np.empty((n_rows, len(self.roots) + 1))
+        leaf_values[:, 0] = self.base
+        leaf_values[:, 1:] = self.value[node]
+        return np.cumsum(leaf_values, axis=1)[:, -1]
+
+
+class FlatLinearModel:
+    """Coefficients of a fitted linear model (Ridge, LinearRegression)"""
+
+    def __init__(self, coef, intercept, n_features):
+        self.coef = coef
+        self.intercept = intercept
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, model, keep_estimator=True):
+        coef = np.ascontiguousarray(np.ravel(model.coef_), dtype=float)
+        return cls(coef=coef, intercept=float(model.intercept_), n_features=len(coef))
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float).reshape(-1, self.n_features)
+        return X @ self.coef + self.intercept
+
+    predict_flat = predict
+
+
+def compile_model(model, keep_estimator=True):
+    """Wrap a fitted sklearn model in the matching flat evaluator"""
+    if hasattr(model, 'estimators_') and hasattr(model, 'learning_rate'):
+        return FlatTreeEnsemble.from_sklearn(model, keep_estimator)
+    if hasattr(model, 'coef_'):
+        return FlatLinearModel.from_sklearn(model, keep_estimator)
+    raise TypeError(f'No flat evaluator for {type(model).__name__}')
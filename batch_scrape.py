@@ -1,11 +1,27 @@
 #!/usr/bin/env python3
 """
 Batch scraper with timeout handling and partial saves
+
+dupr_scraper.py appends each page to the output CSV and checkpoints it, so a
+killed or failed scrape keeps every completed page, and the next run of this
+script resumes it from the checkpoint (--resume) instead of starting over.
 """
 import subprocess
 import signal
 import time
-from pathlib import Path
+
+
+def saved_progress(output_file):
+    """(matches, last page) safely on disk for an unfinished scrape, per its checkpoint
+    
+    Only reads the checkpoint: cutting off a torn write is left to --resume.
+    """
+    # Imported here so this script doesn't load the scraper (and pandas) itself
+    from dupr_scraper import read_checkpoint
+    checkpoint = read_checkpoint(output_file)
+    if not checkpoint:
+        return 0, None
+    return checkpoint['rows'], checkpoint['last_page']
 
 def scrape_with_timeout(url, output_file, timeout=180):
     """
@@ -16,7 +32,7 @@ def scrape_with_timeout(url, output_file, timeout=180):
     
     # Start scraping process
     proc = subprocess.Popen(
-        ['python3', 'dupr_scraper.py', url, '-o', output_file],
+        ['python3', 'dupr_scraper.py', url, '-o', output_file, '--resume'],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True
@@ -34,15 +50,9 @@ def scrape_with_timeout(url, output_file, timeout=180):
             return (True, 0, 'Success (0 matches)')
         else:
             # Failed but might have partial data
-            if Path(output_file).exists():
-                # Check if CSV has data
-                try:
-                    import pandas as pd
-                    df = pd.read_csv(output_file)
-                    if len(df) > 0:
-                        return (False, len(df), f'Partial ({len(df)} matches saved)')
-                except:
-                    pass
+            matches, last_page = saved_progress(output_file)
+            if matches > 0:
+                return (False, matches, f'Partial ({matches} matches saved through page {last_page})')
             return (False, 0, f'Failed (exit {proc.returncode})')
             
     except subprocess.TimeoutExpired:
@@ -52,14 +62,9 @@ def scrape_with_timeout(url, output_file, timeout=180):
         proc.kill()
         
         # Check if any data was saved
-        if Path(output_file).exists():
-            try:
-                import pandas as pd
-                df = pd.read_csv(output_file)
-                if len(df) > 0:
-                    return (False, len(df), f'Timeout ({len(df)} matches saved)')
-            except:
-                pass
+        matches, last_page = saved_progress(output_file)
+        if matches > 0:
+            return (False, matches, f'Timeout ({matches} matches saved through page {last_page})')
         
         return (False, 0, 'Timeout (no data)')
 
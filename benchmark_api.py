@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Load-test the Flask API and record throughput and latency percentiles
+
+Drives api.app in-process through the Flask test client and/or as a real
+gunicorn server (gunicorn.conf.py, preloaded models), with a configurable
+number of concurrent clients and a mix of /predict and /scrape_dupr calls.
+/scrape_dupr goes to a local fake pickleball.com (fake_pickleball.py), so no
+real site is touched.
+
+    python benchmark_api.py --concurrency 1,8,32 --requests 2000 --output bench.json
+    python benchmark_api.py --compare bench_before.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from api.features import RATING_KEYS
+from fake_pickleball import FakePickleball
+
+
+def match_pool(n_matches, seed=42):
+    """Plausible /predict payloads; drawing from a fixed pool gives realistic cache reuse"""
+    rng = np.random.default_rng(seed)
+    pool = []
+    for _ in range(n_matches):
+        ratings = np.round(rng.uniform(2.5, 6.5, 4), 3)
+        winner, loser = (11, int(rng.integers(0, 10))) if rng.random() < 0.8 else (15, int(rng.integers(0, 14)))
+        scores = (winner, loser) if rng.random() < 0.5 else (loser, winner)
+        payload = dict(zip(RATING_KEYS, map(float, ratings)))
+        payload.update(team1_score=scores[0], team2_score=scores[1])
+        pool.append(payload)
+    return pool
+
+
+def build_workload(n_requests, predict_share, n_matches, n_players, seed=42):
+    """List of (endpoint, payload) in a fixed pseudo-random order"""
+    rng = np.random.default_rng(seed + 1)
+    matches = match_pool(n_matches, seed)
+    workload = []
+    for _ in range(n_requests):
+        if rng.random() < predict_share:
+            workload.append(('/predict', matches[int(rng.integers(len(matches)))]))
+        else:
+            slug = f'bench-player-{int(rng.integers(n_players))}'
+            workload.append(('/scrape_dupr', {'url': f'https://pickleball.com/players/{slug}'}))
+    return workload
+
+
+def start_fake_site(n_players, delay):
+    site = FakePickleball().start()
+    site.delay = delay
+    for i in range(n_players):
+        site.add_player(f'bench-player-{i}', rating=round(3.0 + (i % 300) / 100, 3), body='<div>match row</div>' * 200)
+    return site
+
+
+class TestClientTarget:
+    """api.app in this process, one Flask test client per thread"""
+    name = 'flask_test_client'
+
+    def __init__(self, site_url):
+        os.environ['PICKLEBALL_BASE_URL'] = site_url
+        from api import app as api_app
+        from api import pickleball
+        pickleball.BASE_URL = site_url
+        api_app.load_models()
+        self.app = api_app.app
+        self.local = threading.local()
+
+    def post(self, path, payload):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app.test_client()
+        return self.local.client.post(path, json=payload).status_code
+
+    def reset(self):
+        from api import app as api_app
+        from api import pickleball
+        api_app.prediction_cache.clear()
+        pickleball.rating_cache.clear()
+
+    def close(self):
+        pass
+
+
+class GunicornTarget:
+    """gunicorn -c gunicorn.conf.py api.app:app on a free local port"""
+    name = 'gunicorn'
+
+    def __init__(self, site_url, workers):
+        self.workers = workers
+        self.site_url = site_url
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.local = threading.local()
+        self.process = None
+        self.start()
+
+    def start(self):
+        env = dict(os.environ, PORT=str(self.port), WEB_CONCURRENCY=str(self.workers), PICKLEBALL_BASE_URL=self.site_url)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api.app:app'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with code {self.process.returncode}')
+            try:
+                if requests.get(self.url + '/ready', timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.close()
+        raise RuntimeError('gunicorn did not become ready within 60 s')
+
+    def post(self, path, payload):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session.post(self.url + path, json=payload, timeout=30).status_code
+
+    def reset(self):
+        # Fresh workers so every concurrency level starts with empty caches
+        self.close()
+        self.start()
+
+    def close(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def summarize(latencies, elapsed=None):
+    ms = np.array(latencies) * 1000
+    summary = {
+        'requests': len(ms),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+    if elapsed:
+        summary['throughput_rps'] = round(len(ms) / elapsed, 1)
+    return summary
+
+
+def run_level(target, workload, concurrency, warmup):
+    """Send the workload with `concurrency` clients, returns the summary dict"""
+    for path, payload in workload[:warmup]:
+        target.post(path, payload)
+
+    results = []   # (path, seconds, status)
+    lock = threading.Lock()
+
+    def send(item):
+        path, payload = item
+        start = time.perf_counter()
+        try:
+            status = target.post(path, payload)
+        except Exception:
+            status = 'error'
+        elapsed = time.perf_counter() - start
+        with lock:
+            results.append((path, elapsed, status))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, workload))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize([r[1] for r in results], elapsed)
+    summary['concurrency'] = concurrency
+    summary['errors'] = sum(1 for r in results if r[2] != 200)
+    summary['endpoints'] = {
+        path: summarize([r[1] for r in results if r[0] == path])
+        for path in sorted({r[0] for r in results})
+    }
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_level(target_name, summary):
+    print(f"{target_name:>18} c={summary['concurrency']:<4} {summary['throughput_rps']:>9.1f} req/s  "
+          f"p50 {summary['p50_ms']:>8.2f}ms  p95 {summary['p95_ms']:>8.2f}ms  p99 {summary['p99_ms']:>8.2f}ms  "
+          f"errors {summary['errors']}")
+
+
+def compare(before_file, after_file):
+    """Print throughput and p95 changes between two result files"""
+    with open(before_file) as f:
+        before = json.load(f)
+    with open(after_file) as f:
+        after = json.load(f)
+
+    print(f"{before_file} ({before.get('commit')}) -> {after_file} ({after.get('commit')})")
+    for target, levels in after['results'].items():
+        old_levels = {level['concurrency']: level for level in before['results'].get(target, [])}
+        for level in levels:
+            old = old_levels.get(level['concurrency'])
+            if old is None:
+                continue
+            rps_change = (level['throughput_rps'] / old['throughput_rps'] - 1) * 100
+            p95_change = (level['p95_ms'] / old['p95_ms'] - 1) * 100
+            print(f"{target:>18} c={level['concurrency']:<4} throughput {rps_change:+6.1f}%   p95 {p95_change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the prediction API in-process and under gunicorn')
+    parser.add_argument('--target', choices=['client', 'gunicorn', 'both'], default='both')
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma-separated client counts (default: 1,8,32)')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per concurrency level')
+    parser.add_argument('--predict-share', type=float, default=0.8, help='Fraction of /predict calls, rest /scrape_dupr (default: 0.8)')
+    parser.add_argument('--matches', type=int, default=500, help='Distinct /predict payloads to draw from')
+    parser.add_argument('--players', type=int, default=50, help='Distinct fake pickleball.com players')
+    parser.add_argument('--site-delay', type=float, default=0.02, help='Fake pickleball.com response delay in seconds')
+    parser.add_argument('--warmup', type=int, default=50, help='Untimed requests before each level')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--output', '-o', default='benchmark_api_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    levels = [int(c) for c in args.concurrency.split(',')]
+    workload = build_workload(args.requests, args.predict_share, args.matches, args.players)
+    site = start_fake_site(args.players, args.site_delay)
+
+    print("=" * 80)
+    print(f"API BENCHMARK ({args.requests} requests/level, {args.predict_share:.0%} /predict)")
+    print("=" * 80)
+
+    results = {}
+    try:
+        targets = []
+        if args.target in ('client', 'both'):
+            targets.append(lambda: TestClientTarget(site.url))
+        if args.target in ('gunicorn', 'both'):
+            targets.append(lambda: GunicornTarget(site.url, args.workers))
+
+        for make_target in targets:
+            target = make_target()
+            try:
+                results[target.name] = []
+                for concurrency in levels:
+                    target.reset()
+                    summary = run_level(target, workload, concurrency, args.warmup)
+                    results[target.name].append(summary)
+                    print_level(target.name, summary)
+            finally:
+                target.close()
+    finally:
+        site.stop()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
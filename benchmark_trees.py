@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: flat NumPy tree evaluator (api/trees.py) vs sklearn predict
+Checks both give identical predictions, then times them at several batch sizes.
+The crossover is where api/trees.py SKLEARN_MIN_ROWS should sit.
+"""
+import pickle
+import timeit
+import numpy as np
+
+from api.features import build_feature_matrix
+from api.trees import compile_model
+
+MODEL_FILES = [
+    'models/model1_ridge.pkl',
+    'models/model2_gb_conservative.pkl',
+    'models/model3_gb_balanced.pkl',
+    'models/model4_gb_aggressive.pkl',
+]
+
+# 1 match = 4 rows, which is what /predict scores per request
+BATCH_MATCHES = [1, 16, 256, 4096]
+
+
+def random_features(n_matches, seed=42):
+    """Feature rows for random (but plausible) doubles matches"""
+    rng = np.random.default_rng(seed)
+    ratings = np.round(rng.uniform(2.5, 6.5, (n_matches, 4)), 3)
+    scores = rng.integers(0, 12, (n_matches, 2))
+    scores[:, 0] = np.where(scores[:, 0] == scores[:, 1], 11, scores[:, 0])
+    return build_feature_matrix(ratings, scores).reshape(-1, 14)
+
+
+def time_per_call(fn, min_time=0.2):
+    """Best-of-5 seconds per call"""
+    number, _ = timeit.Timer(fn).autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    print("=" * 80)
+    print("TREE EVALUATOR BENCHMARK (sklearn predict vs api/trees.py)")
+    print("=" * 80)
+
+    for model_file in MODEL_FILES:
+        with open(model_file, 'rb') as f:
+            estimator = pickle.load(f)[0]
+        flat = compile_model(estimator)
+
+        print(f"\n{model_file} ({type(estimator).__name__})")
+        print(f"{'Rows':>8} {'sklearn':>12} {'flat':>12} {'speedup':>9}  identical")
+        print("-" * 60)
+
+        for n_matches in BATCH_MATCHES:
+            X = random_features(n_matches)
+            identical = np.array_equal(estimator.predict(X), flat.predict_flat(X))
+            t_sklearn = time_per_call(lambda: estimator.predict(X))
+            t_flat = time_per_call(lambda: flat.predict_flat(X))
+            print(f"{len(X):>8} {t_sklearn * 1e6:>10.1f}us {t_flat * 1e6:>10.1f}us "
+                  f"{t_sklearn / t_flat:>8.1f}x  {'yes' if identical else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,32 +4,12 @@ Compare predictions from all 4 model variants on test scenarios
 import pickle
 import numpy as np
 
-def predict_scenario(model, features, team1_p1, team1_p2, team2_p1, team2_p2, score1, score2):
-    """Predict rating changes for a given scenario"""
-    won_t1 = 1 if score1 > score2 else 0
-    score_margin = score1 - score2
-    total_points = abs(score_margin)
-    
-    opp_avg = (team2_p1 + team2_p2) / 2
-    partner_rating = team1_p2
-    
-    # Build features
-    rating_diff = team1_p1 - opp_avg
-    partner_diff = team1_p1 - partner_rating
-    team_avg = (team1_p1 + partner_rating) / 2
-    team_vs_opp = team_avg - opp_avg
-    opp_spread = abs(team2_p1 - team2_p2)
-    won_x_rating_diff = won_t1 * rating_diff
-    won_x_score_margin = won_t1 * score_margin
-    rating_squared = team1_p1 ** 2
-    expected_outcome = 1 / (1 + 10 ** ((opp_avg - team1_p1) / 4))
-    surprise = won_t1 - expected_outcome
-    
-    X = [[won_t1, rating_diff, score_margin, total_points, partner_diff, team_vs_opp,
-          won_x_rating_diff, won_x_score_margin, rating_squared, surprise, opp_spread,
-          team1_p1, partner_rating, opp_avg]]
-    
-    return model.predict(X)[0]
+from api.features import build_feature_matrix
+
+def predict_scenario(model, team1_p1, team1_p2, team2_p1, team2_p2, score1, score2):
+    """Predict rating changes for a given scenario, one per player (T1P1, T1P2, T2P1, T2P2)"""
+    X = build_feature_matrix([[team1_p1, team1_p2, team2_p1, team2_p2]], [[score1, score2]])
+    return model.predict(X[0])
 
 # Load all models
 models = {}
@@ -95,18 +75,9 @@ for scenario in scenarios:
         }
         
         # Predict for all 4 players
-        w1 = predict_scenario(models[i], None, scenario['team1_p1'], scenario['team1_p2'], 
-                               scenario['team2_p1'], scenario['team2_p2'], 
-                               scenario['score1'], scenario['score2'])
-        w2 = predict_scenario(models[i], None, scenario['team1_p2'], scenario['team1_p1'], 
-                               scenario['team2_p1'], scenario['team2_p2'], 
-                               scenario['score1'], scenario['score2'])
-        l1 = predict_scenario(models[i], None, scenario['team2_p1'], scenario['team2_p2'], 
-                               scenario['team1_p1'], scenario['team1_p2'], 
-                               scenario['score2'], scenario['score1'])
-        l2 = predict_scenario(models[i], None, scenario['team2_p2'], scenario['team2_p1'], 
-                               scenario['team1_p1'], scenario['team1_p2'], 
-                               scenario['score2'], scenario['score1'])
+        w1, w2, l1, l2 = predict_scenario(models[i], scenario['team1_p1'], scenario['team1_p2'],
+                                          scenario['team2_p1'], scenario['team2_p2'],
+                                          scenario['score1'], scenario['score2'])
         
         print(f"{model_names[i]:<30} {w1:+.3f}       {w2:+.3f}       {l1:+.3f}       {l2:+.3f}")
 
@@ -1,21 +1,191 @@
+#!/usr/bin/env python3
+"""
+Export a pickled model to code that runs without scikit-learn
+
+Backends:
+  numpy    - (default) model arrays in a small .npz file plus a batched NumPy evaluator
+  m2cgen   - one big pure-Python expression (slow to import, one vector per call)
+  artifact - a memory-mappable .dupr file the API serves directly (see api/artifact.py)
+"""
+import argparse
+import os
 import pickle
-import m2cgen as m2c
 
-# Load the model
-with open('dupr_model.pkl', 'rb') as f:
-    data = pickle.load(f)
+import numpy as np
+
+from api.artifact import save_artifact
+from api.features import FEATURES
+from api.trees import FlatTreeEnsemble, compile_model
+
+HEADER = """# Auto-generated model code - DO NOT EDIT
+# Generated by convert_model.py from {source} ({model_type})
+"""
+
+# Evaluator emitted by the numpy backend. Mirrors api/trees.py so results are
+# bit-identical to the pickled sklearn model, but only needs NumPy.
+NUMPY_EVALUATOR = '''# Model arrays live in {data_file} next to this file
+import os
+import numpy as np
+
+_data = np.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), '{data_file}'))
+KIND = str(_data['kind'])
+N_FEATURES = int(_data['n_features'])
+
+if KIND == 'trees':
+    FEATURE = _data['feature'].astype(np.intp)
+    THRESHOLD = _data['threshold']
+    LEFT = _data['left'].astype(np.intp)
+    VALUE = _data['value']
+    ROOTS = _data['roots'].astype(np.intp)
+    BASE = float(_data['base'])
+    MAX_DEPTH = int(_data['max_depth'])
+else:
+    COEF = _data['coef']
+    INTERCEPT = float(_data['intercept'])
+
+CHUNK_ROWS = 256
+
+
+def _predict_trees(X):
+    X = X.astype(np.float32)
+    out = np.empty(len(X))
+    for start in range(0, len(X), CHUNK_ROWS):
+        chunk = X[start:start + CHUNK_ROWS]
+        n_rows = len(chunk)
+        flat_x = chunk.ravel()
+        row_start = (np.arange(n_rows, dtype=np.intp) * N_FEATURES)[:, None]
+        node = np.broadcast_to(ROOTS, (n_rows, len(ROOTS))).copy()
+        for _ in range(MAX_DEPTH):
+            x = flat_x[row_start + FEATURE[node]]
+            node = LEFT[node] + (x > THRESHOLD[node])
+        leaf_values = np.empty((n_rows, len(ROOTS) + 1))
+        leaf_values[:, 0] = BASE
+        leaf_values[:, 1:] = VALUE[node]
+        out[start:start + n_rows] = np.cumsum(leaf_values, axis=1)[:, -1]
+    return out
+
+
+def predict(input_vector):
+    """Predict for one feature vector (returns a float) or an (n, features) batch (returns an array)"""
+    X = np.asarray(input_vector, dtype=float)
+    single = X.ndim == 1
+    X = X.reshape(-1, N_FEATURES)
+    if KIND == 'trees':
+        out = _predict_trees(X)
+    else:
+        out = X @ COEF + INTERCEPT
+    return float(out[0]) if single else out
+'''
+
+
+def load_pickled_model(model_path):
+    """Load a model pickle, unwrapping the (model, features, deflation) tuple if needed"""
+    return load_pickled_tuple(model_path)[0]
+
+
+def load_pickled_tuple(model_path):
+    """(model, features or None, deflation) from a model pickle"""
+    with open(model_path, 'rb') as f:
+        data = pickle.load(f)
+    if isinstance(data, tuple) and len(data) == 3:
+        return data
     # Extract model from tuple if needed
-    model = data[0] if isinstance(data, tuple) else data
+    return (data[0] if isinstance(data, tuple) else data), None, 0.0
+
+
+def model_arrays(model):
+    """Flatten a fitted sklearn model into plain NumPy arrays"""
+    flat = compile_model(model, keep_estimator=False)
+    if isinstance(flat, FlatTreeEnsemble):
+        return {
+            'kind': np.array('trees'),
+            'n_features': np.array(flat.n_features),
+            'feature': flat.feature.astype(np.int16),
+            'threshold': flat.threshold,
+            'left': flat.left.astype(np.int32),
+            'value': flat.value,
+            'roots': flat.roots.astype(np.int32),
+            'base': np.array(flat.base),
+            'max_depth': np.array(flat.max_depth),
+        }
+    return {
+        'kind': np.array('linear'),
+        'n_features': np.array(flat.n_features),
+        'coef': flat.coef,
+        'intercept': np.array(flat.intercept),
+    }
+
+
+def export_numpy(model, source, output_file):
+    """Write the numpy backend: <output_file> plus <name>_data.npz next to it"""
+    name = os.path.splitext(os.path.basename(output_file))[0]
+    data_file = f'{name}_data.npz'
+    np.savez(os.path.join(os.path.dirname(output_file), data_file), **model_arrays(model))
+
+    with open(output_file, 'w') as f:
+        f.write(HEADER.format(source=source, model_type=type(model).__name__))
+        f.write(NUMPY_EVALUATOR.format(data_file=data_file))
+    return [output_file, os.path.join(os.path.dirname(output_file), data_file)]
+
+
+def export_m2cgen(model, source, output_file):
+    """Write the original m2cgen backend: a single nested Python expression"""
+    import m2cgen as m2c
+
+    python_code = m2c.export_to_python(model)
+    with open(output_file, 'w') as f:
+        f.write(HEADER.format(source=source, model_type=type(model).__name__))
+        f.write("# This is a pure Python implementation of the model\n\n")
+        f.write("def predict(input_vector):\n")
+        f.write("    return " + python_code + "\n")
+    return [output_file]
+
+
+def export_artifact(model, features, deflation, output_file):
+    """Write the artifact backend: a .dupr file with the model, features and deflation"""
+    return [save_artifact(output_file, model, features if features is not None else FEATURES, deflation)]
+
+
+# Code generators; the artifact backend also needs the features and deflation, so it's handled in convert()
+BACKENDS = {
+    'numpy': export_numpy,
+    'm2cgen': export_m2cgen,
+}
+BACKEND_NAMES = sorted([*BACKENDS, 'artifact'])
+
+
+def default_output(model_path, backend):
+    if backend == 'artifact':
+        return os.path.splitext(model_path)[0] + '.dupr'
+    return 'api/model_code.py'
+
+
+def convert(model_path='dupr_model.pkl', output_file=None, backend='numpy'):
+    """Convert a pickled model, returns the list of files written"""
+    output_file = output_file or default_output(model_path, backend)
+    model, features, deflation = load_pickled_tuple(model_path)
+    if backend == 'artifact':
+        return export_artifact(model, features, deflation, output_file)
+    return BACKENDS[backend](model, os.path.basename(model_path), output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a pickled model to sklearn-free Python')
+    parser.add_argument('model', nargs='*', default=['dupr_model.pkl'], help='Pickled model(s) (default: dupr_model.pkl)')
+    parser.add_argument('--output', '-o', help='Output path (default: api/model_code.py, or <model>.dupr for artifact)')
+    parser.add_argument('--backend', choices=BACKEND_NAMES, default='numpy', help='Output format (default: numpy)')
+    args = parser.parse_args()
+
+    if args.output and len(args.model) > 1:
+        parser.error('--output only works with a single model')
+
+    for model_path in args.model:
+        written = convert(model_path, args.output, args.backend)
 
-# Convert to pure Python
-python_code = m2c.export_to_python(model)
+        print(f"{model_path} converted with the {args.backend} backend successfully!")
+        for path in written:
+            print(f"File saved to: {path} ({os.path.getsize(path):,} bytes)")
 
-# Save to file
-with open('api/model_code.py', 'w') as f:
-    f.write("# Auto-generated model code - DO NOT EDIT\n")
-    f.write("# This is a pure Python implementation of the Gradient Boosting model\n\n")
-    f.write("def predict(input_vector):\n")
-    f.write("    return " + python_code + "\n")
 
-print("Model converted to pure Python successfully!")
-print("File saved to: api/model_code.py")
+if __name__ == "__main__":
+    main()
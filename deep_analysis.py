@@ -13,146 +13,34 @@ from sklearn.metrics import r2_score, mean_absolute_error
 import os
 import glob
 
-# Load all player data
-all_data = []
+from api.features import FEATURES, training_arrays
+
+# Load all player data - 4 records per match (one per player)
+X_parts = []
+y_parts = []
 player_data_dir = 'player_data'
 
 for csv_file in glob.glob(f'{player_data_dir}/*.csv'):
     try:
         df = pd.read_csv(csv_file)
-        player_name = os.path.basename(csv_file).replace('_dupr.csv', '').replace('-', ' ').title()
-        
-        # Process each match - create 4 records (one per player)
-        for _, row in df.iterrows():
-            # Team 1 Player 1
-            if pd.notna(row['team1_player1_rating_before']) and pd.notna(row['team1_player1_rating_change']):
-                # Calculate opponent average
-                opp_avg = (row['team2_player1_rating_before'] + row['team2_player2_rating_before']) / 2
-                partner_rating = row['team1_player2_rating_before']
-                
-                # Determine win/loss
-                score1 = row['game1_team1_score']
-                score2 = row['game1_team2_score']
-                if pd.notna(score1) and pd.notna(score2):
-                    won = 1 if score1 > score2 else 0
-                    score_margin = score1 - score2
-                else:
-                    continue
-                
-                all_data.append({
-                    'player_rating': row['team1_player1_rating_before'],
-                    'partner_rating': partner_rating,
-                    'opp_avg': opp_avg,
-                    'opp1_rating': row['team2_player1_rating_before'],
-                    'opp2_rating': row['team2_player2_rating_before'],
-                    'won': won,
-                    'score_margin': score_margin,
-                    'total_points': abs(score_margin),
-                    'rating_change': row['team1_player1_rating_change'],
-                })
-            
-            # Team 1 Player 2
-            if pd.notna(row['team1_player2_rating_before']) and pd.notna(row['team1_player2_rating_change']):
-                opp_avg = (row['team2_player1_rating_before'] + row['team2_player2_rating_before']) / 2
-                partner_rating = row['team1_player1_rating_before']
-                
-                score1 = row['game1_team1_score']
-                score2 = row['game1_team2_score']
-                if pd.notna(score1) and pd.notna(score2):
-                    won = 1 if score1 > score2 else 0
-                    score_margin = score1 - score2
-                else:
-                    continue
-                
-                all_data.append({
-                    'player_rating': row['team1_player2_rating_before'],
-                    'partner_rating': partner_rating,
-                    'opp_avg': opp_avg,
-                    'opp1_rating': row['team2_player1_rating_before'],
-                    'opp2_rating': row['team2_player2_rating_before'],
-                    'won': won,
-                    'score_margin': score_margin,
-                    'total_points': abs(score_margin),
-                    'rating_change': row['team1_player2_rating_change'],
-                })
-            
-            # Team 2 Player 1
-            if pd.notna(row['team2_player1_rating_before']) and pd.notna(row['team2_player1_rating_change']):
-                opp_avg = (row['team1_player1_rating_before'] + row['team1_player2_rating_before']) / 2
-                partner_rating = row['team2_player2_rating_before']
-                
-                score1 = row['game1_team2_score']
-                score2 = row['game1_team1_score']
-                if pd.notna(score1) and pd.notna(score2):
-                    won = 1 if score1 > score2 else 0
-                    score_margin = score1 - score2
-                else:
-                    continue
-                
-                all_data.append({
-                    'player_rating': row['team2_player1_rating_before'],
-                    'partner_rating': partner_rating,
-                    'opp_avg': opp_avg,
-                    'opp1_rating': row['team1_player1_rating_before'],
-                    'opp2_rating': row['team1_player2_rating_before'],
-                    'won': won,
-                    'score_margin': score_margin,
-                    'total_points': abs(score_margin),
-                    'rating_change': row['team2_player1_rating_change'],
-                })
-            
-            # Team 2 Player 2
-            if pd.notna(row['team2_player2_rating_before']) and pd.notna(row['team2_player2_rating_change']):
-                opp_avg = (row['team1_player1_rating_before'] + row['team1_player2_rating_before']) / 2
-                partner_rating = row['team2_player1_rating_before']
-                
-                score1 = row['game1_team2_score']
-                score2 = row['game1_team1_score']
-                if pd.notna(score1) and pd.notna(score2):
-                    won = 1 if score1 > score2 else 0
-                    score_margin = score1 - score2
-                else:
-                    continue
-                
-                all_data.append({
-                    'player_rating': row['team2_player2_rating_before'],
-                    'partner_rating': partner_rating,
-                    'opp_avg': opp_avg,
-                    'opp1_rating': row['team1_player1_rating_before'],
-                    'opp2_rating': row['team1_player2_rating_before'],
-                    'won': won,
-                    'score_margin': score_margin,
-                    'total_points': abs(score_margin),
-                    'rating_change': row['team2_player2_rating_change'],
-                })
+        X_file, y_file, _ = training_arrays(df)
+        X_parts.append(X_file)
+        y_parts.append(y_file)
     except Exception as e:
         print(f"Error processing {csv_file}: {e}")
         continue
 
 # Create DataFrame
-df = pd.DataFrame(all_data)
+df = pd.DataFrame(np.concatenate(X_parts), columns=FEATURES)
+df['rating_change'] = np.concatenate(y_parts)
 print(f"Total records: {len(df)}")
 print(f"Rating change stats: mean={df['rating_change'].mean():.3f}, median={df['rating_change'].median():.3f}")
 print(f"Zero changes: {(df['rating_change'] == 0).sum()} ({(df['rating_change'] == 0).sum() / len(df) * 100:.1f}%)")
 print()
 
-# Create additional features
-df['rating_diff'] = df['player_rating'] - df['opp_avg']
-df['partner_diff'] = df['player_rating'] - df['partner_rating']
-df['team_avg'] = (df['player_rating'] + df['partner_rating']) / 2
-df['team_vs_opp'] = df['team_avg'] - df['opp_avg']
-df['opp_spread'] = abs(df['opp1_rating'] - df['opp2_rating'])
-
-# Interaction terms
-df['won_x_rating_diff'] = df['won'] * df['rating_diff']
-df['won_x_score_margin'] = df['won'] * df['score_margin']
-df['rating_squared'] = df['player_rating'] ** 2
+# Extra feature not in the shared set
 df['rating_cubed'] = df['player_rating'] ** 3
 
-# Expected outcome (ELO formula)
-df['expected_outcome'] = 1 / (1 + 10 ** ((df['opp_avg'] - df['player_rating']) / 4))
-df['surprise'] = df['won'] - df['expected_outcome']
-
 print("="*80)
 print("MODEL COMPARISON")
 print("="*80)
@@ -164,9 +52,7 @@ feature_sets = {
     'With_Interactions': ['won', 'rating_diff', 'score_margin', 'total_points', 'won_x_rating_diff', 'won_x_score_margin'],
     'With_NonLinear': ['won', 'rating_diff', 'score_margin', 'player_rating', 'rating_squared', 'opp_avg', 'partner_rating'],
     'With_ELO': ['surprise', 'score_margin', 'player_rating', 'opp_avg', 'partner_rating', 'opp_spread'],
-    'All_Features': ['won', 'rating_diff', 'score_margin', 'total_points', 'partner_diff', 'team_vs_opp', 
-                     'won_x_rating_diff', 'won_x_score_margin', 'rating_squared', 'surprise', 'opp_spread',
-                     'player_rating', 'partner_rating', 'opp_avg'],
+    'All_Features': list(FEATURES),
 }
 
 y = df['rating_change'].values
@@ -0,0 +1,112 @@
+"""
+Local stand-in for pickleball.com, used by the tests and benchmarks
+
+Serves canned pages over real HTTP/1.1 (keep-alive included) and records every
+request and client connection so callers can check pooling and caching.
+
+    with FakePickleball() as site:
+        site.add_player('clayton-truex', rating=4.919)
+        pickleball.BASE_URL = site.url
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+def rating_history_page(player_name, rating=None, body=''):
+    """Minimal rating-history page; `rating` goes into the embedded JSON like the real site"""
+    data = f'{{"currentDuprDoublesRating":{rating}}}' if rating is not None else '{}'
+    return (
+        '<!DOCTYPE html><html><head><title>Rating History</title></head><body>'
+        f'<h1>{player_name}</h1>{body}'
+        f'<script id="__NEXT_DATA__" type="application/json">{data}</script>'
+        '</body></html>'
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        site = self.server.site
+        parsed = urlparse(self.path)
+        with site.lock:
+            site.requests.append(self.path)
+            site.connections.add(self.client_address)
+            status, body, content_type = site.pages.get(parsed.path, (404, 'Not Found', 'text/plain'))
+            if callable(body):
+                # Page callables may return (status, body) to vary the status per request
+                body = body(parsed)
+                if isinstance(body, tuple):
+                    status, body = body
+        site.before_response(parsed)
+
+        payload = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-body (streaming early exit) are expected
+        pass
+
+
+class FakePickleball:
+    """Threaded local HTTP server with configurable pages"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.pages = {}           # path -> (status, body or callable(parsed_url), content type)
+        self.requests = []        # every request path, in order
+        self.connections = set()  # distinct (host, port) client connections
+        self.delay = 0.0          # seconds to wait before answering
+        self.path_delays = {}     # path prefix -> extra seconds for matching requests
+        self.lock = threading.Lock()
+        self.server = _Server((host, port), _Handler)
+        self.server.site = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add_page(self, path, body, status=200, content_type='text/html; charset=utf-8'):
+        self.pages[path] = (status, body, content_type)
+
+    def add_player(self, player_slug, rating=None, body='', status=200):
+        """Serve /players/<slug>/rating-history"""
+        name = player_slug.replace('-', ' ').title()
+        self.add_page(f'/players/{player_slug}/rating-history', rating_history_page(name, rating, body), status)
+
+    def before_response(self, parsed_url):
+        delay = self.delay + sum(seconds for prefix, seconds in self.path_delays.items() if parsed_url.path.startswith(prefix))
+        if delay:
+            threading.Event().wait(delay)
+
+    def request_count(self, path_prefix=''):
+        with self.lock:
+            return sum(1 for path in self.requests if path.startswith(path_prefix))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
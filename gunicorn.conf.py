@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for the prediction API (used by render.yaml)
+
+Models are loaded once in the master before forking (preload_app), so every
+worker shares the same physical model pages copy-on-write and none of them
+pays the unpickle + sklearn import on its first request.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# Threaded workers: a /scrape_jobs event stream holds one thread for the whole
+# scrape, not a whole worker that /predict needs
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+preload_app = True
+
+# Tell api/app.py to load models at import time (i.e. in the master)
+os.environ.setdefault('PRELOAD_MODELS', '1')
+
+
+def when_ready(server):
+    # Runs in the master after the app (and models) are loaded, before any worker
+    # is forked. Freezing moves everything allocated so far out of the garbage
+    # collector's reach, so collections in the workers don't write to (and copy)
+    # the shared pages.
+    gc.freeze()
+    server.log.info("Froze %d preloaded objects for copy-on-write sharing", gc.get_freeze_count())
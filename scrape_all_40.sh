@@ -54,12 +54,23 @@ for player in "${players[@]}"; do
   echo "[$count/40] Scraping: $player"
   echo "===================="
   
-  python3 dupr_scraper.py "https://pickleball.com/players/$player/rating-history" 2>&1 | grep -E "Total matches"
+  # Players already on file only need their new matches (REFRESH=0 forces a full rescrape);
+  # an unfinished scrape is resumed below instead
+  if [ "${REFRESH:-1}" = "1" ] && [ -f "player_data/${player}_dupr.csv" ] \
+      && ! grep -q '"complete": false' "player_data/${player}_dupr.csv.checkpoint.json" 2>/dev/null; then
+    python3 dupr_scraper.py "https://pickleball.com/players/$player/rating-history" \
+      --refresh -o "player_data/${player}_dupr.csv" 2>&1 | grep -E "Added|up to date|left unchanged"
+    sleep 2
+    continue
+  fi
   
-  if [ -f dupr_data.csv ]; then
-    mv dupr_data.csv "player_data/${player}_dupr.csv"
+  # Written straight into player_data/ with its checkpoint, so an interrupted scrape resumes next time
+  if output=$(python3 dupr_scraper.py "https://pickleball.com/players/$player/rating-history" \
+      --resume -o "player_data/${player}_dupr.csv" 2>&1); then
+    echo "$output" | grep -E "Total matches"
     echo "✓ Saved to player_data/${player}_dupr.csv"
   else
+    echo "$output" | grep -E "✗"
     echo "✗ Failed to scrape $player"
   fi
   
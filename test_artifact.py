@@ -0,0 +1,70 @@
+"""
+Tests for the pickle-free .dupr model artifacts
+"""
+import glob
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from api import artifact
+from api.features import FEATURES, build_feature_matrix
+from api.registry import load_pickle
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+PICKLES = sorted(glob.glob(os.path.join(MODELS_DIR, '*.pkl')))
+
+
+def random_features(n_matches, seed=7):
+    rng = np.random.default_rng(seed)
+    ratings = np.round(rng.uniform(2.5, 6.5, (n_matches, 4)), 3)
+    scores = np.column_stack([np.full(n_matches, 11), rng.integers(0, 10, n_matches)])
+    return build_feature_matrix(ratings, scores).reshape(-1, len(FEATURES))
+
+
+@pytest.mark.parametrize('pickle_path', PICKLES, ids=os.path.basename)
+def test_round_trip_matches_pickle(tmp_path, pickle_path):
+    pickled = load_pickle(pickle_path)
+    path = artifact.save_artifact(str(tmp_path / 'model.dupr'), pickled['estimator'], pickled['features'], pickled['deflation'])
+
+    loaded = artifact.load_artifact(path)
+    X = random_features(100)
+
+    assert loaded['features'] == pickled['features']
+    assert loaded['deflation'] == pickled['deflation']
+    assert loaded['model_type'] == type(pickled['estimator']).__name__
+    assert np.array_equal(loaded['model'].predict(X), pickled['model'].predict_flat(X))
+    assert np.array_equal(loaded['model'].predict(X[:64]), pickled['estimator'].predict(X[:64]))
+
+
+@pytest.mark.parametrize('pickle_path', PICKLES, ids=os.path.basename)
+def test_committed_artifacts_are_current(pickle_path):
+    pickled = load_pickle(pickle_path)
+    loaded = artifact.load_artifact(pickle_path[:-len('.pkl')] + artifact.SUFFIX)
+    X = random_features(16)
+
+    assert np.array_equal(loaded['model'].predict(X), pickled['model'].predict_flat(X))
+
+
+def test_arrays_are_read_only_views_of_the_file():
+    loaded = artifact.load_artifact(os.path.join(MODELS_DIR, 'model3_gb_balanced.dupr'))
+    model = loaded['model']
+
+    for name in ('feature', 'threshold', 'left', 'value', 'roots'):
+        array = getattr(model, name)
+        assert not array.flags.writeable
+        assert isinstance(array.base, np.memmap)
+        assert array.ctypes.data % artifact.ALIGN == array.base.ctypes.data % artifact.ALIGN
+
+
+def test_rejects_foreign_and_future_files(tmp_path):
+    (tmp_path / 'junk.dupr').write_bytes(b'PK\x03\x04 definitely a zip file')
+    with pytest.raises(ValueError, match='not a .dupr'):
+        artifact.load_artifact(str(tmp_path / 'junk.dupr'))
+
+    data = bytearray(open(os.path.join(MODELS_DIR, 'model1_ridge.dupr'), 'rb').read())
+    data[8:12] = struct.pack('<I', artifact.FORMAT_VERSION + 1)
+    (tmp_path / 'future.dupr').write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='newer than supported'):
+        artifact.load_artifact(str(tmp_path / 'future.dupr'))
@@ -0,0 +1,65 @@
+"""
+Tests for the in-process LRU prediction cache
+"""
+import os
+import shutil
+
+from api import app as api_app
+from api.cache import LRUCache
+from api.registry import ModelRegistry
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MATCH = {'team1_player1': 5.088, 'team1_player2': 5.353, 'team2_player1': 5.148, 'team2_player2': 5.297,
+         'team1_score': 15, 'team2_score': 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    cache.get('a')          # a is now the most recently used
+    cache.put('d', 'D')
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    cache.put('e', 'E')
+    assert cache.get('a') is None
+    assert len(cache) == 3 and cache.stats()['evictions'] == 2
+
+
+def test_hit_and_miss_counters():
+    cache = LRUCache(maxsize=10)
+    cache.put('x', 1)
+
+    cache.get('x')
+    cache.get('x')
+    cache.get('y')
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+    assert stats['hit_ratio'] == round(2 / 3, 4)
+
+
+def test_reloading_one_model_keeps_the_others_cached(tmp_path, monkeypatch):
+    for name in ('model1_ridge.pkl', 'model3_gb_balanced.dupr'):
+        shutil.copy(os.path.join(MODELS_DIR, name), tmp_path)
+    registry = ModelRegistry(str(tmp_path), poll_interval=0)
+    registry.refresh()
+    cache = LRUCache(maxsize=100)
+    monkeypatch.setattr(api_app, 'registry', registry)
+    monkeypatch.setattr(api_app, 'prediction_cache', cache)
+    client = api_app.app.test_client()
+    for model in (1, 3):
+        client.post('/predict', json=dict(MATCH, model=model))
+
+    # A new model 1 file: a new registry generation
+    shutil.copy(os.path.join(MODELS_DIR, 'model4_gb_aggressive.pkl'), tmp_path / 'model1_ridge.pkl')
+    os.utime(tmp_path / 'model1_ridge.pkl', ns=(0, 1))
+    assert registry.refresh()
+    hits = cache.hits
+    client.post('/predict', json=dict(MATCH, model=3))
+    assert cache.hits == hits + 1
+
+    # Model 1's new version misses, its old entry just ages out
+    client.post('/predict', json=dict(MATCH, model=1))
+    assert cache.hits == hits + 1 and len(cache) == 3
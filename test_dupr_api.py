@@ -0,0 +1,142 @@
+"""
+Tests for the concurrent DUPR API lookup, against local mock endpoints
+"""
+import json
+import time
+from collections import OrderedDict
+
+import pytest
+
+from api import app as api_app
+from api import dupr_api, pickleball
+from fake_pickleball import FakePickleball
+
+
+@pytest.fixture
+def site(monkeypatch):
+    with FakePickleball() as fake:
+        monkeypatch.setattr(dupr_api, 'endpoint_stats', {})
+        monkeypatch.setattr(dupr_api, 'recent_misses', OrderedDict())
+        monkeypatch.setattr(dupr_api, 'API_URLS', [fake.url + '/slow/{dupr_id}', fake.url + '/fast/{dupr_id}'])
+        monkeypatch.setattr(pickleball, 'BASE_URL', fake.url)
+        pickleball.rating_cache.clear()
+        yield fake
+        pickleball.rating_cache.clear()
+
+
+def add_rating(site, path, body):
+    site.add_page(path, json.dumps(body), content_type='application/json')
+
+
+def test_fastest_endpoint_wins(site):
+    add_rating(site, '/slow/N7Z7G7', {'doubles': 4.1})
+    add_rating(site, '/fast/N7Z7G7', {'rating': {'doubles': 4.267}})
+    site.path_delays['/slow/'] = 1.0
+
+    start = time.monotonic()
+    rating, url = dupr_api.fetch_rating('N7Z7G7')
+
+    assert rating == 4.267
+    assert url.endswith('/fast/{dupr_id}')
+    assert time.monotonic() - start < 0.8
+
+
+def test_invalid_answers_are_skipped(site):
+    add_rating(site, '/slow/N7Z7G7', {'singles': 3.9})
+    site.add_page('/fast/N7Z7G7', 'gone', status=404)
+
+    assert dupr_api.fetch_rating('N7Z7G7') == (None, None)
+    assert all(stats.failures == 1 for stats in dupr_api.endpoint_stats.values())
+
+    add_rating(site, '/slow/N7Z7G7', {'doubles': 3.95})
+    # The miss is remembered for MISS_TTL: no endpoint is asked again until then
+    assert dupr_api.fetch_rating('N7Z7G7') == (None, None)
+    assert site.request_count('/slow/') == 1
+
+    dupr_api.recent_misses.clear()
+    assert dupr_api.fetch_rating('N7Z7G7')[0] == 3.95
+
+
+def test_outage_is_not_remembered_as_a_miss(site):
+    site.add_page('/slow/N7Z7G7', 'gone', status=404)
+    site.add_page('/fast/N7Z7G7', 'oops', status=500)
+    assert dupr_api.fetch_rating('N7Z7G7') == (None, None)
+
+    # Nobody answered within the deadline
+    site.path_delays['/'] = 0.5
+    assert dupr_api.fetch_rating('N7Z7G7', timeout=0.1) == (None, None)
+    site.path_delays.clear()
+
+    assert not dupr_api.recent_misses
+    add_rating(site, '/fast/N7Z7G7', {'doubles': 3.95})
+    assert dupr_api.fetch_rating('N7Z7G7')[0] == 3.95
+
+
+def test_slow_endpoint_is_demoted(site, monkeypatch):
+    monkeypatch.setattr(dupr_api, 'HEDGE_DELAY', 0.2)
+    add_rating(site, '/slow/N7Z7G7', {'doubles': 4.1})
+    add_rating(site, '/fast/N7Z7G7', {'doubles': 4.267})
+    site.path_delays['/slow/'] = 0.3
+
+    dupr_api.fetch_rating('N7Z7G7')
+    time.sleep(0.4)  # let the losing request land in the stats
+    slow, fast = dupr_api.API_URLS
+    assert dupr_api.is_demoted(slow)
+    assert not dupr_api.is_demoted(fast)
+
+    # Demoted endpoints are held back while a primary answers in time
+    before = site.request_count('/slow/')
+    assert dupr_api.fetch_rating('N7Z7G7')[0] == 4.267
+    assert site.request_count('/slow/') == before
+
+    # ...but still asked when the primaries come up empty
+    site.add_page('/fast/N7Z7G7', 'gone', status=404)
+    assert dupr_api.fetch_rating('N7Z7G7')[0] == 4.1
+
+
+def test_scrape_dupr_fast_path(site):
+    add_rating(site, '/fast/N7Z7G7', {'doubles': 4.2671})
+    site.add_page('/slow/N7Z7G7', 'oops', status=500)
+    client = api_app.app.test_client()
+
+    response = client.post('/scrape_dupr', json={'dupr_id': 'N7Z7G7', 'url': 'https://pickleball.com/players/jessica-wang'})
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'dupr_rating': 4.267,
+        'player_name': 'Jessica Wang',
+        'player_slug': 'jessica-wang',
+        'dupr_id': 'N7Z7G7',
+        'source': 'dupr_api',
+        'source_url': site.url + '/fast/N7Z7G7'
+    }
+    assert site.request_count('/players/') == 0
+
+
+def test_scrape_dupr_falls_back_to_html(site):
+    site.add_player('jessica-wang', rating=4.3)
+    client = api_app.app.test_client()
+
+    response = client.post('/scrape_dupr', json={'dupr_id': 'UNKNOWN', 'url': 'https://pickleball.com/players/jessica-wang'})
+
+    assert response.status_code == 200
+    assert response.get_json()['source'] == 'json_data'
+    assert response.get_json()['dupr_id'] == 'UNKNOWN'
+
+
+def test_unknown_id_goes_straight_to_html_next_time(site, monkeypatch):
+    site.add_player('jessica-wang', rating=4.3)
+    site.path_delays['/slow/'] = 0.5
+    site.add_page('/slow/UNKNOWN', 'gone', status=404)
+    site.add_page('/fast/UNKNOWN', 'gone', status=404)
+    client = api_app.app.test_client()
+    body = {'dupr_id': 'UNKNOWN', 'url': 'https://pickleball.com/players/jessica-wang'}
+
+    first = client.post('/scrape_dupr', json=body)
+    pickleball.rating_cache.clear()
+    start = time.monotonic()
+    second = client.post('/scrape_dupr', json=body)
+
+    assert first.get_json() == second.get_json()
+    assert time.monotonic() - start < 0.4
+    assert site.request_count('/slow/') == site.request_count('/fast/') == 1
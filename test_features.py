@@ -0,0 +1,75 @@
+"""
+Tests for api/features.py against the feature rows /predict used to build by hand
+"""
+import numpy as np
+
+from api.features import FEATURES, build_feature_matrix
+
+
+def hand_built_rows(team1_player1, team1_player2, team2_player1, team2_player2, team1_score, team2_score):
+    """The four feature rows exactly as the original /predict built them, one player at a time"""
+    team1_won = 1 if team1_score > team2_score else 0
+    team2_won = 1 - team1_won
+    score_margin_t1 = team1_score - team2_score
+    score_margin_t2 = team2_score - team1_score
+    total_points = abs(score_margin_t1)
+    opp_avg_for_t1 = (team2_player1 + team2_player2) / 2
+    opp_avg_for_t2 = (team1_player1 + team1_player2) / 2
+
+    # The original computed the team average once per team, player 1 first
+    team_avg_t1 = (team1_player1 + team1_player2) / 2
+    team_avg_t2 = (team2_player1 + team2_player2) / 2
+
+    rows = []
+    for player, partner, team_avg, opp_avg, won, margin, opp1, opp2 in [
+        (team1_player1, team1_player2, team_avg_t1, opp_avg_for_t1, team1_won, score_margin_t1, team2_player1, team2_player2),
+        (team1_player2, team1_player1, team_avg_t1, opp_avg_for_t1, team1_won, score_margin_t1, team2_player1, team2_player2),
+        (team2_player1, team2_player2, team_avg_t2, opp_avg_for_t2, team2_won, score_margin_t2, team1_player1, team1_player2),
+        (team2_player2, team2_player1, team_avg_t2, opp_avg_for_t2, team2_won, score_margin_t2, team1_player1, team1_player2),
+    ]:
+        rating_diff = player - opp_avg
+        expected_outcome = 1 / (1 + 10 ** ((opp_avg - player) / 4))
+        rows.append([won, rating_diff, margin, total_points, player - partner, team_avg - opp_avg,
+                     won * rating_diff, won * margin, player ** 2, won - expected_outcome, abs(opp1 - opp2),
+                     player, partner, opp_avg])
+    return rows
+
+
+def random_matches(n, seed=5):
+    rng = np.random.default_rng(seed)
+    ratings = np.round(rng.uniform(2.0, 7.0, (n, 4)), 3)
+    loser = rng.integers(0, 15, n)
+    winner = np.maximum(11, loser + 2)
+    team1_won = rng.random(n) < 0.5
+    scores = np.column_stack([np.where(team1_won, winner, loser), np.where(team1_won, loser, winner)])
+    return ratings, scores
+
+
+SURPRISE = FEATURES.index('surprise')
+EXACT = [i for i in range(len(FEATURES)) if i != SURPRISE]
+
+
+def assert_same_rows(built, expected):
+    assert np.array_equal(built[:, EXACT], expected[:, EXACT])
+    # NumPy's vectorized power and Python's ** may round 10 ** x one ulp apart,
+    # so surprise (won - expected outcome, |x| <= 1) can differ in its last bits
+    np.testing.assert_allclose(built[:, SURPRISE], expected[:, SURPRISE], rtol=0, atol=1e-15)
+
+
+def test_matches_hand_built_predict_rows():
+    ratings, scores = random_matches(500)
+
+    built = build_feature_matrix(ratings, scores)
+
+    assert built.shape == (500, 4, len(FEATURES))
+    for i in range(len(ratings)):
+        assert_same_rows(built[i], np.array(hand_built_rows(*map(float, ratings[i]), *map(int, scores[i]))))
+
+
+def test_predict_example_rows():
+    # The README example: a 15-1 win by the lower-rated team 1
+    built = build_feature_matrix([[5.088, 5.353, 5.148, 5.297]], [[15, 1]])[0]
+
+    assert_same_rows(built, np.array(hand_built_rows(5.088, 5.353, 5.148, 5.297, 15, 1)))
+    assert built[:, FEATURES.index('won')].tolist() == [1, 1, 0, 0]
+    assert built[:, FEATURES.index('score_margin')].tolist() == [14, 14, -14, -14]
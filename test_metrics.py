@@ -0,0 +1,60 @@
+"""
+Tests for the /metrics endpoint and the metrics primitives
+"""
+import re
+
+from api import app as api_app
+from api import metrics
+
+MATCH = {
+    'team1_player1': 4.0, 'team1_player2': 3.8,
+    'team2_player1': 3.9, 'team2_player2': 4.1,
+    'team1_score': 11, 'team2_score': 7
+}
+
+
+def sample(text, name, **labels):
+    """Value of one sample line in Prometheus text, or None"""
+    for line in text.splitlines():
+        if line.startswith(name + '{') or line.startswith(name + ' '):
+            if all(f'{key}="{value}"' in line for key, value in labels.items()):
+                return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = metrics.Histogram('test_latency_seconds', 'test', ['stage'], buckets=(0.1, 1.0))
+    metrics.REGISTRY.remove(hist)
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value, stage='a')
+
+    lines = [f'{name}{labels} {value}' for name, labels, value in hist.samples()]
+
+    assert lines == [
+        'test_latency_seconds_bucket{stage="a",le="0.1"} 1',
+        'test_latency_seconds_bucket{stage="a",le="1.0"} 3',
+        'test_latency_seconds_bucket{stage="a",le="+Inf"} 4',
+        'test_latency_seconds_sum{stage="a"} 4.05',
+        'test_latency_seconds_count{stage="a"} 4',
+    ]
+
+
+def test_metrics_endpoint_reports_requests_and_stages():
+    client = api_app.app.test_client()
+    api_app.prediction_cache.clear()
+    assert client.post('/predict', json=MATCH).status_code == 200
+    assert client.post('/predict', json=MATCH).status_code == 200
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert sample(text, 'dupr_http_request_duration_seconds_count', endpoint='predict', status='200') >= 2
+    for stage in ('parse_json', 'cache_lookup', 'features', 'predict'):
+        assert sample(text, 'dupr_stage_duration_seconds_count', endpoint='predict', stage=stage) >= 1
+    assert sample(text, 'dupr_model_load_seconds') > 0
+    assert sample(text, 'dupr_cache_lookups_total', cache='prediction', result='hit') >= 1
+    assert 0 < sample(text, 'dupr_cache_hit_ratio', cache='prediction') <= 1
+    # Every non-comment line is "name{labels} value"
+    assert all(re.match(r'^[a-z_]+(\{.*\})? \S+$', line) for line in text.splitlines() if not line.startswith('#'))
@@ -2,8 +2,17 @@
 Unit tests for DUPR rating prediction model
 Tests real cases from the dataset to ensure model sanity
 """
-import requests
+import glob
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from api.features import RATING_KEYS
 
 API_URL = "http://localhost:8080/predict"  # Change to production URL when deployed
 
@@ -148,6 +157,41 @@ TEST_CASES = [
 ]
 
 
+PREDICTION_KEYS = ['team1_p1_change', 'team1_p2_change', 'team2_p1_change', 'team2_p2_change']
+
+# In-process mode scores cases through /predict_batch this many at a time
+BATCH_SIZE = 1000
+
+
+def prediction_from_response(result):
+    """Flatten a /predict response into the PREDICTION_KEYS layout"""
+    return {
+        "team1_p1_change": result['team1']['player1']['rating_change'],
+        "team1_p2_change": result['team1']['player2']['rating_change'],
+        "team2_p1_change": result['team2']['player1']['rating_change'],
+        "team2_p2_change": result['team2']['player2']['rating_change']
+    }
+
+
+def check_prediction(test, pred, tolerance):
+    """Compare one prediction with its expected changes, returns (all_close, max error, report lines)"""
+    lines = []
+    all_close = True
+    max_error = 0.0
+    for key in test['expected'].keys():
+        expected = test['expected'][key]
+        predicted = pred[key]
+        error = abs(predicted - expected)
+        max_error = max(max_error, error)
+
+        status = "✓" if error <= tolerance else "✗"
+        lines.append(f"  {status} {key:20s}: Expected {expected:+.3f}, Got {predicted:+.3f} (error: {error:.3f})")
+
+        if error > tolerance:
+            all_close = False
+    return all_close, max_error, lines
+
+
 def test_model_predictions(api_url=API_URL, tolerance=0.10):
     """
     Test model predictions against real DUPR data
@@ -171,28 +215,11 @@ def test_model_predictions(api_url=API_URL, tolerance=0.10):
             # Make API request
             response = requests.post(api_url, json=test['input'])
             response.raise_for_status()
-            result = response.json()
-            
-            # Extract predictions
-            pred = {
-                "team1_p1_change": result['team1']['player1']['rating_change'],
-                "team1_p2_change": result['team1']['player2']['rating_change'],
-                "team2_p1_change": result['team2']['player1']['rating_change'],
-                "team2_p2_change": result['team2']['player2']['rating_change']
-            }
+            pred = prediction_from_response(response.json())
             
             # Check each prediction
-            all_close = True
-            for key in test['expected'].keys():
-                expected = test['expected'][key]
-                predicted = pred[key]
-                error = abs(predicted - expected)
-                
-                status = "✓" if error <= tolerance else "✗"
-                print(f"  {status} {key:20s}: Expected {expected:+.3f}, Got {predicted:+.3f} (error: {error:.3f})")
-                
-                if error > tolerance:
-                    all_close = False
+            all_close, _, lines = check_prediction(test, pred, tolerance)
+            print("\n".join(lines))
             
             if all_close:
                 passed += 1
@@ -213,13 +240,155 @@ def test_model_predictions(api_url=API_URL, tolerance=0.10):
     return passed, failed
 
 
+def predict_in_process(cases):
+    """Predictions for every case straight from api.app (no server), via /predict_batch"""
+    from api import app as api_app
+
+    client = api_app.app.test_client()
+    predictions = []
+    for start in range(0, len(cases), BATCH_SIZE):
+        chunk = cases[start:start + BATCH_SIZE]
+        response = client.post('/predict_batch', json={'matches': [case['input'] for case in chunk]})
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict_batch failed for cases {start}-{start + len(chunk) - 1}: {response.get_json()}")
+        predictions.extend(prediction_from_response(p) for p in response.get_json()['predictions'])
+    return predictions
+
+
+def predict_concurrently(cases, api_url, workers=16):
+    """Predictions for every case from a running server, `workers` /predict requests at a time"""
+    local = threading.local()
+
+    def predict_one(case):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        try:
+            response = local.session.post(api_url, json=case['input'], timeout=30)
+            response.raise_for_status()
+            return prediction_from_response(response.json())
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(predict_one, cases))
+
+
+def run_cases(cases, predictions, tolerance=0.10, verbose=None):
+    """
+    Check predictions against expected changes, returns (passed, failed)
+
+    Prints every case for short lists; for long ones only the failures and a summary.
+    """
+    if verbose is None:
+        verbose = len(cases) <= 20
+
+    passed = 0
+    failed = 0
+    errors = []
+    for i, (test, pred) in enumerate(zip(cases, predictions), 1):
+        if isinstance(pred, Exception):
+            failed += 1
+            print(f"\n{i}. {test['name']}\n  ERROR: {pred}\n  FAILED ✗")
+            continue
+        all_close, max_error, lines = check_prediction(test, pred, tolerance)
+        errors.extend(abs(pred[key] - test['expected'][key]) for key in test['expected'])
+        if all_close:
+            passed += 1
+        else:
+            failed += 1
+        if verbose or not all_close:
+            print(f"\n{i}. {test['name']}")
+            print("\n".join(lines))
+            print("  PASSED ✓" if all_close else f"  FAILED ✗ (max error {max_error:.3f} exceeds tolerance)")
+
+    print("\n" + "=" * 80)
+    print(f"RESULTS: {passed}/{len(cases)} passed, {failed}/{len(cases)} failed")
+    if errors:
+        print(f"Mean absolute error: {np.mean(errors):.4f} over {len(errors)} player predictions")
+    print("=" * 80)
+    return passed, failed
+
+
+def match_key(ratings, scores):
+    """Identifies a match however it is ordered: players within a team, and which team comes first"""
+    teams = [(tuple(sorted(np.round(ratings[:2], 3))), scores[0]), (tuple(sorted(np.round(ratings[2:], 3))), scores[1])]
+    return tuple(sorted(teams))
+
+
+def generate_cases(data_dir='player_data', output_file=None):
+    """
+    Build test cases from every real match in data_dir/*.csv
+
+    Matches missing a rating, rating change or game 1 score are skipped, and the
+    same match scraped from several players' histories is kept once.
+    """
+    import pandas as pd
+    from api.features import match_arrays
+
+    cases = []
+    seen = set()
+    for csv_file in sorted(glob.glob(os.path.join(data_dir, '*.csv'))):
+        ratings, changes, scores = match_arrays(pd.read_csv(csv_file))
+        complete = ~(np.isnan(ratings).any(axis=1) | np.isnan(changes).any(axis=1) | np.isnan(scores).any(axis=1))
+        player = os.path.basename(csv_file).replace('_dupr.csv', '')
+        for i in np.flatnonzero(complete):
+            key = match_key(ratings[i], scores[i])
+            if key in seen or scores[i, 0] == scores[i, 1]:
+                continue
+            seen.add(key)
+            case_input = dict(zip(RATING_KEYS, map(float, ratings[i])))
+            case_input.update(team1_score=int(scores[i, 0]), team2_score=int(scores[i, 1]))
+            cases.append({
+                "name": f"{player} match {i}",
+                "input": case_input,
+                "expected": dict(zip(PREDICTION_KEYS, (round(float(c), 3) for c in changes[i])))
+            })
+
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(cases, f, indent=1)
+    return cases
+
+
+def load_cases(case_file):
+    with open(case_file) as f:
+        return json.load(f)
+
+
 if __name__ == "__main__":
+    import argparse
     import sys
     
-    # Allow custom API URL from command line
-    api_url = sys.argv[1] if len(sys.argv) > 1 else API_URL
+    parser = argparse.ArgumentParser(description='Check model predictions against known DUPR rating changes')
+    parser.add_argument('api_url', nargs='?', default=API_URL, help=f'Prediction API URL (default: {API_URL})')
+    parser.add_argument('--in-process', action='store_true', help='Run against api.app directly, no server needed')
+    parser.add_argument('--workers', type=int, default=1, help='Concurrent requests against api_url (default: 1, sequential)')
+    parser.add_argument('--cases', help='JSON case file (default: the built-in TEST_CASES)')
+    parser.add_argument('--generate-cases', metavar='FILE', help='Write a case file from player_data/*.csv and exit')
+    parser.add_argument('--data-dir', default='player_data', help='Scraped CSV directory for --generate-cases')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Acceptable error per player (default: 0.10)')
+    parser.add_argument('--max-failure-rate', type=float, default=0.0, help='Fraction of cases allowed to fail (default: 0)')
+    args = parser.parse_args()
+    
+    if args.generate_cases:
+        cases = generate_cases(args.data_dir, args.generate_cases)
+        print(f"Wrote {len(cases)} cases from {args.data_dir}/*.csv to {args.generate_cases}")
+        sys.exit(0)
+    
+    cases = load_cases(args.cases) if args.cases else TEST_CASES
     
-    passed, failed = test_model_predictions(api_url)
+    if args.in_process or args.workers > 1 or args.cases:
+        start = time.perf_counter()
+        if args.in_process:
+            predictions = predict_in_process(cases)
+        else:
+            predictions = predict_concurrently(cases, args.api_url, args.workers)
+        elapsed = time.perf_counter() - start
+        passed, failed = run_cases(cases, predictions, args.tolerance)
+        print(f"Scored {len(cases)} cases in {elapsed:.2f}s ({'in-process' if args.in_process else f'{args.workers} workers'})")
+    else:
+        # Original mode: one request at a time against a running server
+        passed, failed = test_model_predictions(args.api_url, args.tolerance)
     
-    # Exit with non-zero code if any tests failed
-    sys.exit(1 if failed > 0 else 0)
+    # Exit with non-zero code if too many tests failed
+    sys.exit(1 if failed > args.max_failure_rate * len(cases) else 0)
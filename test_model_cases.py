@@ -0,0 +1,47 @@
+"""
+Tests for test_model.py's generated case files and in-process mode
+"""
+import pandas as pd
+
+import test_model
+from api import app as api_app
+from api.features import RATING_BEFORE_COLUMNS, RATING_CHANGE_COLUMNS, SCORE_COLUMNS
+
+
+def write_player_csv(path, rows):
+    columns = RATING_BEFORE_COLUMNS + RATING_CHANGE_COLUMNS + SCORE_COLUMNS
+    pd.DataFrame(rows, columns=columns).to_csv(path, index=False)
+
+
+def test_generate_cases_from_player_csvs(tmp_path):
+    match = [5.088, 5.353, 5.148, 5.297, 0.038, 0.030, -0.093, -0.175, 15, 1]
+    write_player_csv(tmp_path / 'alice_dupr.csv', [
+        match,
+        [4.0, 4.1, 3.9, None, 0.01, 0.02, -0.01, -0.02, 11, 5],   # missing rating
+        [4.0, 4.1, 3.9, 4.2, 0.01, 0.02, -0.01, -0.02, None, None]  # no game 1 score
+    ])
+    write_player_csv(tmp_path / 'bob_dupr.csv', [match])          # same match, other history
+    # The same match again from the partner's and an opponent's history
+    write_player_csv(tmp_path / 'carol_dupr.csv', [[5.353, 5.088, 5.148, 5.297, 0.030, 0.038, -0.093, -0.175, 15, 1]])
+    write_player_csv(tmp_path / 'dave_dupr.csv', [[5.297, 5.148, 5.088, 5.353, -0.175, -0.093, 0.038, 0.030, 1, 15]])
+
+    cases = test_model.generate_cases(str(tmp_path), str(tmp_path / 'cases.json'))
+
+    assert cases == [{
+        'name': 'alice match 0',
+        'input': dict(test_model.TEST_CASES[0]['input']),
+        'expected': test_model.TEST_CASES[0]['expected']
+    }]
+    assert test_model.load_cases(str(tmp_path / 'cases.json')) == cases
+
+
+def test_in_process_predictions_match_predict_endpoint(monkeypatch):
+    monkeypatch.setattr(test_model, 'BATCH_SIZE', 3)   # exercise chunking
+    client = api_app.app.test_client()
+
+    predictions = test_model.predict_in_process(test_model.TEST_CASES)
+
+    assert len(predictions) == len(test_model.TEST_CASES)
+    for case, pred in zip(test_model.TEST_CASES, predictions):
+        single = test_model.prediction_from_response(client.post('/predict', json=case['input']).get_json())
+        assert pred == single
@@ -0,0 +1,62 @@
+"""
+Tests for /predict_ensemble
+"""
+import numpy as np
+import pytest
+
+from api import app as api_app
+
+MATCH = {
+    'team1_player1': 5.088, 'team1_player2': 5.353,
+    'team2_player1': 5.148, 'team2_player2': 5.297,
+    'team1_score': 15, 'team2_score': 1
+}
+PLAYERS = [('team1', 'player1'), ('team1', 'player2'), ('team2', 'player1'), ('team2', 'player2')]
+
+
+@pytest.fixture
+def client():
+    api_app.prediction_cache.clear()
+    return api_app.app.test_client()
+
+
+def changes(prediction):
+    return [prediction[team][player]['rating_change'] for team, player in PLAYERS]
+
+
+def test_every_model_matches_predict(client):
+    body = client.post('/predict_ensemble', json=MATCH).get_json()
+
+    assert sorted(body['models']) == ['1', '2', '3', '4']
+    for num, prediction in body['models'].items():
+        assert prediction == client.post('/predict', json=dict(MATCH, model=int(num))).get_json()
+    per_model = np.array([changes(p) for p in body['models'].values()])
+    assert changes(body['ensemble']) == list(np.round(per_model.mean(axis=0), 3))
+
+
+def test_weights_and_model_selection(client):
+    body = client.post('/predict_ensemble', json=dict(MATCH, models=[1, 3], weights={'1': 0, '3': 2})).get_json()
+
+    assert sorted(body['models']) == ['1', '3']
+    assert body['weights'] == {'1': 0.0, '3': 1.0}
+    assert body['ensemble'] == body['models']['3']
+
+    assert client.post('/predict_ensemble', json=dict(MATCH, models=[9])).status_code == 400
+    assert client.post('/predict_ensemble', json=dict(MATCH, weights={'1': -1})).status_code == 400
+
+
+def test_batch_parallel_path_matches_sequential(client, monkeypatch):
+    rng = np.random.default_rng(0)
+    matches = [
+        dict(zip(['team1_player1', 'team1_player2', 'team2_player1', 'team2_player2'], np.round(rng.uniform(3, 6, 4), 3).tolist()),
+             team1_score=11, team2_score=int(rng.integers(0, 10)))
+        for _ in range(30)
+    ]
+    sequential = client.post('/predict_ensemble', json={'matches': matches}).get_json()
+
+    api_app.prediction_cache.clear()
+    monkeypatch.setattr(api_app, 'ENSEMBLE_PARALLEL_ROWS', 1)
+    parallel = client.post('/predict_ensemble', json={'matches': matches}).get_json()
+
+    assert parallel == sequential
+    assert parallel['count'] == 30
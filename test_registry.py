@@ -0,0 +1,174 @@
+"""
+Tests for the hot-reloading model registry
+"""
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from api import app as api_app
+from api import registry as registry_module
+from api.registry import ModelRegistry
+from api.trees import SKLEARN_MIN_ROWS
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+MATCH = {
+    'team1_player1': 5.088, 'team1_player2': 5.353,
+    'team2_player1': 5.148, 'team2_player2': 5.297,
+    'team1_score': 15, 'team2_score': 1
+}
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    shutil.copy(os.path.join(MODELS_DIR, 'model1_ridge.pkl'), tmp_path)
+    return tmp_path
+
+
+def replace_file(target, source):
+    """Overwrite target with source's bytes and make sure the mtime moves"""
+    shutil.copyfile(source, target)
+    stat = os.stat(target)
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_discovers_every_variant():
+    registry = ModelRegistry(MODELS_DIR, poll_interval=0)
+    registry.refresh()
+
+    assert sorted(registry.models) == [1, 2, 3, 4]
+    # The pickle-free artifact wins over the pickle next to it...
+    assert registry.models[2]['file'] == 'model2_gb_conservative.dupr'
+    assert all(len(data['version']) == 12 for data in registry.models.values())
+    # ...and isn't unpickled unless MODEL_SKLEARN_BATCHES opts in
+    assert registry.models[2]['model'].estimator is None
+    assert registry.describe()['models'][2]['large_batches'] == 'flat'
+    assert registry.describe()['models'][1]['large_batches'] == 'flat'
+
+
+@pytest.fixture
+def sklearn_batches(monkeypatch):
+    monkeypatch.setattr(registry_module, 'SKLEARN_BATCHES', True)
+
+
+def test_large_batches_go_to_companion_pickle(tmp_path, sklearn_batches):
+    shutil.copy(os.path.join(MODELS_DIR, 'model3_gb_balanced.dupr'), tmp_path)
+    registry = ModelRegistry(str(tmp_path), poll_interval=0)
+    registry.refresh()
+    assert registry.models[3]['model'].estimator is None
+
+    # Adding (or replacing) the pickle reloads the model with it
+    shutil.copy(os.path.join(MODELS_DIR, 'model3_gb_balanced.pkl'), tmp_path)
+    assert registry.refresh()
+    model = registry.models[3]['model']
+    X = np.random.default_rng(1).uniform(0, 6, (SKLEARN_MIN_ROWS + 1, model.n_features))
+    assert np.array_equal(model.predict(X), model.estimator.predict(X))
+    assert np.array_equal(model.predict(X), model.predict_flat(X))
+
+
+def test_mismatched_companion_pickle_is_ignored(tmp_path, sklearn_batches):
+    shutil.copy(os.path.join(MODELS_DIR, 'model3_gb_balanced.dupr'), tmp_path)
+    shutil.copy(os.path.join(MODELS_DIR, 'model4_gb_aggressive.pkl'), tmp_path / 'model3_gb_balanced.pkl')
+    registry = ModelRegistry(str(tmp_path), poll_interval=0)
+    registry.refresh()
+
+    # Big batches must not score differently from small ones
+    assert registry.models[3]['estimator'] is None
+    assert registry.models[3]['model'].estimator is None
+
+
+def test_changed_file_is_swapped_in(models_dir):
+    registry = ModelRegistry(str(models_dir), poll_interval=0)
+    assert registry.refresh()
+    first = registry.models
+    assert type(first[1]['estimator']).__name__ == 'Ridge'
+
+    # Touching without changing the content is not a new version
+    os.utime(models_dir / 'model1_ridge.pkl')
+    assert not registry.refresh()
+    assert registry.models is first
+
+    replace_file(models_dir / 'model1_ridge.pkl', os.path.join(MODELS_DIR, 'model3_gb_balanced.pkl'))
+    shutil.copy(os.path.join(MODELS_DIR, 'model4_gb_aggressive.pkl'), models_dir)
+    assert registry.refresh()
+
+    assert type(registry.models[1]['estimator']).__name__ == 'GradientBoostingRegressor'
+    assert sorted(registry.models) == [1, 4]
+    assert registry.models[1]['generation'] == registry.generation == 2
+    # The old snapshot is untouched for requests still holding it
+    assert type(first[1]['estimator']).__name__ == 'Ridge'
+
+
+def test_broken_file_keeps_previous_version(models_dir):
+    registry = ModelRegistry(str(models_dir), poll_interval=0)
+    registry.refresh()
+    version = registry.models[1]['version']
+
+    (models_dir / 'model1_ridge.pkl').write_bytes(b'not a pickle')
+    assert not registry.refresh()
+
+    assert registry.models[1]['version'] == version
+    assert 'model1_ridge.pkl' in registry.errors
+
+
+def test_watcher_reloads_without_dropping_requests(models_dir, monkeypatch):
+    registry = ModelRegistry(str(models_dir), poll_interval=0.05)
+    registry.refresh()
+    monkeypatch.setattr(api_app, 'registry', registry)
+    client = api_app.app.test_client()
+    statuses = []
+    stop = threading.Event()
+
+    def hammer():
+        local_client = api_app.app.test_client()
+        while not stop.is_set():
+            statuses.append(local_client.post('/predict', json=MATCH).status_code)
+
+    threads = [threading.Thread(target=hammer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        api_app.load_models()   # starts the watcher
+        replace_file(models_dir / 'model1_ridge.pkl', os.path.join(MODELS_DIR, 'model3_gb_balanced.pkl'))
+        deadline = time.monotonic() + 10
+        while registry.generation == 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        registry.stop_watcher()
+
+    assert registry.generation == 2
+    assert statuses and set(statuses) == {200}
+    assert client.get('/models').get_json()['models']['1']['type'] == 'GradientBoostingRegressor'
+
+
+def test_ready_retries_a_failed_background_load(monkeypatch):
+    registry = ModelRegistry(MODELS_DIR, poll_interval=0)
+    attempts = []
+
+    def flaky_load():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise OSError('models volume not mounted yet')
+        registry.refresh()
+
+    monkeypatch.setattr(api_app, 'registry', registry)
+    monkeypatch.setattr(api_app, 'model_loader', None)
+    monkeypatch.setattr(api_app, 'load_models', flaky_load)
+    client = api_app.app.test_client()
+
+    assert client.get('/ready').status_code == 503
+    api_app.model_loader.join()
+    # The failed load doesn't leave /ready stuck: the next probe starts another one
+    assert api_app.model_loader is None
+    assert client.get('/ready').status_code == 503
+    api_app.model_loader.join()
+
+    assert client.get('/ready').status_code == 200
+    assert len(attempts) == 2
@@ -0,0 +1,116 @@
+"""
+Tests for the streaming /score_csv endpoint
+"""
+import io
+import json
+
+import numpy as np
+import pytest
+
+from api import app as api_app
+from api import csv_scoring
+from api.features import RATING_BEFORE_COLUMNS, RATING_CHANGE_COLUMNS, RATING_KEYS
+
+# Same column order DUPRScraper writes (names, dates and game 2/3 columns included)
+HEADER = (['date', 'team1_player1_name', 'team1_player2_name', 'team2_player1_name', 'team2_player2_name',
+           'game1_team1_score', 'game1_team2_score', 'game2_team1_score', 'game2_team2_score']
+          + [f'{key}_rating_{part}' for key in RATING_KEYS for part in ('before', 'change', 'after')])
+
+
+def scraper_row(ratings, changes, scores):
+    row = {'date': '2024-05-01', 'team1_player1_name': 'Jessica Wang', 'team1_player2_name': 'A, B',
+           'team2_player1_name': 'C', 'team2_player2_name': 'D',
+           'game1_team1_score': scores[0], 'game1_team2_score': scores[1], 'game2_team1_score': '', 'game2_team2_score': ''}
+    for key, before, change in zip(RATING_KEYS, ratings, changes):
+        row[f'{key}_rating_before'] = before
+        row[f'{key}_rating_change'] = change
+        row[f'{key}_rating_after'] = '' if before == '' or change == '' else round(before + change, 3)
+    return row
+
+
+def make_csv(rows):
+    out = io.StringIO()
+    out.write(','.join(HEADER) + '\r\n')
+    for row in rows:
+        out.write(','.join(f'"{row[c]}"' if ',' in str(row[c]) else str(row[c]) for c in HEADER) + '\r\n')
+    return out.getvalue().encode()
+
+
+ROWS = [
+    scraper_row([5.088, 5.353, 5.148, 5.297], [0.038, 0.030, -0.093, -0.175], [15, 1]),
+    scraper_row([4.0, 3.8, 3.9, 4.1], ['', '', '', ''], [11, 7]),          # no actual changes
+    scraper_row([4.0, '', 3.9, 4.1], [0.01, 0.01, -0.01, -0.01], [11, 7]),  # missing rating
+    scraper_row([4.0, 3.8, 3.9, 4.1], [0.01, 0.01, -0.01, -0.01], [9, 9]),  # tie
+    scraper_row([3.36, 3.285, 3.424, 4.002], [0.0, 0.0, 0.0, 0.0], [8, 11]),
+]
+
+
+@pytest.fixture
+def client():
+    return api_app.app.test_client()
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_rows_scored_like_predict(client):
+    response = client.post('/score_csv?model=3', data=make_csv(ROWS), content_type='text/csv')
+    lines = read_ndjson(response)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [line.get('row') for line in lines[:-1]] == [0, 1, 2, 3, 4]
+    for line, row in zip(lines, ROWS):
+        if 'error' in line:
+            continue
+        payload = {key: row[f'{key}_rating_before'] for key in RATING_KEYS}
+        payload.update(team1_score=row['game1_team1_score'], team2_score=row['game1_team2_score'], model=3)
+        prediction = client.post('/predict', json=payload).get_json()
+        expected = [prediction[k[:5]][k[6:]]['rating_change'] for k in RATING_KEYS]
+        assert line['predicted'] == expected
+
+    assert 'actual' not in lines[1]
+    assert lines[2]['error'] == 'missing rating or game 1 score'
+    assert lines[3]['error'] == 'tied game 1 score'
+    assert lines[0]['residual'] == list(np.round(np.array(lines[0]['actual']) - lines[0]['predicted'], 3))
+    residuals = np.abs(lines[0]['residual'] + lines[4]['residual'])
+    assert lines[-1] == {'summary': {'rows': 5, 'scored': 3, 'skipped': 2, 'mae': round(float(residuals.mean()), 4)}}
+
+
+def test_chunking_and_multipart_give_same_output(client):
+    body = make_csv(ROWS * 7)
+    whole = client.post('/score_csv', data=body, content_type='text/csv').get_data()
+    chunked = client.post('/score_csv?chunk_rows=3', data=body, content_type='text/csv').get_data()
+    uploaded = client.post('/score_csv', data={'file': (io.BytesIO(body), 'history.csv')}, content_type='multipart/form-data').get_data()
+
+    assert chunked == whole
+    assert uploaded == whole
+
+
+def test_missing_columns_rejected(client):
+    response = client.post('/score_csv', data=b'date,game1_team1_score\n2024-01-01,11\n', content_type='text/csv')
+
+    assert response.status_code == 400
+    assert 'team1_player1_rating_before' in response.get_json()['error']
+
+
+class CountingStream(io.BytesIO):
+    """BytesIO that records how far it has been read"""
+    def read(self, size=-1):
+        data = super().read(size)
+        self.high_water = self.tell()
+        return data
+
+
+def test_output_starts_before_input_is_read():
+    body = make_csv(ROWS[:1] * 20000)
+    stream = CountingStream(body)
+    reader = csv_scoring.csv_reader(stream)
+    columns = csv_scoring.read_header(reader)
+
+    lines = csv_scoring.stream_scores(reader, columns, lambda ratings, scores: np.zeros((len(ratings), 4)), chunk_rows=1000)
+    first = next(lines)
+
+    assert first.count('\n') == 1000
+    assert stream.high_water < len(body) / 5
@@ -0,0 +1,79 @@
+"""
+Tests for /score_table
+"""
+import os
+import shutil
+
+import pytest
+
+from api import app as api_app
+from api.registry import ModelRegistry
+from test_registry import MODELS_DIR, replace_file
+
+RATINGS = {
+    'team1_player1': 5.088, 'team1_player2': 5.353,
+    'team2_player1': 5.148, 'team2_player2': 5.297
+}
+
+
+@pytest.fixture
+def client():
+    api_app.prediction_cache.clear()
+    return api_app.app.test_client()
+
+
+def test_get_gives_every_score_like_predict(client):
+    response = client.get('/score_table', query_string=dict(RATINGS, model=3))
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['model'] == 3 and len(body['scores']) == 48
+    assert {(row['team1_score'], row['team2_score']) for row in body['scores']} >= {(11, 0), (9, 11), (15, 13), (0, 15)}
+    for row in body['scores'][::7]:
+        prediction = client.post('/predict', json=dict(RATINGS, model=3, team1_score=row['team1_score'],
+                                                       team2_score=row['team2_score'])).get_json()
+        assert {'team1': row['team1'], 'team2': row['team2']} == prediction
+    # Revalidated on every use rather than reused blindly for an hour
+    assert 'no-cache' in response.headers['Cache-Control'] and 'max-age' not in response.headers['Cache-Control']
+    assert response.headers['ETag']
+
+
+def test_post_matches_get(client):
+    posted = client.post('/score_table', json=dict(RATINGS, model=2)).get_json()
+    fetched = client.get('/score_table', query_string=dict(RATINGS, model=2)).get_json()
+
+    assert posted == fetched
+
+
+def test_matching_etag_gets_304(client):
+    etag = client.get('/score_table', query_string=RATINGS).headers['ETag']
+
+    response = client.get('/score_table', query_string=RATINGS, headers={'If-None-Match': etag})
+
+    assert response.status_code == 304 and response.data == b''
+
+
+def test_reloaded_model_changes_etag(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(MODELS_DIR, 'model1_ridge.pkl'), tmp_path)
+    registry = ModelRegistry(str(tmp_path), poll_interval=0)
+    registry.refresh()
+    monkeypatch.setattr(api_app, 'registry', registry)
+    client = api_app.app.test_client()
+    etag = client.get('/score_table', query_string=RATINGS).headers['ETag']
+
+    replace_file(tmp_path / 'model1_ridge.pkl', os.path.join(MODELS_DIR, 'model3_gb_balanced.pkl'))
+    registry.refresh()
+    response = client.get('/score_table', query_string=RATINGS, headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.get_json()['model_version'] == registry.models[1]['version']
+
+
+def test_missing_rating_rejected(client):
+    partial = {key: value for key, value in RATINGS.items() if key != 'team2_player2'}
+
+    get = client.get('/score_table', query_string=partial)
+    post = client.post('/score_table', json=partial)
+
+    assert get.status_code == post.status_code == 400
+    assert 'team2_player2' in get.get_json()['error']
@@ -0,0 +1,134 @@
+"""
+Tests for the /scrape_dupr endpoint against a local stand-in for pickleball.com
+"""
+import time
+
+import pytest
+
+from api import app as api_app
+from api import metrics, pickleball
+from fake_pickleball import FakePickleball
+
+
+@pytest.fixture
+def site():
+    with FakePickleball() as fake:
+        original_url = pickleball.BASE_URL
+        pickleball.BASE_URL = fake.url
+        pickleball.rating_cache.clear()
+        yield fake
+        pickleball.BASE_URL = original_url
+        pickleball.rating_cache.clear()
+
+
+@pytest.fixture
+def client():
+    return api_app.app.test_client()
+
+
+def scrape(client, slug):
+    return client.post('/scrape_dupr', json={'url': f'https://pickleball.com/players/{slug}'})
+
+
+def test_rating_from_embedded_json(site, client):
+    site.add_player('clayton-truex', rating=4.9187)
+
+    response = scrape(client, 'clayton-truex')
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'dupr_rating': 4.919,
+        'player_name': 'Clayton Truex',
+        'player_slug': 'clayton-truex',
+        'dupr_id': None,
+        'source': 'json_data',
+        'source_url': site.url + '/players/clayton-truex/rating-history'
+    }
+
+
+def test_rating_from_match_history_text(site, client):
+    site.add_player('jessica-wang', body='<td>Jessica Wang 29 | F | Seattle, WA, USA 5.301</td>')
+
+    response = scrape(client, 'jessica-wang')
+
+    assert response.status_code == 200
+    assert response.get_json()['dupr_rating'] == 5.301
+    assert response.get_json()['source'] == 'rating_history'
+
+
+def test_missing_rating_and_upstream_errors(site, client):
+    site.add_player('no-history')
+    site.add_player('broken-page', status=500)
+    errors_before = metrics.upstream_responses.value(upstream='pickleball', status=500)
+
+    assert scrape(client, 'no-history').status_code == 404
+    response = scrape(client, 'broken-page')
+    assert response.status_code == 400
+    assert 'status 500' in response.get_json()['error']
+    assert metrics.upstream_responses.value(upstream='pickleball', status=500) == errors_before + 1
+
+
+def test_repeat_lookups_are_cached(site, client):
+    site.add_player('clayton-truex', rating=4.919)
+
+    first = scrape(client, 'clayton-truex')
+    second = scrape(client, 'clayton-truex')
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    assert site.request_count('/players/clayton-truex') == 1
+
+
+def test_lookups_reuse_pooled_connection(site, client):
+    slugs = ['player-one', 'player-two', 'player-three']
+    for i, slug in enumerate(slugs):
+        site.add_player(slug, rating=4.0 + i / 10)
+
+    for slug in slugs:
+        assert scrape(client, slug).status_code == 200
+
+    assert site.request_count() == 3
+    assert len(site.connections) == 1
+
+
+def test_stale_rating_served_while_revalidating(site, client, monkeypatch):
+    monkeypatch.setattr(pickleball.rating_cache, 'ttl', 0.0)
+    site.add_player('clayton-truex', rating=4.919)
+    assert scrape(client, 'clayton-truex').get_json()['dupr_rating'] == 4.919
+
+    # Rating moved upstream: the stale value is returned at once, refreshed behind the scenes
+    site.add_player('clayton-truex', rating=4.950)
+    refreshes = pickleball.rating_cache.refreshes
+    stale = scrape(client, 'clayton-truex')
+    assert stale.headers['X-Cache'] == 'STALE'
+    assert stale.get_json()['dupr_rating'] == 4.919
+
+    deadline = time.monotonic() + 5
+    while pickleball.rating_cache.refreshes == refreshes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scrape(client, 'clayton-truex').get_json()['dupr_rating'] == 4.950
+
+
+def test_download_stops_once_rating_found(site, client):
+    # Rating JSON near the top of a ~1 MB page
+    body = '<script>{"currentDuprDoublesRating":4.8123}</script>' + '<div>match row</div>' * 50000
+    site.add_player('big-history', body=body)
+
+    response = scrape(client, 'big-history')
+
+    assert response.get_json()['dupr_rating'] == 4.812
+    assert int(response.headers['X-Bytes-Read']) < 100 * 1024
+    assert float(response.headers['X-Time-Saved-Ms']) >= 0
+
+
+def test_rating_split_across_chunk_boundary(site, client):
+    # Put the rating's digits right on the first chunk boundary
+    prefix = '"currentDuprDoublesRating":4.7'
+    padding = 'x' * (pickleball.STREAM_CHUNK_SIZE - len(prefix))
+    site.add_page('/players/split-rating/rating-history', padding + prefix + '654,"other":1}' + 'y' * 200000)
+
+    response = scrape(client, 'split-rating')
+
+    assert response.get_json()['dupr_rating'] == 4.765
+    assert response.get_json()['source'] == 'json_data'
@@ -0,0 +1,172 @@
+"""
+Tests for the background /scrape_jobs endpoints (with a fake scraper, no browser)
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+from api import app as api_app
+from api import scrape_jobs
+
+
+class FakeScraper:
+    """Stands in for DUPRScraper: three pages of two matches, paused until `release` is set"""
+    release = threading.Event()
+    calls = []
+
+    def scrape_player_rating_history(self, player_url, start_page=1, max_pages=None, output_file=None, progress=None):
+        self.calls.append(player_url)
+        self.release.wait(5)
+        if 'broken' in player_url:
+            raise RuntimeError('page did not render')
+        rows = []
+        self.completed, self.error = True, None
+        for page in range(1, (max_pages or 3) + 1):
+            if 'flaky' in player_url and page == 2:
+                self.completed, self.error = False, 'page 2: 503 Server Error'
+                break
+            rows += [{'date': '2024-05-01', 'game1_team1_score': 11, 'game1_team2_score': page}] * 2
+            progress(page, page, len(rows))
+        pd.DataFrame(rows).to_csv(output_file, index=False)
+        return pd.DataFrame(rows)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    FakeScraper.release.clear()
+    FakeScraper.calls = []
+    manager = scrape_jobs.JobManager(max_workers=2, output_dir=str(tmp_path), scraper_factory=FakeScraper)
+    monkeypatch.setattr(api_app, 'job_manager', manager)
+    yield manager
+    FakeScraper.release.set()
+    manager.shutdown()
+
+
+@pytest.fixture
+def client():
+    return api_app.app.test_client()
+
+
+def read_events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_job_streams_progress_and_saves_csv(client, manager, tmp_path):
+    response = client.post('/scrape_jobs', json={'url': 'https://pickleball.com/players/jessica-wang/rating-history'})
+    job = response.get_json()
+    assert response.status_code == 202
+    assert job['slug'] == 'jessica-wang' and job['deduplicated'] is False
+
+    FakeScraper.release.set()
+    events = read_events(client.get(job['events']))
+
+    assert [event for _, event, _ in events] == ['queued', 'started', 'page', 'page', 'page', 'done']
+    assert [data['matches'] for _, event, data in events if event == 'page'] == [2, 4, 6]
+    assert [event_id for event_id, _, _ in events] == list(range(1, 7))
+    assert events[-1][2]['output_file'] == str(tmp_path / 'jessica-wang_dupr.csv')
+    assert len(pd.read_csv(tmp_path / 'jessica-wang_dupr.csv')) == 6
+
+    status = client.get(f"/scrape_jobs/{job['job_id']}").get_json()
+    assert status['state'] == 'done' and status['pages'] == 3 and status['matches'] == 6
+
+    # Reconnecting after event 4 replays only what was missed
+    resumed = read_events(client.get(job['events'], headers={'Last-Event-ID': '4'}))
+    assert [event for _, event, _ in resumed] == ['page', 'done']
+
+
+def test_duplicate_submissions_share_one_job(client, manager):
+    first = client.post('/scrape_jobs', json={'slug': 'rob-evans'}).get_json()
+    second = client.post('/scrape_jobs', json={'url': 'https://pickleball.com/players/rob-evans'})
+
+    assert second.status_code == 200
+    assert second.get_json()['job_id'] == first['job_id']
+    assert second.get_json()['deduplicated'] is True
+
+    FakeScraper.release.set()
+    read_events(client.get(first['events']))
+    assert len(FakeScraper.calls) == 1
+
+    # Once it has finished, the same slug can be scraped again
+    third = client.post('/scrape_jobs', json={'slug': 'rob-evans', 'max_pages': 1}).get_json()
+    assert third['job_id'] != first['job_id']
+    assert read_events(client.get(third['events']))[-1][2]['matches'] == 2
+
+
+def test_failed_job_reports_error(client, manager):
+    job = client.post('/scrape_jobs', json={'slug': 'broken-player'}).get_json()
+    FakeScraper.release.set()
+    events = read_events(client.get(job['events']))
+
+    assert events[-1][1] == 'failed'
+    assert events[-1][2]['error'] == 'page did not render'
+    assert not os.path.exists(os.path.join(manager.jobs_dir, 'active', 'broken-player'))
+
+
+def test_job_stopped_by_a_page_error_is_failed(client, manager):
+    job = client.post('/scrape_jobs', json={'slug': 'flaky-player'}).get_json()
+    FakeScraper.release.set()
+    events = read_events(client.get(job['events']))
+
+    # Page 1 was saved, but the history is incomplete
+    assert events[-1][1] == 'failed'
+    assert events[-1][2]['error'] == 'scrape stopped at page 2: 503 Server Error'
+    assert events[-1][2]['matches'] == 2 and events[-1][2]['output_file']
+
+
+def test_bad_submissions_rejected(client, manager):
+    assert client.post('/scrape_jobs', json={'url': 'https://example.com/x'}).status_code == 400
+    assert client.post('/scrape_jobs', json={'slug': '../etc'}).status_code == 400
+    assert client.post('/scrape_jobs', json={'slug': 'a-b', 'max_pages': 0}).status_code == 400
+    assert client.get('/scrape_jobs/nope').status_code == 404
+
+
+def test_jobs_are_shared_between_workers(client, manager, tmp_path, monkeypatch):
+    # A second manager over the same directory stands in for another gunicorn worker
+    other = scrape_jobs.JobManager(max_workers=1, output_dir=str(tmp_path), scraper_factory=FakeScraper)
+    try:
+        job = client.post('/scrape_jobs', json={'slug': 'jessica-wang'}).get_json()
+
+        duplicate, created = other.submit('jessica-wang')
+        assert not created and duplicate['job_id'] == job['job_id']
+        assert [status['job_id'] for status in other.list()] == [job['job_id']]
+
+        # Status and the event stream work from the worker that didn't run the job
+        monkeypatch.setattr(api_app, 'job_manager', other)
+        assert client.get(f"/scrape_jobs/{job['job_id']}").get_json()['state'] in ('queued', 'running')
+        FakeScraper.release.set()
+        events = read_events(client.get(job['events']))
+        assert [event for _, event, _ in events] == ['queued', 'started', 'page', 'page', 'page', 'done']
+        assert len(FakeScraper.calls) == 1
+    finally:
+        other.shutdown()
+
+
+def test_job_of_an_exited_worker_is_failed(client, manager):
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    job = scrape_jobs.Job(manager.jobs_dir, 'rob-evans')
+    job.save()
+    job.emit('queued', slug='rob-evans')
+    status = dict(job.as_dict(), state='running', pid=dead.pid)
+    scrape_jobs.write_json(job.status_path, status)
+    with open(os.path.join(manager.jobs_dir, 'active', 'rob-evans'), 'w') as f:
+        f.write(job.id)
+
+    events = read_events(client.get(f'/scrape_jobs/{job.id}/events'))
+
+    assert [event for _, event, _ in events] == ['queued', 'failed']
+    assert 'worker exited' in events[-1][2]['error']
+    # ...and the slug can be scraped again
+    assert client.post('/scrape_jobs', json={'slug': 'rob-evans'}).status_code == 202
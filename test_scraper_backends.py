@@ -0,0 +1,248 @@
+"""
+Tests for DUPRScraper's HTTP and Selenium page backends
+
+fixtures/rating_history/synthetic holds every page twice: the HTML the server
+sends (*_server.html, a client-side app shell whose matches are only in the
+__NEXT_DATA__ state) and the DOM after Chrome has rendered it (*_rendered.html,
+what Selenium's page_source returns). Page 3 is past the end of the history.
+The server pages were written by hand in the schema EMBEDDED_KEYS guesses, so
+they only test how the parser maps that schema onto rows, not that it is the
+live site's schema.
+
+fixtures/rating_history/recorded is for pairs saved from the live site with
+`dupr_scraper.py URL --record-fixtures fixtures/rating_history/recorded`. The
+recorded parity test runs for each pair found there, and is the one that has
+to pass before the HTTP backend can be trusted.
+"""
+import glob
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+import pandas as pd
+import pytest
+
+import dupr_scraper
+from dupr_scraper import DUPRScraper
+from fake_pickleball import FakePickleball
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'rating_history', 'synthetic')
+RECORDED = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'rating_history', 'recorded', '*_server.html')))
+PAGES = [1, 2, 3]
+
+
+def fixture(page, kind):
+    with open(os.path.join(FIXTURES, f'jessica-wang_page{page}_{kind}.html')) as f:
+        return f.read()
+
+
+def page_number(url):
+    return int(parse_qs(url.split('?', 1)[1])['current_page'][0])
+
+
+class RecordedBrowser:
+    """Selenium backend replaying recorded page_source, so no Chrome is needed"""
+    name = 'selenium'
+
+    def __init__(self, headless=True):
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        return fixture(page_number(url), 'rendered'), None
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def site():
+    with FakePickleball() as fake:
+        fake.add_page('/players/jessica-wang/rating-history', lambda parsed: fixture(int(parse_qs(parsed.query)['current_page'][0]), 'server'))
+        yield fake
+
+
+def scrape(scraper, url, pages=len(PAGES)):
+    try:
+        return scraper.scrape_player_rating_history(url, max_pages=pages)
+    finally:
+        scraper.close()
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_synthetic_state_maps_to_rendered_rows(page):
+    scraper = DUPRScraper(backend='http')
+    server = fixture(page, 'server')
+    server_rows = scraper._parse_page(server, 'Jessica Wang')
+    rendered_rows = scraper._parse_matches_from_html(fixture(page, 'rendered'), 'Jessica Wang')
+
+    # The server rows can only have come from the embedded state
+    assert not dupr_scraper.has_match_table(server)
+    assert server_rows == rendered_rows
+    assert len(server_rows) == {1: 3, 2: 2, 3: 0}[page]
+
+
+@pytest.mark.skipif(not RECORDED, reason='no pages recorded with --record-fixtures')
+@pytest.mark.parametrize('server_path', RECORDED)
+def test_recorded_server_and_rendered_pages_give_identical_rows(server_path):
+    slug = os.path.basename(server_path).split('_page')[0]
+    player_name = ' '.join(word.capitalize() for word in slug.split('-'))
+    with open(server_path, encoding='utf-8') as f:
+        server = f.read()
+    with open(server_path.replace('_server.html', '_rendered.html'), encoding='utf-8') as f:
+        rendered = f.read()
+    scraper = DUPRScraper(backend='http')
+
+    assert scraper._parse_page(server, player_name) == scraper._parse_matches_from_html(rendered, player_name)
+
+
+def test_embedded_matches_read_from_flight_chunks():
+    # App Router pages stream their state as self.__next_f.push([1, "<id>:<json>\n"]) chunks
+    state = json.dumps(dupr_scraper.embedded_match_list(fixture(1, 'server')))
+    flight = f'0:["$","div",null,{{}}]\n5:{{"matches":{state}}}\n'
+    # A row may be split across chunks
+    chunks = ''.join(f'<script>self.__next_f.push([1,{json.dumps(part)}])</script>' for part in (flight[:60], flight[60:]))
+    shell = f'<html><body>{chunks}</body></html>'
+    scraper = DUPRScraper(backend='http')
+
+    assert scraper._parse_page(shell, 'Jessica Wang') == scraper._parse_matches_from_html(fixture(1, 'rendered'), 'Jessica Wang')
+
+
+def test_http_scrape_matches_selenium_scrape(site):
+    url = f'{site.url}/players/jessica-wang/rating-history'
+
+    over_http = scrape(DUPRScraper(backend='http', min_delay=0), url)
+    browser = DUPRScraper(backend='selenium', min_delay=0)
+    browser.backend = RecordedBrowser()
+    in_browser = scrape(browser, url)
+
+    pd.testing.assert_frame_equal(over_http, in_browser)
+    assert len(over_http) == 5
+    assert over_http.loc[4, ['game1_team1_score', 'game1_team2_score']].tolist() == [9, 11]
+    # One pooled keep-alive connection for every page
+    assert site.request_count('/players/jessica-wang') == 3
+    assert len(site.connections) == 1
+
+
+def test_auto_stays_on_http_once_match_data_was_served(site, monkeypatch):
+    monkeypatch.setattr(dupr_scraper, 'SeleniumBackend', lambda headless: pytest.fail('should not start a browser'))
+    scraper = DUPRScraper(backend='auto', min_delay=0)
+
+    df = scrape(scraper, f'{site.url}/players/jessica-wang/rating-history')
+
+    assert len(df) == 5
+    assert [t['backend'] for t in scraper.page_timings] == ['http'] * 3
+
+
+def test_auto_falls_back_to_selenium_without_server_data(site, monkeypatch):
+    # Server sends only the app shell: no table, and no matches in its state
+    site.add_page('/players/jessica-wang/rating-history', lambda parsed: fixture(3, 'server'))
+    monkeypatch.setattr(dupr_scraper, 'SeleniumBackend', RecordedBrowser)
+    scraper = DUPRScraper(backend='auto', min_delay=0)
+
+    df = scrape(scraper, f'{site.url}/players/jessica-wang/rating-history', pages=2)
+
+    assert len(df) == 5
+    assert [t['backend'] for t in scraper.page_timings] == ['selenium', 'selenium']
+    assert site.request_count('/players/jessica-wang') == 1
+
+
+def test_http_backend_fails_without_server_data(site):
+    site.add_page('/players/jessica-wang/rating-history', lambda parsed: fixture(3, 'server'))
+
+    with pytest.raises(RuntimeError, match='--backend selenium'):
+        scrape(DUPRScraper(backend='http', min_delay=0), f'{site.url}/players/jessica-wang/rating-history')
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        DUPRScraper(backend='phantomjs')
+
+
+class ScriptedDriver:
+    """execute_script answers for RowsSettled: row counts seen on successive polls"""
+    def __init__(self, counts):
+        self.counts = iter(counts)
+
+    def execute_script(self, script, selector):
+        return ['complete', next(self.counts)]
+
+
+def test_rows_settled_waits_for_a_stable_row_count():
+    condition = dupr_scraper.RowsSettled(settle=0, empty_settle=60)
+    driver = ScriptedDriver([0, 0, 10, 25, 25])
+
+    polls = [condition(driver) for _ in range(5)]
+
+    # An empty table isn't trusted until empty_settle; rows count once they stop changing
+    assert polls == [False, False, False, False, True]
+    assert condition.count == 25
+
+
+def test_politeness_delay_follows_render_time():
+    budget = dupr_scraper.PolitenessBudget(min_delay=0.5, max_delay=10.0, per_render_second=1.0, alpha=0.5)
+    assert budget.delay() == 0.5
+
+    budget.record(0.2)
+    assert budget.delay() == 0.5
+    budget.record(4.0)
+    assert budget.delay() == pytest.approx(2.1)
+    for _ in range(20):
+        budget.record(60.0)
+    assert budget.delay() == 10.0
+
+
+def history_site(fake, n_pages, request_times=None):
+    """Pages 1..n_pages alternate between the two fixture pages, later pages are empty"""
+    def body(parsed):
+        page = int(parse_qs(parsed.query)['current_page'][0])
+        if request_times is not None:
+            request_times.append(time.monotonic())
+        return fixture(1 if page % 2 else 2, 'server') if page <= n_pages else fixture(3, 'server')
+    fake.add_page('/players/jessica-wang/rating-history', body)
+    return f'{fake.url}/players/jessica-wang/rating-history'
+
+
+def test_concurrent_pages_reassembled_in_order():
+    with FakePickleball() as fake:
+        fake.delay = 0.05
+        url = history_site(fake, 12)
+        sequential = scrape(DUPRScraper(backend='http', min_delay=0), url, pages=None)
+        sequential_requests = fake.request_count('/players/')
+
+        scraper = DUPRScraper(backend='http', min_delay=0, concurrency=4, max_rate=0)
+        concurrent = scrape(scraper, url, pages=None)
+        concurrent_requests = fake.request_count('/players/') - sequential_requests
+
+    pd.testing.assert_frame_equal(concurrent, sequential)
+    assert len(concurrent) == 30
+    assert [t['page'] for t in scraper.page_timings] == list(range(1, 16))
+    # Stops at the 3 empty pages after page 12, fetching at most `concurrency` pages past them
+    assert sequential_requests == 15
+    assert 15 <= concurrent_requests <= 15 + 4
+
+
+def test_concurrent_requests_respect_rate_limit():
+    request_times = []
+    with FakePickleball() as fake:
+        url = history_site(fake, 8, request_times)
+        scrape(DUPRScraper(backend='http', min_delay=0, concurrency=4, max_rate=20), url, pages=8)
+
+    assert len(request_times) == 8
+    # Page 1 settles the backend on its own; the 7 pooled fetches start 1/20 s apart,
+    # so arrivals span at least 6 intervals (less a little scheduling jitter)
+    pooled = sorted(request_times[1:])
+    assert pooled[-1] - pooled[0] >= 6 / 20 * 0.9
+
+
+def test_concurrent_scrape_stops_at_first_error():
+    with FakePickleball() as fake:
+        url = history_site(fake, 12)
+        pages = fake.pages['/players/jessica-wang/rating-history'][1]
+        fake.add_page('/players/jessica-wang/rating-history',
+                      lambda parsed: (503, 'busy') if parse_qs(parsed.query)['current_page'] == ['4'] else pages(parsed))
+        df = scrape(DUPRScraper(backend='http', min_delay=0, concurrency=3, max_rate=0), url, pages=None)
+
+    # Same as the sequential scrape: pages 1-3, nothing after the failed page
+    assert len(df) == 3 + 2 + 3
@@ -0,0 +1,253 @@
+"""
+Tests for the scraper's append-only CSV output and checkpoints
+"""
+import csv
+import json
+import sys
+from urllib.parse import parse_qs
+
+import pandas as pd
+import pytest
+
+import batch_scrape
+import dupr_scraper
+from dupr_scraper import MATCH_COLUMNS, DUPRScraper, MatchCSVWriter, checkpoint_path, read_checkpoint, recover_partial
+from fake_pickleball import FakePickleball
+from test_scraper_backends import history_site
+
+ROW = {'date': '2024-09-14', 'team1_player1_name': 'Jessica Wang', 'game1_team1_score': 11, 'game1_team2_score': 6,
+       'game2_team1_score': None, 'team1_player1_rating_before': 5.088, 'team1_player1_rating_change': 0.038}
+
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_pages_are_appended_not_rewritten(tmp_path):
+    output = str(tmp_path / 'out.csv')
+    writer = MatchCSVWriter(output)
+
+    writer.write_page(1, [ROW, ROW])
+    with open(output, 'rb') as f:
+        first_page = f.read()
+    writer.write_page(2, [])
+    writer.write_page(3, [dict(ROW, date='2024-09-01')])
+    writer.finish()
+
+    with open(output, 'rb') as f:
+        assert f.read().startswith(first_page)
+    rows = read_rows(output)
+    assert rows[0] == MATCH_COLUMNS
+    assert [row[0] for row in rows[1:]] == ['2024-09-14', '2024-09-14', '2024-09-01']
+    assert rows[1][MATCH_COLUMNS.index('game2_team1_score')] == ''
+    checkpoint = read_checkpoint(output)
+    assert (checkpoint['last_page'], checkpoint['pages'], checkpoint['rows'], checkpoint['complete']) == (3, 3, 3, True)
+    assert checkpoint['bytes'] == (tmp_path / 'out.csv').stat().st_size
+
+
+def test_torn_write_is_cut_back_to_the_checkpoint(tmp_path):
+    output = str(tmp_path / 'out.csv')
+    writer = MatchCSVWriter(output)
+    writer.write_page(1, [ROW])
+    writer.close()
+    good = read_rows(output)
+    # Killed halfway through writing the next page's rows
+    with open(output, 'a') as f:
+        f.write('2024-08-31,Jessica Wang,Madel')
+
+    checkpoint = recover_partial(output)
+
+    assert checkpoint['rows'] == 1 and checkpoint['complete'] is False
+    assert read_rows(output) == good
+
+
+def test_saved_progress_only_reads(tmp_path):
+    output = str(tmp_path / 'out.csv')
+    writer = MatchCSVWriter(output)
+    writer.write_page(1, [ROW])
+    writer.close()
+    with open(output, 'a') as f:
+        f.write('2024-08-31,Jessica Wang,Madel')
+    with open(output, 'rb') as f:
+        torn = f.read()
+
+    assert batch_scrape.saved_progress(output) == (1, 1)
+    # The torn row is still there for --resume to cut off
+    with open(output, 'rb') as f:
+        assert f.read() == torn
+
+
+def test_no_csv_without_matches(tmp_path):
+    output = str(tmp_path / 'out.csv')
+    writer = MatchCSVWriter(output)
+    writer.write_page(1, [])
+    writer.finish()
+
+    assert not (tmp_path / 'out.csv').exists()
+    assert json.loads(open(checkpoint_path(output)).read())['rows'] == 0
+
+
+def test_failed_scrape_resumes_from_checkpoint(tmp_path):
+    output = str(tmp_path / 'jessica-wang_dupr.csv')
+    with FakePickleball() as fake:
+        url = history_site(fake, 6)
+        pages = fake.pages['/players/jessica-wang/rating-history'][1]
+        complete = scrape_to(url, str(tmp_path / 'complete.csv'))
+
+        fake.add_page('/players/jessica-wang/rating-history',
+                      lambda parsed: (503, 'busy') if parse_qs(parsed.query)['current_page'] == ['4'] else pages(parsed))
+        first = scrape_to(url, output)
+        assert len(first) == 3 + 2 + 3
+        assert batch_scrape.saved_progress(output) == (8, 3)
+        assert read_checkpoint(output)['complete'] is False
+
+        fake.add_page('/players/jessica-wang/rating-history', pages)
+        requests_before = fake.request_count('/players/')
+        rest = scrape_to(url, output, resume=True)
+
+    # Picked up at page 4, and the file reads back exactly like an uninterrupted scrape
+    assert fake.request_count('/players/') - requests_before == 3 + 3
+    assert len(rest) == 2 + 3 + 2
+    pd.testing.assert_frame_equal(pd.read_csv(output), pd.read_csv(str(tmp_path / 'complete.csv')))
+    assert len(pd.read_csv(output)) == len(complete) == 15
+    assert read_checkpoint(output)['complete'] is True
+
+
+def test_cli_fails_when_a_page_fails(tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'jessica-wang_dupr.csv')
+    with FakePickleball() as fake:
+        url = history_site(fake, 6)
+        pages = fake.pages['/players/jessica-wang/rating-history'][1]
+        fake.add_page('/players/jessica-wang/rating-history',
+                      lambda parsed: (503, 'busy') if parse_qs(parsed.query)['current_page'] == ['4'] else pages(parsed))
+        monkeypatch.setattr(sys, 'argv', ['dupr_scraper.py', url, '-o', output, '--backend', 'http', '--min-delay', '0'])
+        code = dupr_scraper.main()
+
+    printed = capsys.readouterr().out
+    assert code == 1
+    assert 'Data saved' not in printed and '✗ Scrape stopped at page 4' in printed
+    assert read_checkpoint(output)['complete'] is False
+    assert batch_scrape.saved_progress(output) == (8, 3)
+
+
+def scrape_to(url, output, resume=False, refresh=False):
+    scraper = DUPRScraper(backend='http', min_delay=0)
+    try:
+        return scraper.scrape_player_rating_history(url, output_file=output, resume=resume, refresh=refresh)
+    finally:
+        scraper.close()
+
+
+def test_refresh_adds_only_new_matches(tmp_path):
+    output = str(tmp_path / 'jessica-wang_dupr.csv')
+    with FakePickleball() as fake:
+        url = history_site(fake, 2)
+        complete = scrape_to(url, str(tmp_path / 'complete.csv'))
+        # Saved before page 1's three matches were played (and written by pandas: 11.0, not 11)
+        pd.read_csv(str(tmp_path / 'complete.csv')).iloc[3:].to_csv(output, index=False)
+
+        requests_before = fake.request_count('/players/')
+        new = scrape_to(url, output, refresh=True)
+        # Page 2 starts with a known match, so nothing past it is fetched
+        assert fake.request_count('/players/') - requests_before == 2
+        assert len(new) == 3
+        pd.testing.assert_frame_equal(pd.read_csv(output), pd.read_csv(str(tmp_path / 'complete.csv')))
+        assert len(complete) == 5 and read_checkpoint(output)['complete'] is True
+
+        with open(output, 'rb') as f:
+            refreshed = f.read()
+        requests_before = fake.request_count('/players/')
+        assert scrape_to(url, output, refresh=True).empty
+        assert fake.request_count('/players/') - requests_before == 1
+        with open(output, 'rb') as f:
+            assert f.read() == refreshed
+
+
+def test_failed_refresh_leaves_file_alone(tmp_path):
+    output = str(tmp_path / 'jessica-wang_dupr.csv')
+    with FakePickleball() as fake:
+        url = history_site(fake, 4)
+        scrape_to(url, output)
+        pd.read_csv(output).iloc[8:].to_csv(output, index=False)
+        with open(output, 'rb') as f:
+            saved = f.read()
+
+        pages = fake.pages['/players/jessica-wang/rating-history'][1]
+        fake.add_page('/players/jessica-wang/rating-history',
+                      lambda parsed: (503, 'busy') if parse_qs(parsed.query)['current_page'] == ['2'] else pages(parsed))
+        scrape_to(url, output, refresh=True)
+
+    # Writing page 1's matches without reaching the known ones would leave a gap
+    with open(output, 'rb') as f:
+        assert f.read() == saved
+
+
+def refresh_cli(url, output, *args):
+    argv = ['dupr_scraper.py', url, '-o', output, '--refresh', '--backend', 'http', '--min-delay', '0', *args]
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(sys, 'argv', argv)
+        return dupr_scraper.main()
+
+
+def test_refresh_keeps_the_checkpointed_pages(tmp_path, capsys):
+    output = str(tmp_path / 'jessica-wang_dupr.csv')
+    with FakePickleball() as fake:
+        url = history_site(fake, 2)
+        scrape_to(url, output)
+        before = read_checkpoint(output)
+        # Page 1's matches were played after the last scrape
+        pd.read_csv(output).iloc[3:].to_csv(output, index=False)
+
+        assert refresh_cli(url, output) == 0
+
+    assert '✓ Data saved' in capsys.readouterr().out
+    checkpoint = read_checkpoint(output)
+    assert (checkpoint['last_page'], checkpoint['pages']) == (before['last_page'], before['pages']) == (5, 5)
+    assert checkpoint['rows'] == 5 and checkpoint['complete'] is True
+
+
+def test_refresh_that_stops_early_fails(tmp_path, capsys):
+    output = str(tmp_path / 'jessica-wang_dupr.csv')
+    with FakePickleball() as fake:
+        url = history_site(fake, 4)
+        scrape_to(url, output)
+        pd.read_csv(output).iloc[8:].to_csv(output, index=False)
+        with open(output, 'rb') as f:
+            saved = f.read()
+
+        # Page 1 is all new, and the refresh isn't allowed to look further
+        code = refresh_cli(url, output, '--max-pages', '1')
+
+    printed = capsys.readouterr().out
+    assert code == 1
+    assert 'Data saved' not in printed and '✗ Refresh failed (stopped at page 1' in printed
+    with open(output, 'rb') as f:
+        assert f.read() == saved
+
+
+def test_refresh_refused_until_an_unfinished_scrape_is_resumed(tmp_path):
+    output = str(tmp_path / 'jessica-wang_dupr.csv')
+    with FakePickleball() as fake:
+        url = history_site(fake, 6)
+        pages = fake.pages['/players/jessica-wang/rating-history'][1]
+        fake.add_page('/players/jessica-wang/rating-history',
+                      lambda parsed: (503, 'busy') if parse_qs(parsed.query)['current_page'] == ['4'] else pages(parsed))
+        scrape_to(url, output)
+        fake.add_page('/players/jessica-wang/rating-history', pages)
+        with open(output, 'rb') as f:
+            saved = f.read()
+
+        requests_before = fake.request_count('/players/')
+        scraper = DUPRScraper(backend='http', min_delay=0)
+        assert scraper.scrape_player_rating_history(url, output_file=output, refresh=True).empty
+        assert not scraper.completed and '--resume' in scraper.error
+        assert fake.request_count('/players/') == requests_before
+
+        # Resumed to the end, it can be refreshed
+        scrape_to(url, output, resume=True)
+        assert refresh_cli(url, output) == 0
+
+    with open(output, 'rb') as f:
+        assert f.read().startswith(saved)
+    assert read_checkpoint(output)['complete'] is True
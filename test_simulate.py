@@ -0,0 +1,101 @@
+"""
+Tests for /simulate and the tournament helpers
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from api import app as api_app
+from api import tournament
+
+
+@pytest.fixture
+def client():
+    return api_app.app.test_client()
+
+
+@pytest.mark.parametrize('n_teams', [5, 6])
+def test_round_robin_pairs_every_team_once(n_teams):
+    rounds = tournament.round_robin(n_teams)
+
+    pairs = [frozenset(pair) for matches in rounds for pair in matches]
+    assert sorted(map(sorted, pairs)) == sorted(map(sorted, itertools.combinations(range(n_teams), 2)))
+    for matches in rounds:
+        teams = [team for pair in matches for team in pair]
+        assert len(teams) == len(set(teams))
+
+
+def test_waves_follow_player_dependencies():
+    players = np.array([[0, 1, 2, 3], [4, 5, 6, 7], [0, 4, 8, 9], [1, 2, 3, 5], [10, 11, 12, 13]])
+
+    assert tournament.assign_waves(players).tolist() == [0, 0, 1, 1, 0]
+
+
+def test_simulation_matches_playing_one_match_at_a_time(client):
+    rng = np.random.default_rng(3)
+    roster = {f'player{i}': float(np.round(rng.uniform(3.0, 5.5), 3)) for i in range(12)}
+    names = list(roster)
+    schedule = []
+    for i in range(60):
+        four = rng.choice(names, 4, replace=False).tolist()
+        match = {'team1': four[:2], 'team2': four[2:]}
+        if i % 3:
+            match.update(team1_score=11, team2_score=int(rng.integers(0, 10)))
+        schedule.append(match)
+
+    body = client.post('/simulate', json={'roster': roster, 'schedule': schedule, 'model': 3, 'include_matches': True}).get_json()
+
+    # Replay sequentially through /predict with the scores the simulation used
+    ratings = dict(roster)
+    for match, played in zip(schedule, body['schedule']):
+        four = match['team1'] + match['team2']
+        payload = dict(zip(api_app.RATING_KEYS, [ratings[name] for name in four]), model=3,
+                       team1_score=played['team1_score'], team2_score=played['team2_score'])
+        prediction = client.post('/predict', json=payload).get_json()
+        for name, (team, player) in zip(four, api_app.SIMULATION_SLOTS):
+            assert played[team][player] == dict(prediction[team][player], name=name)
+            ratings[name] = prediction[team][player]['rating_after']
+
+    assert body['matches'] == 60
+    assert body['rounds'] < 60
+    assert {name: p['rating_after'] for name, p in body['players'].items()} == ratings
+    assert sum(p['matches_played'] for p in body['players'].values()) == 240
+
+
+def test_round_robin_request(client):
+    roster = [{'name': f'p{i}', 'rating': 3.5 + i / 10} for i in range(8)]
+
+    body = client.post('/simulate', json={'roster': roster, 'round_robin': {'cycles': 2}}).get_json()
+
+    assert body['matches'] == 12   # 4 teams, 6 pairings, twice
+    assert body['rounds'] == 6
+    assert all(p['matches_played'] == 6 for p in body['players'].values())
+
+
+def test_invalid_schedules_are_rejected(client):
+    roster = {'a': 4.0, 'b': 4.1, 'c': 3.9, 'd': 4.2}
+
+    unknown = client.post('/simulate', json={'roster': roster, 'schedule': [{'team1': ['a', 'b'], 'team2': ['c', 'zed']}]})
+    repeated = client.post('/simulate', json={'roster': roster, 'schedule': [{'team1': ['a', 'a'], 'team2': ['c', 'd']}]})
+    tie = client.post('/simulate', json={'roster': roster, 'schedule': [
+        {'team1': ['a', 'b'], 'team2': ['c', 'd'], 'team1_score': 11, 'team2_score': 11}]})
+
+    assert unknown.status_code == 400 and 'zed' in unknown.get_json()['error']
+    assert repeated.status_code == 400
+    assert tie.status_code == 400 and 'Tie' in tie.get_json()['error']
+
+
+def test_malformed_matches_are_rejected(client):
+    roster = {'a': 4.0, 'b': 4.1, 'c': 3.9, 'd': 4.2}
+
+    string_team = client.post('/simulate', json={'roster': roster, 'schedule': [{'team1': 'ab', 'team2': ['c', 'd']}]})
+    missing_team = client.post('/simulate', json={'roster': roster, 'schedule': [{'team1': ['a', 'b']}]})
+    one_score = client.post('/simulate', json={'roster': roster, 'schedule': [
+        {'team1': ['a', 'b'], 'team2': ['c', 'd'], 'team1_score': 11}]})
+
+    assert string_team.status_code == missing_team.status_code == 400
+    assert 'must be lists' in string_team.get_json()['error']
+    assert 'must be lists' in missing_team.get_json()['error']
+    assert one_score.status_code == 400
+    assert 'team1_score and team2_score are both required' in one_score.get_json()['error']
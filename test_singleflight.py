@@ -0,0 +1,130 @@
+"""
+Tests for single-flight coalescing of concurrent rating lookups
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api import app as api_app
+from api import pickleball
+from api.singleflight import SingleFlight, coalesced_requests
+from fake_pickleball import FakePickleball
+
+
+def slow(calls, value, seconds=0.2):
+    def fn():
+        calls.append(threading.get_ident())
+        time.sleep(seconds)
+        return value
+    return fn
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    calls = []
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda _: flight.do('jessica-wang', slow(calls, {'dupr_rating': 5.1})), range(20)))
+
+    assert len(calls) == 1
+    assert all(value == {'dupr_rating': 5.1} for value, _ in results)
+    assert sum(shared for _, shared in results) == 19
+    assert flight.stats()['saved'] == 19 and flight.stats()['in_flight'] == 0
+
+    # Nothing in flight any more: the next call runs again
+    flight.do('jessica-wang', slow(calls, None, 0))
+    assert len(calls) == 2
+
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise pickleball.UpstreamError(503)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, 'rob-evans', failing)
+        started.wait()
+        follower = pool.submit(flight.do, 'rob-evans', lambda: pytest.fail('follower should not fetch'))
+        for future in (leader, follower):
+            with pytest.raises(pickleball.UpstreamError):
+                future.result()
+
+
+def test_workers_share_through_lock_dir(tmp_path):
+    # Two instances stand in for two gunicorn workers: flock conflicts between
+    # separate open()s even inside one process
+    workers = [SingleFlight(lock_dir=str(tmp_path)), SingleFlight(lock_dir=str(tmp_path))]
+    calls = []
+    before = coalesced_requests.value(scope='cross_worker')
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda flight: flight.do('amber-chong', slow(calls, {'dupr_rating': 4.2})), workers))
+
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [{'dupr_rating': 4.2}] * 2
+    assert coalesced_requests.value(scope='cross_worker') == before + 1
+
+
+def test_finished_keys_are_swept_from_lock_dir(tmp_path):
+    flight = SingleFlight(lock_dir=str(tmp_path), result_ttl=0, sweep_interval=0)
+    for slug in ('amber-chong', 'rob-evans', 'jessica-wang'):
+        flight.do(slug, lambda: {'dupr_rating': 4.2})
+
+    # Each lead sweeps the previous keys, whose results have expired
+    assert len(os.listdir(tmp_path)) == 2
+    assert flight.stats()['swept'] == 2
+
+
+def test_sweep_keeps_fresh_results_and_held_locks(tmp_path):
+    flight = SingleFlight(lock_dir=str(tmp_path), result_ttl=60, sweep_interval=0)
+    flight.do('amber-chong', lambda: {'dupr_rating': 4.2})
+    held = SingleFlight(lock_dir=str(tmp_path), result_ttl=60, sweep_interval=0)
+    started, release = threading.Event(), threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        return None
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(held.do, 'rob-evans', fetch)
+        started.wait()
+        flight.do('jessica-wang', lambda: None)
+        names = os.listdir(tmp_path)
+        release.set()
+        leader.result()
+
+    # amber-chong's result is still fresh, and rob-evans's lock is held mid-fetch
+    assert len([name for name in names if name.endswith('.lock')]) == 3
+    assert len([name for name in names if name.endswith('.json')]) == 1
+    assert flight.stats()['swept'] == held.stats()['swept'] == 0
+
+
+def test_scrape_dupr_coalesces_upstream_fetches():
+    with FakePickleball() as site:
+        original_url = pickleball.BASE_URL
+        pickleball.BASE_URL = site.url
+        pickleball.rating_cache.clear()
+        try:
+            site.add_player('clayton-truex', rating=4.9187)
+            site.delay = 0.3
+            client = api_app.app.test_client()
+
+            def scrape(_):
+                return client.post('/scrape_dupr', json={'url': 'https://pickleball.com/players/clayton-truex'})
+
+            with ThreadPoolExecutor(max_workers=12) as pool:
+                responses = list(pool.map(scrape, range(12)))
+        finally:
+            pickleball.BASE_URL = original_url
+            pickleball.rating_cache.clear()
+
+    assert site.request_count('/players/clayton-truex') == 1
+    assert all(r.status_code == 200 and r.get_json()['dupr_rating'] == 4.919 for r in responses)
+    assert sorted(r.headers['X-Cache'] for r in responses) == ['COALESCED'] * 11 + ['MISS']
+    assert api_app.app.test_client().get('/stats').get_json()['rating_coalescing']['saved'] >= 11
@@ -0,0 +1,85 @@
+"""
+Tests for the flat NumPy tree evaluator against the sklearn models it was compiled from
+"""
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from api.features import FEATURES, build_feature_matrix
+from api.registry import load_pickle
+from api.trees import FlatTreeEnsemble
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+TREE_PICKLES = [path for path in sorted(glob.glob(os.path.join(MODELS_DIR, '*.pkl')))
+                if isinstance(load_pickle(path)['model'], FlatTreeEnsemble)]
+
+
+def match_features(n_matches, seed=3):
+    rng = np.random.default_rng(seed)
+    ratings = np.round(rng.uniform(2.0, 7.0, (n_matches, 4)), 3)
+    winner = rng.integers(0, 11, n_matches)
+    scores = np.where(rng.random((n_matches, 1)) < 0.5,
+                      np.column_stack([np.full(n_matches, 11), winner]),
+                      np.column_stack([winner, np.full(n_matches, 11)]))
+    return build_feature_matrix(ratings, scores).reshape(-1, len(FEATURES))
+
+
+def threshold_features(estimator, base_row):
+    """Rows that put one feature exactly on, just under and just over every split threshold"""
+    rows = []
+    for tree in estimator.estimators_[:, 0]:
+        split = tree.tree_.children_left != -1
+        for feature, threshold in zip(tree.tree_.feature[split], tree.tree_.threshold[split]):
+            t32 = np.float32(threshold)
+            for x in (threshold, t32, np.nextafter(t32, np.float32(-np.inf)), np.nextafter(t32, np.float32(np.inf))):
+                row = base_row.copy()
+                row[feature] = x
+                rows.append(row)
+    return np.array(rows)
+
+
+def extreme_features(n_features):
+    values = [0.0, -0.0, 1e-30, -1e-30, 1e30, -1e30, 3e38, -3e38]
+    return np.array([[value] * n_features for value in values])
+
+
+@pytest.fixture(params=TREE_PICKLES, ids=os.path.basename)
+def model(request):
+    return load_pickle(request.param)
+
+
+def test_there_are_tree_models():
+    assert TREE_PICKLES
+
+
+def test_random_matches_score_identically(model):
+    X = match_features(2000)
+    flat = FlatTreeEnsemble.from_sklearn(model['estimator'])
+
+    assert np.array_equal(model['estimator'].predict(X), flat.predict_flat(X))
+
+
+def test_uniform_random_inputs_score_identically(model):
+    X = np.random.default_rng(11).uniform(-50, 50, (2000, model['estimator'].n_features_in_))
+    flat = FlatTreeEnsemble.from_sklearn(model['estimator'])
+
+    assert np.array_equal(model['estimator'].predict(X), flat.predict_flat(X))
+
+
+def test_inputs_on_split_thresholds_score_identically(model):
+    estimator = model['estimator']
+    X = threshold_features(estimator, match_features(1)[0])
+    flat = FlatTreeEnsemble.from_sklearn(estimator)
+
+    assert len(X) > 100
+    assert np.array_equal(estimator.predict(X), flat.predict_flat(X))
+
+
+def test_extreme_inputs_score_identically(model):
+    estimator = model['estimator']
+    X = extreme_features(estimator.n_features_in_)
+    flat = FlatTreeEnsemble.from_sklearn(estimator)
+
+    assert np.array_equal(estimator.predict(X), flat.predict_flat(X))
@@ -11,93 +11,31 @@ from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import r2_score, mean_absolute_error
 
+from api.features import FEATURES, training_arrays
+
 # Load data (matching train_variants.py approach with deflation normalization)
 print("Loading data...")
-all_data = []
+X_parts = []
+y_parts = []
 match_deflations = []
 
 for csv_file in glob.glob('player_data/*.csv'):
     try:
         df_csv = pd.read_csv(csv_file)
-        
-        for _, row in df_csv.iterrows():
-            score1 = row['game1_team1_score']
-            score2 = row['game1_team2_score']
-            if not pd.notna(score1) or not pd.notna(score2):
-                continue
-            
-            # Calculate match-level deflation (total of all 4 rating changes)
-            match_total_change = (
-                row['team1_player1_rating_change'] + 
-                row['team1_player2_rating_change'] + 
-                row['team2_player1_rating_change'] + 
-                row['team2_player2_rating_change']
-            )
-            per_player_adjustment = match_total_change / 4
-            match_deflations.append(per_player_adjustment)
-            
-            won_t1 = 1 if score1 > score2 else 0
-            score_margin_t1 = score1 - score2
-            
-            # Team 1 players - subtract match deflation
-            for player_col, partner_col in [('team1_player1', 'team1_player2'), ('team1_player2', 'team1_player1')]:
-                if pd.notna(row[f'{player_col}_rating_before']) and pd.notna(row[f'{player_col}_rating_change']):
-                    opp_avg = (row['team2_player1_rating_before'] + row['team2_player2_rating_before']) / 2
-                    partner_rating = row[f'{partner_col}_rating_before']
-                    
-                    all_data.append({
-                        'player_rating': row[f'{player_col}_rating_before'],
-                        'partner_rating': partner_rating,
-                        'opp_avg': opp_avg,
-                        'opp1_rating': row['team2_player1_rating_before'],
-                        'opp2_rating': row['team2_player2_rating_before'],
-                        'won': won_t1,
-                        'score_margin': score_margin_t1,
-                        'total_points': abs(score_margin_t1),
-                        'rating_change': row[f'{player_col}_rating_change'] - per_player_adjustment,
-                    })
-            
-            # Team 2 players - subtract match deflation
-            score_margin_t2 = score2 - score1
-            won_t2 = 1 - won_t1
-            
-            for player_col, partner_col in [('team2_player1', 'team2_player2'), ('team2_player2', 'team2_player1')]:
-                if pd.notna(row[f'{player_col}_rating_before']) and pd.notna(row[f'{player_col}_rating_change']):
-                    opp_avg = (row['team1_player1_rating_before'] + row['team1_player2_rating_before']) / 2
-                    partner_rating = row[f'{partner_col}_rating_before']
-                    
-                    all_data.append({
-                        'player_rating': row[f'{player_col}_rating_before'],
-                        'partner_rating': partner_rating,
-                        'opp_avg': opp_avg,
-                        'opp1_rating': row['team1_player1_rating_before'],
-                        'opp2_rating': row['team1_player2_rating_before'],
-                        'won': won_t2,
-                        'score_margin': score_margin_t2,
-                        'total_points': abs(score_margin_t2),
-                        'rating_change': row[f'{player_col}_rating_change'] - per_player_adjustment,
-                    })
+        X_file, y_file, deflations = training_arrays(df_csv, remove_deflation=True)
+        X_parts.append(X_file)
+        y_parts.append(y_file)
+        match_deflations.append(deflations)
     except Exception as e:
         continue
 
-mean_deflation = np.mean(match_deflations)
+mean_deflation = np.mean(np.concatenate(match_deflations))
 print(f"Mean per-player deflation: {mean_deflation:.4f}")
 
-df = pd.DataFrame(all_data)
+df = pd.DataFrame(np.concatenate(X_parts), columns=FEATURES)
+df['rating_change'] = np.concatenate(y_parts)
 print(f"Loaded {len(df)} records")
 
-# Create features
-df['rating_diff'] = df['player_rating'] - df['opp_avg']
-df['partner_diff'] = df['player_rating'] - df['partner_rating']
-df['team_avg'] = (df['player_rating'] + df['partner_rating']) / 2
-df['team_vs_opp'] = df['team_avg'] - df['opp_avg']
-df['opp_spread'] = abs(df['opp1_rating'] - df['opp2_rating'])
-df['won_x_rating_diff'] = df['won'] * df['rating_diff']
-df['won_x_score_margin'] = df['won'] * df['score_margin']
-df['rating_squared'] = df['player_rating'] ** 2
-df['expected_outcome'] = 1 / (1 + 10 ** ((df['opp_avg'] - df['player_rating']) / 4))
-df['surprise'] = df['won'] - df['expected_outcome']
-
 # Feature sets
 basic_features = ['won', 'rating_diff', 'score_margin', 'total_points']
 engineered_features = ['won', 'rating_diff', 'score_margin', 'total_points', 